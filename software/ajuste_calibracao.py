@@ -0,0 +1,186 @@
+"""
+Ajuste da curva de calibração da célula de carga.
+
+    - outliers removidos por nível (arquivo x massa): leituras fora de
+      Q1-K*IQR..Q3+K*IQR da própria massa. O filtro antigo juntava
+      todas as massas do arquivo e acabava cortando as massas extremas;
+    - polinômio torque x leitura média de cada nível, de grau 1 ou
+      maior, sem peso ou ponderado (pesos="n": amostras do nível;
+      pesos="variancia": n/s², inverso da variância da média);
+    - coeficientes no formato do np.poly1d (do termo mais alto ao mais
+      baixo), em N.mm por contagem, como o aplicar_calibracao usa;
+    - intervalo de confiança dos coeficientes por bootstrap selvagem
+      dos resíduos (sinais ±1): os N_BOOTSTRAP reajustes saem de um
+      único produto de matrizes, sem laço;
+    - canal do ADS1256 pelo MUX: 0 = DIFF_0_1, 1 = DIFF_2_3 (comandos
+      M0 e M1 do firmware). Arquivos sem a coluna MUX são do canal 0.
+"""
+import numpy as np
+
+from carregador import carregar_txt
+
+# === CONFIGURAÇÕES Ajuste ===
+K_IQR = 2.0               # largura do filtro de outliers de cada massa
+N_BOOTSTRAP = 4000        # reamostragens do intervalo de confiança
+CONFIANCA = 0.95
+VERSAO_AJUSTE = 2         # sobe a cada mudança no algoritmo: o registro refaz os ajustes guardados
+MUX_PADRAO = 0            # canal dos arquivos sem a coluna MUX
+CANAIS_MUX = {0: "DIFF_0_1", 1: "DIFF_2_3"}
+PESOS = (None, "n", "variancia")
+G = 9.81
+
+# ============================================================
+# LEITURA E FILTRO POR MASSA
+# ============================================================
+
+def ler_amostras(arquivos, mux=MUX_PADRAO):
+    """
+    Colunas Massa[g] e Leitura[int] (1ª e 3ª; a 2ª, torque original, é
+    ignorada) das amostras do canal mux. Retorna (massa, leitura, nivel),
+    nivel = índice do (arquivo, massa) de cada amostra.
+    """
+    massas, leituras, arquivo_de = [], [], []
+    for i, arquivo in enumerate(arquivos):
+        df = carregar_txt(arquivo, [0, 2, "MUX"], opcionais=("MUX",), cache=False)
+        d = df.iloc[:, :2].to_numpy(dtype=np.float64)
+        canal = df["MUX"].to_numpy() if "MUX" in df else np.full(len(d), MUX_PADRAO)
+        ok = ~np.isnan(d).any(axis=1) & (canal == mux)
+        massas.append(d[ok, 0])
+        leituras.append(d[ok, 1])
+        arquivo_de.append(np.full(ok.sum(), i))
+    massa = np.concatenate(massas)
+    leitura = np.concatenate(leituras)
+    _, nivel = np.unique(np.column_stack((np.concatenate(arquivo_de), massa)), axis=0, return_inverse=True)
+    return massa, leitura, nivel.ravel()
+
+
+def filtrar_por_nivel(leitura, nivel, k=K_IQR):
+    """Máscara das leituras dentro de Q1-k*IQR..Q3+k*IQR do seu nível."""
+    ok = np.ones(len(leitura), dtype=bool)
+    for g in np.unique(nivel):
+        sel = nivel == g
+        q1, q3 = np.percentile(leitura[sel], [25, 75])
+        iqr = q3 - q1
+        ok[sel] = (leitura[sel] >= q1 - k * iqr) & (leitura[sel] <= q3 + k * iqr)
+    return ok
+
+
+def medias_por_nivel(x, y, nivel):
+    """(x médio, y médio, n, desvio de x) de cada nível presente."""
+    _, nivel = np.unique(nivel, return_inverse=True)
+    n = np.bincount(nivel)
+    x_med = np.bincount(nivel, x) / n
+    y_med = np.bincount(nivel, y) / n
+    var = np.bincount(nivel, (x - x_med[nivel]) ** 2) / np.maximum(n - 1, 1)
+    return x_med, y_med, n, np.sqrt(var)
+
+# ============================================================
+# MÍNIMOS QUADRADOS E BOOTSTRAP
+# ============================================================
+
+def _mudanca_de_base(c, e, grau):
+    """
+    Matriz T com coef_x = T @ coef_u, onde u = (x - c)/e: o ajuste é
+    feito em u (bem condicionado) e volta para a leitura bruta.
+    """
+    k = grau + 1
+    T = np.zeros((k, k))
+    for j in range(k):
+        potencia = np.poly1d([1 / e, -c / e]) ** (grau - j)
+        T[k - len(potencia.coeffs):, j] = potencia.coeffs
+    return T
+
+
+def _pesos(pesos, n, desvio):
+    if pesos is None:
+        return np.ones(len(n))
+    if pesos == "n":
+        return n.astype(np.float64)
+    if pesos == "variancia":
+        return n / np.maximum(desvio, np.finfo(float).tiny) ** 2
+    raise ValueError(f"pesos deve ser um de {PESOS}")
+
+
+def ajustar_polinomio(x, y, grau=1, w=None, n_bootstrap=N_BOOTSTRAP, semente=None):
+    """
+    Mínimos quadrados ponderados de y = p(x). Retorna (coef, r2, amostras):
+    coef no formato do np.poly1d e amostras (n_bootstrap x grau+1) com
+    os coeficientes de cada reamostragem (vazio se n_bootstrap = 0).
+    """
+    w = np.ones(len(x)) if w is None else np.asarray(w, dtype=np.float64)
+    if len(x) <= grau:
+        raise ValueError(f"São precisos mais de {grau} níveis de massa para o grau {grau}.")
+    c, e = x.mean(), x.std() or 1.0
+    V = np.vander((x - c) / e, grau + 1)
+    raiz_w = np.sqrt(w)
+    P = np.linalg.pinv(V * raiz_w[:, None]) * raiz_w   # coef_u = P @ y
+    T = _mudanca_de_base(c, e, grau)
+
+    coef_u = P @ y
+    y_aj = V @ coef_u
+    residuo = y - y_aj
+    y_w = np.average(y, weights=w)
+    r2 = 1 - np.sum(w * residuo ** 2) / np.sum(w * (y - y_w) ** 2)
+
+    amostras = np.empty((0, grau + 1))
+    if n_bootstrap:
+        # bootstrap selvagem: y* = ŷ + v*r/sqrt(1-h), v = ±1 (Rademacher);
+        # todas as reamostragens num produto só (n_bootstrap x níveis) @ (níveis x grau+1)
+        h = np.einsum("ij,ji->i", V, P)
+        r = residuo / np.sqrt(np.clip(1 - h, 1e-12, None))
+        v = np.random.default_rng(semente).integers(0, 2, (n_bootstrap, len(x))) * 2 - 1
+        amostras = (y_aj + v * r) @ P.T @ T.T
+    return T @ coef_u, float(r2), amostras
+
+
+def ajustar_calibracao(arquivos, braco_mm, grau=1, pesos=None, mux=MUX_PADRAO,
+                       n_bootstrap=N_BOOTSTRAP, confianca=CONFIANCA, k_iqr=K_IQR, semente=None):
+    """
+    Curva torque [N.mm] x leitura do ADC dos calibracao_samples_*.txt.
+
+    Retorna um dict com coef (np.poly1d), ic ([inferior, superior] de
+    cada coeficiente), desvio (desvio padrão do bootstrap), r2, grau,
+    pesos, mux, canal, removidas (outliers), dados (leitura, torque das
+    amostras mantidas) e medios (leitura, torque de cada nível).
+    """
+    massa, leitura, nivel = ler_amostras(arquivos, mux)
+    if len(massa) == 0:
+        raise ValueError(f"Nenhuma amostra do MUX {mux} em {arquivos}")
+    torque = massa / 1000 * G * braco_mm
+
+    ok = filtrar_por_nivel(leitura, nivel, k_iqr)
+    x, y, n, desvio = medias_por_nivel(leitura[ok], torque[ok], nivel[ok])
+
+    coef, r2, amostras = ajustar_polinomio(x, y, grau, _pesos(pesos, n, desvio), n_bootstrap, semente)
+    alfa = (1 - confianca) / 2
+    if len(amostras):
+        ic = np.quantile(amostras, [alfa, 1 - alfa], axis=0).T
+        dp = amostras.std(axis=0, ddof=1)
+    else:
+        ic = np.full((grau + 1, 2), np.nan)
+        dp = np.full(grau + 1, np.nan)
+    return {
+        "coef": coef.tolist(),
+        "ic": ic.tolist(),
+        "desvio": dp.tolist(),
+        "confianca": confianca,
+        "r2": r2,
+        "grau": grau,
+        "pesos": pesos,
+        "mux": mux,
+        "canal": CANAIS_MUX.get(mux, str(mux)),
+        "removidas": int((~ok).sum()),
+        "dados": np.column_stack((leitura[ok], torque[ok])),
+        "medios": np.column_stack((x, y)),
+    }
+
+
+def formatar_polinomio(coef, variavel="ADC"):
+    """'a·ADC + b' (ou com potências) para os prints e legendas."""
+    grau = len(coef) - 1
+    termos = []
+    for j, c in enumerate(coef):
+        p = grau - j
+        termo = f"{abs(c):.6g}" + ("" if p == 0 else f"·{variavel}" + ("" if p == 1 else f"^{p}"))
+        termos.append((" - " if c < 0 else " + ") + termo if termos else ("-" if c < 0 else "") + termo)
+    return "".join(termos)
@@ -0,0 +1,116 @@
+"""
+Armazenamento colunar das amostras durante a aquisição.
+
+Substitui as listas de listas ([timestamp] + dados, [sp] + a,
+[massa, leitura]) por um array NumPy pré-alocado, uma linha do array
+por coluna (colunas x capacidade), que cresce dobrando de tamanho:
+
+    - reservar(n, chave) devolve a vista (n x colunas) das próximas n
+      linhas para serem preenchidas no lugar, sem lista intermediária;
+    - cada chamada é um trecho com a sua chave (setpoint ou massa), então
+      de(chave) devolve as amostras dela como vista, sem cópia, quando
+      estão contíguas (o caso normal);
+    - descartar(chave) remove os trechos da chave; o último é só um
+      recuo do contador, os do meio são compactados dentro do próprio
+      array (sem alocar outro).
+
+As vistas valem até a próxima reservar() que precise crescer o array.
+"""
+import numpy as np
+
+from gravacao import COLUNAS
+
+# === CONFIGURAÇÕES Amostras ===
+CAPACIDADE_INICIAL = 16384
+COLUNAS_JANELA = COLUNAS[1:11]   # TimeStamp, VelSet..V2, TempoChegada (saída de coletar_janela)
+
+
+class AmostrasColunares:
+    def __init__(self, colunas=COLUNAS_JANELA, coluna_chave=None, capacidade=CAPACIDADE_INICIAL,
+                 dtype=np.float64):
+        self.colunas = list(colunas)
+        self.indices = {c: k for k, c in enumerate(self.colunas)}
+        self.coluna_chave = coluna_chave   # coluna preenchida com a chave (ex.: Setpoint), opcional
+        self.dados = np.empty((len(self.colunas), capacidade), dtype=dtype)
+        self.n = 0
+        self.trechos = []   # [chave, inicio, fim] na ordem de chegada
+
+    def __len__(self):
+        return self.n
+
+    @property
+    def nbytes(self):
+        """Memória alocada (inclui a folga da capacidade)."""
+        return self.dados.nbytes
+
+    def indice(self, coluna):
+        return self.indices[coluna]
+
+    def _crescer(self, minimo):
+        capacidade = max(self.dados.shape[1], 1)
+        while capacidade < minimo:
+            capacidade *= 2
+        novo = np.empty((len(self.colunas), capacidade), dtype=self.dados.dtype)
+        novo[:, :self.n] = self.dados[:, :self.n]
+        self.dados = novo
+
+    def reservar(self, n, chave=None, fixas=None):
+        """
+        Acrescenta n linhas e devolve a vista (n x colunas) delas para
+        preencher. A coluna_chave e as colunas em fixas ({nome: valor})
+        já vêm preenchidas.
+        """
+        if self.n + n > self.dados.shape[1]:
+            self._crescer(self.n + n)
+        inicio, self.n = self.n, self.n + n
+        if self.trechos and self.trechos[-1][0] == chave and self.trechos[-1][2] == inicio:
+            self.trechos[-1][2] = self.n   # mesma chave em sequência: um trecho só
+        else:
+            self.trechos.append([chave, inicio, self.n])
+        bloco = self.dados[:, inicio:self.n].T
+        if self.coluna_chave is not None:
+            bloco[:, self.indices[self.coluna_chave]] = chave
+        for coluna, valor in (fixas or {}).items():
+            bloco[:, self.indices[coluna]] = valor
+        return bloco
+
+    def adicionar(self, linhas, chave=None):
+        linhas = np.asarray(linhas)
+        self.reservar(len(linhas), chave)[:] = linhas
+
+    def coluna(self, nome):
+        return self.dados[self.indices[nome], :self.n]
+
+    def linhas(self):
+        return self.dados[:, :self.n].T
+
+    def chaves(self):
+        return list(dict.fromkeys(t[0] for t in self.trechos))
+
+    def de(self, chave):
+        """Linhas da chave (vista se contíguas; senão, cópia concatenada)."""
+        partes = [(a, b) for c, a, b in self.trechos if c == chave]
+        if len(partes) == 1:
+            a, b = partes[0]
+            return self.dados[:, a:b].T
+        return np.concatenate([self.dados[:, a:b].T for a, b in partes]) if partes \
+            else self.dados[:, :0].T
+
+    def descartar(self, chave):
+        manter = [t for t in self.trechos if t[0] != chave]
+        if len(manter) == len(self.trechos):
+            return
+        pos = 0
+        for t in manter:
+            c, a, b = t
+            if a != pos:
+                self.dados[:, pos:pos + b - a] = self.dados[:, a:b]   # só anda para trás
+            t[1], t[2] = pos, pos + b - a
+            pos = t[2]
+        self.trechos = manter
+        self.n = pos
+
+    def limpar(self):
+        """Esvazia mantendo a capacidade (sem realocar na próxima janela)."""
+        self.n = 0
+        self.trechos = []
@@ -0,0 +1,197 @@
+"""
+Média por ângulo do rotor (phase averaging) por setpoint.
+
+Cada amostra cai num bin de azimute (Pos mod 2π, N_BINS bins) dentro
+do seu setpoint; contagem, soma e soma dos quadrados de cada canal são
+acumuladas com np.bincount sobre o índice combinado setpoint x bin, em
+blocos (serve para colunas memory-mapped). Os setpoints são trechos
+contíguos de set_omega, então o índice do setpoint sai de np.repeat
+sobre os trechos, sem np.unique por amostra.
+
+Resultado: média e desvio padrão de cada canal (ex.: torque da
+célula de carga e VelReal) por bin e por setpoint, em tabela e em
+gráfico polar. O ripple de passagem das pás aparece como N_PAS lóbulos.
+
+Uma calibração de grau 1 (np.poly1d) comuta com a média: é aplicada
+nos bins, no fim, e não amostra a amostra.
+"""
+import numpy as np
+import pandas as pd
+
+from gravacao import FASE_PATAMAR
+
+# === CONFIGURAÇÕES Azimute ===
+N_BINS = 72               # bins por volta (5°)
+TAMANHO_BLOCO = 1 << 16   # amostras por vez (cabem no cache: ~2x mais rápido que blocos de 4M)
+
+
+class MediaAzimutal:
+    """
+    Acumuladores (setpoints x bins) de n, soma e soma dos quadrados.
+    afins: {índice do canal: (a, b)} aplicados no resultado (a*x + b).
+    """
+
+    def __init__(self, nomes, n_bins=N_BINS, afins=None):
+        self.nomes = list(nomes)
+        self.afins = afins or {}
+        self.n_bins = n_bins
+        self.setpoints = []   # ordem de chegada; índice = linha dos acumuladores
+        self.indice_sp = {}
+        self.n = np.zeros((0, n_bins))
+        self.soma = np.zeros((len(self.nomes), 0, n_bins))
+        self.soma2 = np.zeros((len(self.nomes), 0, n_bins))
+        self.ref = None       # nível subtraído antes de acumular (precisão da soma dos quadrados)
+
+    def _indice(self, sp):
+        if sp not in self.indice_sp:
+            self.indice_sp[sp] = len(self.setpoints)
+            self.setpoints.append(sp)
+        return self.indice_sp[sp]
+
+    def adicionar(self, set_omega, pos, valores, validas=None):
+        """
+        set_omega, pos: (n,); valores: lista de colunas (n,), uma por
+        canal; validas: máscara opcional (ex.: só patamar).
+        """
+        sp = np.asarray(set_omega, dtype=np.float64)
+        if len(sp) == 0:
+            return
+        valores = [np.asarray(v, dtype=np.float64) for v in valores]
+        if self.ref is None:
+            self.ref = np.array([np.nanmean(v) for v in valores])
+
+        # índice do setpoint por trecho contíguo
+        trocas = np.flatnonzero(sp[1:] != sp[:-1]) + 1
+        inicios = np.concatenate(([0], trocas))
+        ids = np.array([self._indice(float(s)) for s in sp[inicios]])
+        id_sp = np.repeat(ids, np.diff(np.concatenate((inicios, [len(sp)]))))
+
+        # floor + resto inteiro: bem mais rápido que np.mod em float
+        b = np.floor(np.asarray(pos, dtype=np.float64) * (self.n_bins / (2 * np.pi))).astype(np.intp)
+        b %= self.n_bins
+        combinado = id_sp * self.n_bins + b
+
+        # amostras fora (não patamar, NaN) vão para um bin extra, descartado no fim
+        self._crescer()
+        tamanho = len(self.setpoints) * self.n_bins
+        descartar = None if validas is None else ~np.asarray(validas, dtype=bool)
+        for v in valores:
+            if np.isnan(v.sum()):
+                descartar = np.isnan(v) if descartar is None else descartar | np.isnan(v)
+        if descartar is not None:
+            combinado[descartar] = tamanho
+
+        self.n += np.bincount(combinado, minlength=tamanho + 1)[:tamanho].reshape(self.n.shape)
+        for k, v in enumerate(valores):
+            v = v - self.ref[k]
+            if descartar is not None:
+                v[descartar] = 0   # NaN no bin extra ainda estragaria a soma
+            self.soma[k] += np.bincount(combinado, v, tamanho + 1)[:tamanho].reshape(self.n.shape)
+            v *= v
+            self.soma2[k] += np.bincount(combinado, v, tamanho + 1)[:tamanho].reshape(self.n.shape)
+
+    def _crescer(self):
+        faltam = len(self.setpoints) - self.n.shape[0]
+        if faltam > 0:
+            self.n = np.vstack((self.n, np.zeros((faltam, self.n_bins))))
+            zeros = np.zeros((len(self.nomes), faltam, self.n_bins))
+            self.soma = np.concatenate((self.soma, zeros), axis=1)
+            self.soma2 = np.concatenate((self.soma2, zeros), axis=1)
+
+    def centros(self):
+        """Centro de cada bin [rad]."""
+        return (np.arange(self.n_bins) + 0.5) * (2 * np.pi / self.n_bins)
+
+    def resultado(self):
+        """(setpoints ordenados, n, média, desvio); média e desvio: (canais x sp x bins)."""
+        ordem = np.argsort(self.setpoints)
+        n = self.n[ordem]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            media_rel = self.soma[:, ordem] / n
+            var = (self.soma2[:, ordem] - n * media_rel ** 2) / (n - 1)
+        media = media_rel + self.ref[:, None, None]
+        desvio = np.sqrt(np.clip(var, 0, None))
+        for k, (a, b) in self.afins.items():
+            media[k] = a * media[k] + b
+            desvio[k] = abs(a) * desvio[k]
+        return np.array(self.setpoints)[ordem], n, media, desvio
+
+
+def media_azimutal(set_omega, pos, canais, fase=None, n_bins=N_BINS, tamanho_bloco=TAMANHO_BLOCO):
+    """
+    Média por azimute de cada canal, lendo tudo em blocos.
+    canais: {nome: (coluna, função ou None)}; a função (ex.:
+    np.poly1d(coef_load)) é aplicada bloco a bloco, antes da média,
+    ou nos bins se for um np.poly1d de grau 1.
+    Com fase, só as amostras de patamar entram.
+    """
+    afins = {}
+    colunas = []
+    for k, (c, f) in enumerate(canais.values()):
+        if isinstance(f, np.poly1d) and f.order <= 1:
+            afins[k] = (f.coeffs[0], f.coeffs[1]) if f.order == 1 else (0.0, f.coeffs[0])
+            f = None
+        colunas.append((np.asarray(c), f))
+    media = MediaAzimutal(canais, n_bins, afins)
+    set_omega = np.asarray(set_omega)
+    pos = np.asarray(pos)
+    fase = np.asarray(fase) if fase is not None else None
+    for i in range(0, len(set_omega), tamanho_bloco):
+        fim = i + tamanho_bloco
+        valores = [f(c[i:fim]) if f is not None else c[i:fim] for c, f in colunas]
+        validas = fase[i:fim] == FASE_PATAMAR if fase is not None else None
+        media.adicionar(set_omega[i:fim], pos[i:fim], valores, validas)
+    return media
+
+
+def tabela_azimutal(media):
+    """Uma linha por setpoint e bin: ângulo, n, média e desvio de cada canal."""
+    setpoints, n, med, dp = media.resultado()
+    angulo = np.degrees(media.centros())
+    tabela = pd.DataFrame({
+        "Setpoint": np.repeat(setpoints, media.n_bins),
+        "Angulo[graus]": np.tile(angulo, len(setpoints)),
+        "N": n.ravel().astype(np.int64),
+    })
+    for k, nome in enumerate(media.nomes):
+        tabela[f"{nome}_media"] = med[k].ravel()
+        tabela[f"{nome}_desvio"] = dp[k].ravel()
+    return tabela
+
+
+def figura_polar(media, titulo=None, escala=None, ripple=True):
+    """
+    Um gráfico polar por canal: média por azimute de cada setpoint
+    (cor = setpoint) com a faixa de ±1 desvio. Com ripple, cada curva
+    é a diferença para a média do próprio setpoint (os níveis de
+    setpoints diferentes esconderiam a oscilação). escala: {nome: fator}
+    para exibir (ex.: {"Torque[N.m]": 1000} em N.mm).
+    """
+    import matplotlib.pyplot as plt   # só quem desenha precisa do matplotlib
+
+    setpoints, n, med, dp = media.resultado()
+    if ripple:
+        with np.errstate(invalid="ignore"):
+            med = med - (np.nansum(med * n, axis=2) / n.sum(axis=1))[:, :, None]
+    theta = np.append(media.centros(), media.centros()[0])   # fecha a curva
+    cores = plt.cm.viridis(np.linspace(0, 1, max(len(setpoints), 1)))
+    fig, axs = plt.subplots(1, len(media.nomes), subplot_kw={"projection": "polar"},
+                            figsize=(6 * len(media.nomes), 6), squeeze=False)
+    for k, nome in enumerate(media.nomes):
+        ax = axs[0, k]
+        fator = (escala or {}).get(nome, 1)
+        for j, sp in enumerate(setpoints):
+            m = np.append(med[k, j], med[k, j, 0]) * fator
+            s = np.append(dp[k, j], dp[k, j, 0]) * fator
+            ax.fill_between(theta, m - s, m + s, color=cores[j], alpha=0.1, lw=0)
+            ax.plot(theta, m, color=cores[j], lw=1, label=f"{sp:g}")
+        finitos = med[k][np.isfinite(med[k])] * fator
+        if len(finitos):
+            margem = 0.1 * (finitos.max() - finitos.min() or abs(finitos.max()) or 1)
+            ax.set_rlim(finitos.min() - margem, finitos.max() + margem)   # ripple, não o valor médio
+        ax.set_title(("Ripple " if ripple else "") + nome + (f" (x{fator:g})" if fator != 1 else ""))
+    axs[0, -1].legend(title="Setpoint (rad/s)", bbox_to_anchor=(1.1, 1), loc="upper left", fontsize=7)
+    if titulo:
+        fig.suptitle(titulo)
+    fig.tight_layout()
+    return fig
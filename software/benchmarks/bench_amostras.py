@@ -0,0 +1,105 @@
+"""
+Benchmark: memória e tempo das amostras na aquisição, listas x AmostrasColunares.
+
+Simula --segundos de aquisição a --taxa amostras/s, em janelas de
+--janela amostras (como chegam do buffer da thread de leitura), e
+guarda tudo de dois jeitos:
+
+    listas      como era: [timestamp] + dados por amostra em
+                coletar_janela e [sp] + a em dados_gerais
+    colunar     AmostrasColunares com as colunas do gravador
+
+A memória é medida com tracemalloc e extrapolada para uma hora.
+Também mede o descarte de uma massa no meio (calibração).
+
+Uso:
+    python benchmarks/bench_amostras.py [--taxa 2000] [--segundos 60]
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+PASTA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, PASTA)
+
+from amostras import AmostrasColunares
+from gravacao import COLUNAS, FASE_PATAMAR
+
+
+def janelas(n_total, tamanho, semente=0):
+    rng = np.random.default_rng(semente)
+    for i in range(0, n_total, tamanho):
+        m = min(tamanho, n_total - i)
+        # chegada + 8 campos, como BufferCircular.intervalo()
+        yield i, rng.normal(size=(m, 9))
+
+
+def com_listas(n_total, tamanho, n_sp):
+    dados_gerais = []
+    for i, bloco in janelas(n_total, tamanho):
+        sp = 70 + i * n_sp // n_total
+        resultados = []
+        for a in bloco.tolist():
+            resultados.append([a[0]] + a[1:] + [a[0]])
+        for a in resultados:
+            dados_gerais.append([sp] + a + [FASE_PATAMAR])
+    return dados_gerais
+
+
+def com_colunar(n_total, tamanho, n_sp):
+    dados = AmostrasColunares(COLUNAS, coluna_chave="Setpoint")
+    for i, bloco in janelas(n_total, tamanho):
+        sp = 70 + i * n_sp // n_total
+        linhas = dados.reservar(len(bloco), sp, {"Fase": FASE_PATAMAR})
+        linhas[:, 1] = bloco[:, 0]
+        linhas[:, 2:10] = bloco[:, 1:]
+        linhas[:, 10] = bloco[:, 0]
+    return dados
+
+
+def medir(f, *args):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    r = f(*args)
+    dt = time.perf_counter() - t0
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return r, dt, pico
+
+
+def main():
+    parser = argparse.ArgumentParser(description="listas x AmostrasColunares")
+    parser.add_argument("--taxa", type=float, default=2000)
+    parser.add_argument("--segundos", type=float, default=60)
+    parser.add_argument("--janela", type=int, default=4000)
+    parser.add_argument("--setpoints", type=int, default=20)
+    args = parser.parse_args()
+
+    n = int(args.taxa * args.segundos)
+    hora = 3600 / args.segundos
+    print(f"{n} amostras ({args.segundos:g} s a {args.taxa:g} amostras/s), {len(COLUNAS)} colunas")
+
+    listas, t_listas, m_listas = medir(com_listas, n, args.janela, args.setpoints)
+    del listas
+    colunar, t_colunar, m_colunar = medir(com_colunar, n, args.janela, args.setpoints)
+
+    print(f" {'':10s} {'tempo':>8s} {'bytes/amostra':>14s} {'MB por hora':>12s}")
+    for nome, t, m in (("listas", t_listas, m_listas), ("colunar", t_colunar, m_colunar)):
+        print(f" {nome:10s} {t:7.2f}s {m / n:14.0f} {m * hora / 1e6:12.0f}")
+    print(f" colunar depois de crescer: {colunar.nbytes / len(colunar):.0f} bytes/amostra alocados "
+          f"({8 * len(COLUNAS)} usados); o pico inclui a cópia ao dobrar")
+    print(f" memória: {m_listas / m_colunar:.1f}x menor, tempo: {t_listas / t_colunar:.1f}x menor")
+
+    # descarte de um trecho no meio (ex.: massa refeita na calibração)
+    chave = colunar.chaves()[len(colunar.chaves()) // 2]
+    t0 = time.perf_counter()
+    colunar.descartar(chave)
+    print(f" descartar({chave}) no meio: {(time.perf_counter() - t0) * 1000:.1f} ms, restam {len(colunar)} amostras")
+
+
+if __name__ == "__main__":
+    main()
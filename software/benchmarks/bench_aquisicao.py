@@ -0,0 +1,197 @@
+"""
+Benchmark de vazão e perdas da aquisição.
+
+Roda o simulador (simulador.py) num processo separado e mede, do lado
+do host, LeitorSerial + coletar_janela do script de aquisição numa
+varredura de taxas de amostragem, bauds, tamanhos de bloco e protocolos.
+
+Para cada combinação reporta:
+    amostras/s recebidas, perdas estimadas, linhas/frames inválidos,
+    backlog máximo (in_waiting_max), CPU por amostra do host e a
+    latência no fim da janela.
+
+Os resultados saem em JSON lines (um objeto por combinação, com o
+commit atual), para comparar entre commits:
+
+    python benchmarks/bench_aquisicao.py --saida antes.jsonl
+    python benchmarks/bench_aquisicao.py --saida depois.jsonl
+    python benchmarks/bench_aquisicao.py --comparar antes.jsonl depois.jsonl
+"""
+import argparse
+import importlib.util
+import itertools
+import json
+import multiprocessing as mp
+import os
+import subprocess
+import sys
+import time
+
+PASTA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, PASTA)
+
+import serial
+
+from leitura_serial import LeitorSerial
+from simulador import Simulador
+
+TAXAS = [1000, 4000]
+BAUDS = [230400, 921600]
+BLOCOS = [1024, 65536]
+PROTOCOLOS = ["ascii", "binario"]
+DURACAO = 2.0       # s por janela medida
+AQUECIMENTO = 0.5   # s antes da janela
+
+
+def carregar_aquisicao():
+    """Importa calibracao_aquisicao_v0-1.py (nome com hífen)."""
+    caminho = os.path.join(PASTA, "calibracao_aquisicao_v0-1.py")
+    spec = importlib.util.spec_from_file_location("calibracao_aquisicao", caminho)
+    modulo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modulo)
+    return modulo
+
+
+def commit_atual():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=PASTA,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+# ============================================================
+# SIMULADOR EM OUTRO PROCESSO
+# ============================================================
+
+def _rodar_simulador(fila, parar, parametros):
+    sim = Simulador(**parametros)
+    sim.start()
+    fila.put(sim.porta)
+    parar.wait()
+    sim.parar()
+    fila.put({"amostras_enviadas": sim.amostras_enviadas, "bytes_perdidos": sim.bytes_perdidos})
+
+# ============================================================
+# UMA MEDIÇÃO
+# ============================================================
+
+def medir(aquisicao, taxa, baud, bloco, protocolo, duracao=DURACAO):
+    fila = mp.Queue()
+    parar = mp.Event()
+    parametros = dict(taxa=taxa, baud=baud, protocolo=protocolo, atraso_inicial=0.0)
+    proc = mp.Process(target=_rodar_simulador, args=(fila, parar, parametros), daemon=True)
+    proc.start()
+    porta = fila.get(timeout=10)
+
+    with serial.Serial(porta, baud, timeout=0.01) as ser:
+        leitor = LeitorSerial(ser, tamanho_bloco=bloco, protocolo=protocolo)
+        leitor.start()
+        time.sleep(AQUECIMENTO)
+
+        invalidas_0 = leitor.linhas_invalidas
+        cpu_0 = time.process_time()
+        t_0 = time.perf_counter()
+        amostras, info = aquisicao.coletar_janela(leitor, duracao, sp=None)
+        t_retorno = time.perf_counter()
+        relogio_retorno = time.time()
+        cpu = time.process_time() - cpu_0
+        invalidas = leitor.linhas_invalidas - invalidas_0
+        perdidos_seq = getattr(leitor.parser, "frames_perdidos", None)
+
+        leitor.parar()
+
+    parar.set()
+    fim_sim = fila.get(timeout=10)
+    proc.join(timeout=5)
+
+    # taxa que o simulador consegue manter nesse baud (mesma conta dele)
+    bytes_amostra = 38 if protocolo == "binario" else 60
+    esperado = min(taxa, baud / 10 / bytes_amostra) * duracao
+    n = len(amostras)
+
+    return {
+        "taxa": taxa,
+        "baud": baud,
+        "bloco": bloco,
+        "protocolo": protocolo,
+        "duracao_s": duracao,
+        "amostras": n,
+        "amostras_por_s": n / duracao,
+        "perda_estimada": max(0.0, 1 - n / esperado) if esperado else 0.0,
+        "frames_perdidos_seq": perdidos_seq,
+        "invalidas": invalidas,
+        "bytes_perdidos_pty": fim_sim["bytes_perdidos"],
+        "backlog_max_bytes": info["in_waiting_max"],
+        "cpu_us_por_amostra": 1e6 * cpu / n if n else None,
+        "latencia_fim_janela_ms": 1e3 * (t_retorno - t_0 - duracao),
+        "atraso_ultima_amostra_ms": 1e3 * (relogio_retorno - amostras[-1, -1]) if n else None,
+    }
+
+# ============================================================
+# COMPARAÇÃO ENTRE EXECUÇÕES
+# ============================================================
+
+CHAVE = ("taxa", "baud", "bloco", "protocolo")
+METRICAS = ["amostras_por_s", "perda_estimada", "invalidas", "backlog_max_bytes",
+            "cpu_us_por_amostra", "latencia_fim_janela_ms"]
+
+
+def ler_resultados(arquivo):
+    with open(arquivo) as f:
+        return {tuple(r[k] for k in CHAVE): r for r in map(json.loads, f) if r}
+
+
+def comparar(arquivo_a, arquivo_b):
+    a = ler_resultados(arquivo_a)
+    b = ler_resultados(arquivo_b)
+    for chave in sorted(set(a) & set(b)):
+        print(" ".join(f"{k}={v}" for k, v in zip(CHAVE, chave)))
+        for m in METRICAS:
+            va, vb = a[chave].get(m), b[chave].get(m)
+            if va is None or vb is None:
+                continue
+            delta = f"{100 * (vb - va) / va:+.1f}%" if va else ""
+            print(f"    {m:24s} {va:12.3f} -> {vb:12.3f} {delta}")
+
+# ============================================================
+# MAIN
+# ============================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de vazão e perdas da aquisição.")
+    parser.add_argument("--taxas", type=float, nargs="+", default=TAXAS)
+    parser.add_argument("--bauds", type=int, nargs="+", default=BAUDS)
+    parser.add_argument("--blocos", type=int, nargs="+", default=BLOCOS)
+    parser.add_argument("--protocolos", nargs="+", default=PROTOCOLOS, choices=PROTOCOLOS)
+    parser.add_argument("--duracao", type=float, default=DURACAO)
+    parser.add_argument("--saida", help="arquivo JSON lines para os resultados")
+    parser.add_argument("--comparar", nargs=2, metavar=("A", "B"), help="compara dois arquivos de resultados")
+    args = parser.parse_args()
+
+    if args.comparar:
+        comparar(*args.comparar)
+        return
+
+    aquisicao = carregar_aquisicao()
+    commit = commit_atual()
+    saida = open(args.saida, "a") if args.saida else None
+
+    print(f"{'proto':8s} {'taxa':>6s} {'baud':>7s} {'bloco':>6s} | {'amostras/s':>10s} {'perda':>6s} "
+          f"{'inval':>5s} {'backlog':>7s} {'cpu us/am':>9s} {'lat ms':>7s}")
+    for protocolo, taxa, baud, bloco in itertools.product(args.protocolos, args.taxas, args.bauds, args.blocos):
+        r = medir(aquisicao, taxa, baud, bloco, protocolo, args.duracao)
+        r["commit"] = commit
+        r["data"] = time.strftime("%Y-%m-%d %H:%M:%S")
+        print(f"{protocolo:8s} {taxa:6.0f} {baud:7d} {bloco:6d} | {r['amostras_por_s']:10.0f} "
+              f"{100 * r['perda_estimada']:5.1f}% {r['invalidas']:5d} {r['backlog_max_bytes']:7d} "
+              f"{r['cpu_us_por_amostra'] or 0:9.1f} {r['latencia_fim_janela_ms']:7.1f}")
+        if saida:
+            saida.write(json.dumps(r) + "\n")
+            saida.flush()
+
+    if saida:
+        saida.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Benchmark: bootstrap dos coeficientes da calibração, laço x vetorizado.
+
+Para os níveis de massa de uma calibração sintética (arquivos x
+massas), mede N reajustes do bootstrap selvagem:
+
+    laço         um np.polyfit por reamostragem
+    vetorizado   ajuste_calibracao.ajustar_polinomio (um produto de matrizes)
+
+e confere que os dois dão as mesmas amostras de coeficientes.
+
+Uso:
+    python benchmarks/bench_calibracao.py [--reamostragens 4000] [--grau 1]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+PASTA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, PASTA)
+
+from ajuste_calibracao import ajustar_polinomio
+
+MASSAS = [4.66, 10.75, 16.59, 23.96, 28.62, 33.63, 38.00]   # g
+BRACO = 26 + 15                                              # mm
+
+
+def niveis(n_arquivos, semente=0):
+    rng = np.random.default_rng(semente)
+    torque = np.tile(np.array(MASSAS) / 1000 * 9.81 * BRACO, n_arquivos)
+    leitura = (torque - 0.945) / 0.004075e-3 + rng.normal(0, 300, len(torque))
+    return leitura, torque
+
+
+def com_laco(x, y, grau, w, n, semente):
+    """Mesmas reamostragens, um polyfit por vez."""
+    coef, _, _ = ajustar_polinomio(x, y, grau, w, 0)
+    V = np.vander(x, grau + 1)
+    y_aj = V @ coef
+    c, e = x.mean(), x.std()
+    Vu = np.vander((x - c) / e, grau + 1)
+    P = np.linalg.pinv(Vu * np.sqrt(w)[:, None]) * np.sqrt(w)
+    h = np.einsum("ij,ji->i", Vu, P)
+    r = (y - y_aj) / np.sqrt(np.clip(1 - h, 1e-12, None))
+    v = np.random.default_rng(semente).integers(0, 2, (n, len(x))) * 2 - 1
+    return np.array([np.polyfit(x, y_aj + v[b] * r, grau, w=np.sqrt(w)) for b in range(n)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="bootstrap da calibração: laço x vetorizado")
+    parser.add_argument("--reamostragens", type=int, default=4000)
+    parser.add_argument("--grau", type=int, default=1)
+    parser.add_argument("--arquivos", type=int, default=2)
+    args = parser.parse_args()
+
+    x, y = niveis(args.arquivos)
+    w = np.ones(len(x))
+    print(f"{len(x)} níveis, grau {args.grau}, {args.reamostragens} reamostragens")
+
+    t0 = time.perf_counter()
+    laco = com_laco(x, y, args.grau, w, args.reamostragens, 0)
+    t_laco = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    _, _, vetor = ajustar_polinomio(x, y, args.grau, w, args.reamostragens, 0)
+    t_vetor = time.perf_counter() - t0
+
+    print(f" laço:       {t_laco * 1000:8.1f} ms")
+    print(f" vetorizado: {t_vetor * 1000:8.1f} ms ({t_laco / t_vetor:.0f}x)")
+    print(f" mesmas amostras: {np.allclose(laco, vetor, rtol=1e-6, atol=0)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmark: pd.read_csv x carregador.carregar_txt (sem e com cache).
+
+Gera um aquisicao_*.txt sintético (mesmas colunas do gravacao.py) e
+mede:
+    read_csv       pd.read_csv(sep="\\t"), todas as colunas (como antes)
+    1a leitura     carregar_txt das colunas do plot_v1-0.py, criando o cache
+    cache          mesma chamada com o cache pronto (np.load memory-mapped)
+
+e a memória das colunas carregadas (float64 do read_csv x dtypes
+compactos do carregador).
+
+Uso:
+    python benchmarks/bench_carregador.py [--amostras 2e6]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+PASTA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, PASTA)
+
+from carregador import carregar_txt
+from gravacao import COLUNAS, FASE_PATAMAR
+
+COLUNAS_PLOT = list(range(9)) + ["Fase"]
+
+
+def gerar(arquivo, n, semente=0):
+    rng = np.random.default_rng(semente)
+    t = 1.7e9 + np.arange(n) / 2000
+    dados = np.column_stack([
+        70 + 10 * (np.arange(n) * 20 // n),           # Setpoint
+        t,                                            # TimeStamp
+        *[np.round(rng.normal(0, 1, n), 2) for _ in range(6)],   # VelSet..Az
+        rng.integers(-(1 << 23), 1 << 23, n),         # V1
+        rng.normal(0, 1, n),                          # V2
+        t,                                            # TempoChegada
+        np.full(n, FASE_PATAMAR),                     # Fase
+    ])
+    np.savetxt(arquivo, dados, delimiter="\t", header="\t".join(COLUNAS), comments="", fmt="%.10g")
+
+
+def cronometrar(f):
+    t0 = time.perf_counter()
+    r = f()
+    return time.perf_counter() - t0, r
+
+
+def main():
+    parser = argparse.ArgumentParser(description="pd.read_csv x carregador.py")
+    parser.add_argument("--amostras", type=float, default=2e6)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        arquivo = os.path.join(pasta, "aquisicao_20250101_000000.txt")
+        gerar(arquivo, int(args.amostras))
+        print(f"{int(args.amostras)} amostras, {os.path.getsize(arquivo) / 1e6:.0f} MB")
+
+        t_csv, df_csv = cronometrar(lambda: pd.read_csv(arquivo, sep="\t"))
+        t_1a, df = cronometrar(lambda: carregar_txt(arquivo, COLUNAS_PLOT, ("Fase",)))
+        t_cache, df_cache = cronometrar(lambda: carregar_txt(arquivo, COLUNAS_PLOT, ("Fase",)))
+        assert np.array_equal(df.to_numpy(), df_cache.to_numpy())
+
+        mem_csv = df_csv.iloc[:, :9].memory_usage(index=False).sum() + df_csv["Fase"].nbytes
+        mem = sum(np.asarray(df_cache[c]).nbytes for c in df_cache)
+        print(f" read_csv:   {t_csv * 1000:8.1f} ms")
+        print(f" 1a leitura: {t_1a * 1000:8.1f} ms")
+        print(f" cache:      {t_cache * 1000:8.1f} ms ({t_csv / t_cache:.0f}x)")
+        print(f" memória das {len(COLUNAS_PLOT)} colunas: {mem_csv / 1e6:.0f} MB -> {mem / 1e6:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
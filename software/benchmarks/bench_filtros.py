@@ -0,0 +1,97 @@
+"""
+Benchmark: moving_average (np.convolve, plot_v1-0.py) x filtros.py.
+
+Para cada tamanho de sinal mede o tempo de:
+    moving_average(x, janela)            sinal inteiro, O(n*janela)
+    filtrar(MediaMovel), por patamar     O(n)
+    filtrar(IIR), por patamar
+    filtrar(MediaMovel) memmap -> memmap (em blocos, fora da memória)
+
+O sinal sintético tem 20 patamares de set_omega. Acima de
+--max-convolve amostras só o caminho memmap -> memmap é medido
+(o sinal não precisa caber na memória).
+
+Uso:
+    python benchmarks/bench_filtros.py [--tamanhos 1e6 1e7 1e8] [--janela 201]
+"""
+import argparse
+import importlib.util
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+PASTA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, PASTA)
+
+from filtros import IIR, MediaMovel, filtrar
+
+BLOCO_GERACAO = 1 << 22
+
+
+def carregar_moving_average():
+    """moving_average do plot_v1-0.py (nome com hífen)."""
+    spec = importlib.util.spec_from_file_location("plot_v1_0", os.path.join(PASTA, "plot_v1-0.py"))
+    modulo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modulo)
+    return modulo.moving_average
+
+
+def gerar(pasta, n, semente=0):
+    """Sinal e set_omega sintéticos em memmaps no disco (não cabem na RAM em 1e8+)."""
+    rng = np.random.default_rng(semente)
+    x = np.memmap(os.path.join(pasta, "x.bin"), dtype=np.float64, mode="w+", shape=(n,))
+    sp = np.memmap(os.path.join(pasta, "sp.bin"), dtype=np.float64, mode="w+", shape=(n,))
+    for i in range(0, n, BLOCO_GERACAO):
+        m = min(BLOCO_GERACAO, n - i)
+        patamar = 70 + 10 * (np.arange(i, i + m) * 20 // n)
+        sp[i:i + m] = patamar
+        x[i:i + m] = 1e6 + 2000 * patamar + rng.normal(0, 150, m)
+    x.flush()
+    sp.flush()
+    return x, sp
+
+
+def cronometrar(f):
+    t0 = time.perf_counter()
+    f()
+    return time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="moving_average x filtros.py")
+    parser.add_argument("--tamanhos", type=float, nargs="+", default=[1e6, 1e7])
+    parser.add_argument("--janela", type=int, default=201)
+    parser.add_argument("--max-convolve", type=float, default=1e7)
+    args = parser.parse_args()
+
+    moving_average = carregar_moving_average()
+
+    print(f"janela = {args.janela}")
+    print(f"{'n':>10s} {'convolve':>10s} {'media O(n)':>11s} {'IIR':>8s} {'memmap':>8s} {'ganho':>7s}")
+    for n in map(int, args.tamanhos):
+        with tempfile.TemporaryDirectory() as pasta:
+            x, sp = gerar(pasta, n)
+            saida = np.memmap(os.path.join(pasta, "y.bin"), dtype=np.float64, mode="w+", shape=(n,))
+
+            # os caminhos em memória só até max_convolve; acima disso só memmap -> memmap
+            t_conv = t_media = t_iir = None
+            if n <= args.max_convolve:
+                t_conv = cronometrar(lambda: moving_average(np.asarray(x), args.janela))
+                t_media = cronometrar(lambda: filtrar(x, sp, MediaMovel(args.janela)))
+                t_iir = cronometrar(lambda: filtrar(x, sp, IIR(2 / (args.janela + 1))))
+            t_memmap = cronometrar(lambda: filtrar(x, sp, MediaMovel(args.janela), saida=saida))
+            saida.flush()
+
+            def fmt(t):
+                return f"{t:.2f}s" if t is not None else "-"
+            ganho = f"{t_conv / t_media:.1f}x" if t_conv and t_media else "-"
+            print(f"{n:10d} {fmt(t_conv):>10s} {fmt(t_media):>11s} {fmt(t_iir):>8s} "
+                  f"{fmt(t_memmap):>8s} {ganho:>7s}")
+            del x, sp, saida
+
+
+if __name__ == "__main__":
+    main()
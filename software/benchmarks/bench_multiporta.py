@@ -0,0 +1,119 @@
+"""
+Benchmark da aquisição multiporta (multiporta.py) com simuladores em pty.
+
+Sobe N dinamômetros virtuais (simulador.py), cada um no seu processo,
+e adquire todos ao mesmo tempo com AquisicaoMultiporta. Opcionalmente
+uma das portas é lenta (baud baixo) e outra trava no meio (o simulador
+para de enviar), para mostrar que elas não atrasam as demais.
+
+No meio da aquisição um degrau de setpoint (T) é enviado a todas as
+portas ao mesmo tempo; na mescla, o instante do degrau no VelSet de
+cada porta mostra o alinhamento da base de tempo comum.
+
+Reporta por porta: amostras/s recebidas x esperadas, linhas inválidas,
+sobrescritas, atraso no fim, e o desalinhamento do degrau entre portas.
+
+Uso:
+    python benchmarks/bench_multiporta.py [--portas 4] [--taxa 2000] [--duracao 6] [--lenta] [--trava]
+"""
+import argparse
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+PASTA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, PASTA)
+
+from gravacao import abrir_colunar
+from multiporta import AquisicaoMultiporta, mesclar
+from simulador import Simulador
+
+BAUD = 921600
+BAUD_LENTA = 57600
+DEGRAU = 50.0   # rad/s enviado a todas as portas
+
+
+def _rodar_simulador(fila, parar, travar_em, parametros):
+    sim = Simulador(**parametros)
+    sim.start()
+    fila.put(sim.porta)
+    if travar_em is not None and not parar.wait(travar_em):
+        sim._parar.set()   # para de enviar, mas o pty continua aberto (porta "travada")
+    parar.wait()
+    sim.parar()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Aquisição multiporta com simuladores")
+    parser.add_argument("--portas", type=int, default=4)
+    parser.add_argument("--taxa", type=float, default=2000)
+    parser.add_argument("--duracao", type=float, default=6.0)
+    parser.add_argument("--lenta", action="store_true", help=f"última porta a {BAUD_LENTA} baud")
+    parser.add_argument("--trava", action="store_true", help="penúltima porta para no meio")
+    args = parser.parse_args()
+
+    parar = mp.Event()
+    fila = mp.Queue()
+    simuladores = []
+    bauds = {}
+    for k in range(args.portas):
+        baud = BAUD_LENTA if args.lenta and k == args.portas - 1 else BAUD
+        travar_em = args.duracao / 2 if args.trava and k == args.portas - 2 else None
+        p = mp.Process(target=_rodar_simulador, daemon=True,
+                       args=(fila, parar, travar_em, dict(taxa=args.taxa, baud=baud, atraso_inicial=0.5, semente=k)))
+        p.start()
+        portas_antes = fila.get(timeout=10)
+        bauds[f"rig{k}"] = (portas_antes, baud)
+        simuladores.append(p)
+
+    with tempfile.TemporaryDirectory() as pasta:
+        aquisicao = AquisicaoMultiporta({n: p for n, (p, _) in bauds.items()}, pasta, BAUD).start()
+        t0 = time.monotonic()
+        degrau_enviado = False
+        while time.monotonic() - t0 < args.duracao:
+            time.sleep(1.0)
+            if not degrau_enviado and time.monotonic() - t0 >= args.duracao / 3:
+                aquisicao.enviar(f"T{DEGRAU}")
+                degrau_enviado = True
+            print("\r" + aquisicao.linha_status(), end="  ")
+        resultados = aquisicao.parar()
+        parar.set()
+        print()
+
+        for nome, r in resultados.items():
+            porta, baud = bauds[nome]
+            esperado = min(args.taxa, baud / 10 / 60)
+            print(f"{nome} @ {baud:>6}: {r.get('taxa', 0):7.0f} a/s (máx. {esperado:5.0f}) "
+                  f"{int(r.get('amostras', 0)):>8} amostras, inv {int(r.get('invalidas', 0))}, "
+                  f"ovf {int(r.get('sobrescritas', 0))}, atraso final {r.get('atraso_s', float('nan')):.2f}s"
+                  + (f"  erro: {r['erro']}" if r.get("erro") else ""))
+
+        t = time.perf_counter()
+        saida = mesclar(pasta, list(bauds))
+        colunas, meta = abrir_colunar(saida)
+        print(f"mescla: {len(colunas['TimeStamp'])} linhas x {len(colunas)} colunas "
+              f"em {time.perf_counter() - t:.2f} s")
+
+        # instante do degrau de VelSet em cada porta, na grade comum
+        tempo = np.asarray(colunas["TimeStamp"])
+        instantes = {}
+        for nome in bauds:
+            velset = np.asarray(colunas[f"{nome}_VelSet"])
+            i = np.flatnonzero(velset >= DEGRAU)
+            if len(i):
+                instantes[nome] = tempo[i[0]]
+        if len(instantes) > 1:
+            ref = min(instantes.values())
+            print("degrau (ms após a primeira porta): " +
+                  ", ".join(f"{n} {1e3 * (v - ref):.1f}" for n, v in instantes.items()))
+
+    for p in simuladores:
+        p.join(timeout=5)
+
+
+if __name__ == "__main__":
+    main()
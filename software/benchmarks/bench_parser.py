@@ -0,0 +1,80 @@
+"""
+Micro-benchmark: ler_linha (linha a linha) x ParserLote (em lote).
+
+Gera um fluxo sintético no formato do firmware V0_1 e mede
+linhas por segundo de cada caminho.
+
+Uso:
+    python benchmarks/bench_parser.py [n_linhas] [tamanho_bloco]
+"""
+import io
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from leitura_serial import ParserLote, ler_linha
+
+
+def gerar_fluxo(n_linhas, fracao_ruim=0.001, semente=0):
+    rng = np.random.default_rng(semente)
+    vel = rng.uniform(70, 210, n_linhas)
+    pos = np.cumsum(rng.uniform(0.05, 0.2, n_linhas))
+    acc = rng.normal(0, 0.05, (n_linhas, 3))
+    adc = rng.integers(-8388608, 8388607, n_linhas)
+    v2 = rng.normal(1.0, 0.1, n_linhas)
+
+    linhas = [
+        f"{vel[i]:.2f}\t{vel[i] - 0.3:.2f}\t{pos[i]:.2f}\t{acc[i, 0]:.2f}\t"
+        f"{acc[i, 1]:.2f}\t{acc[i, 2]:.2f}\t{adc[i]}\t{v2[i]:.2f}\r\n"
+        for i in range(n_linhas)
+    ]
+    # algumas linhas corrompidas, como acontece na serial
+    for i in rng.choice(n_linhas, int(n_linhas * fracao_ruim), replace=False):
+        linhas[i] = linhas[i][: len(linhas[i]) // 2] + "\r\n"
+    return "".join(linhas).encode()
+
+
+def medir_ler_linha(fluxo):
+    ser = io.BytesIO(fluxo)
+    t0 = time.perf_counter()
+    n = 0
+    while True:
+        dados = ler_linha(ser)
+        if dados is None and ser.tell() >= len(fluxo):
+            break
+        if dados and len(dados) >= 8:
+            n += 1
+    return n, time.perf_counter() - t0
+
+
+def medir_parser_lote(fluxo, tamanho_bloco):
+    parser = ParserLote()
+    t0 = time.perf_counter()
+    n = 0
+    for i in range(0, len(fluxo), tamanho_bloco):
+        n += len(parser.processar(fluxo[i:i + tamanho_bloco]))
+    return n, time.perf_counter() - t0, parser.linhas_invalidas
+
+
+def main():
+    n_linhas = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    tamanho_bloco = int(sys.argv[2]) if len(sys.argv) > 2 else 65536
+
+    fluxo = gerar_fluxo(n_linhas)
+    print(f"{n_linhas} linhas, {len(fluxo) / 1e6:.1f} MB, bloco de {tamanho_bloco} bytes")
+
+    n1, t1 = medir_ler_linha(fluxo)
+    print(f"ler_linha   : {n1:8d} linhas em {t1:6.3f} s -> {n1 / t1:12.0f} linhas/s")
+
+    n2, t2, ruins = medir_parser_lote(fluxo, tamanho_bloco)
+    print(f"ParserLote  : {n2:8d} linhas em {t2:6.3f} s -> {n2 / t2:12.0f} linhas/s "
+          f"({ruins} inválidas)")
+
+    print(f"Ganho: {t1 / t2:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Benchmark: gráficos de série temporal do plot_v1-0 com todas as
+amostras x decimados (decimacao.py).
+
+Gera um ensaio sintético grande em formato colunar, abre-o como o
+plot_v1-0 faz e mede, com backend Agg, o tempo para montar e desenhar
+as figuras de velocidade, posição, V_load e V_freio, e o tempo de um
+zoom (1 % do ensaio) seguido de novo desenho.
+
+Uso:
+    python benchmarks/bench_plot.py [n_amostras]
+"""
+import os
+import sys
+import tempfile
+import time
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from decimacao import plot_decimado
+from gravacao import COLUNAS, GravadorColunar, abrir_colunar
+
+
+def gerar_ensaio(caminho, n, semente=0):
+    """Ensaio sintético: patamares de velocidade, rotor girando, ruído no ADC."""
+    rng = np.random.default_rng(semente)
+    with GravadorColunar(caminho, tamanho_chunk=1 << 18) as g:
+        for inicio in range(0, n, 1 << 20):
+            m = min(1 << 20, n - inicio)
+            i = np.arange(inicio, inicio + m)
+            dados = np.zeros((m, len(COLUNAS)))
+            sp = 70 + 10 * (i * 20 // n)
+            dados[:, 0] = sp
+            dados[:, 1] = i / 2000
+            dados[:, 2] = sp
+            dados[:, 3] = sp + rng.normal(0, 0.3, m)
+            dados[:, 4] = sp * dados[:, 1]
+            dados[:, 5:8] = rng.normal(0, 0.01, (m, 3))
+            dados[:, 8] = 1e6 + 2000 * sp + rng.normal(0, 150, m)
+            dados[:, 9] = 0.3 + rng.normal(0, 0.01, m)
+            dados[:, 10] = dados[:, 1]
+            dados[:, 11] = 2
+            g.adicionar(dados)
+
+
+def figuras(colunas, decimado):
+    """As quatro figuras de série temporal do ramo de ensaio do plot_v1-0."""
+    series = [
+        [colunas["Setpoint"], colunas["VelReal"]],
+        [np.asarray(colunas["Pos"]) % (2 * np.pi)],
+        [colunas["V1"]],
+        [colunas["V2"]],
+    ]
+    figs = []
+    for k, ys in enumerate(series):
+        fig, ax = plt.subplots(figsize=(14, 4))
+        for y in ys:
+            marcador = k == 1
+            if decimado:
+                if marcador:
+                    plot_decimado(ax, y, ".", ms=1, modo="passo")
+                else:
+                    plot_decimado(ax, y)
+            elif marcador:
+                ax.scatter(np.arange(len(y)), y, s=1)
+            else:
+                ax.plot(y)
+        figs.append(fig)
+    return figs
+
+
+def medir(colunas, decimado):
+    t0 = time.perf_counter()
+    figs = figuras(colunas, decimado)
+    for fig in figs:
+        fig.canvas.draw()
+    t_inicial = time.perf_counter() - t0
+
+    n = len(colunas["V1"])
+    t0 = time.perf_counter()
+    for fig in figs:
+        fig.axes[0].set_xlim(n // 2, n // 2 + n // 100)
+        fig.canvas.draw()
+    t_zoom = time.perf_counter() - t0
+
+    plt.close("all")
+    return t_inicial, t_zoom
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 3_000_000
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, "sintetico.col")
+        print(f"Gerando ensaio sintético com {n} amostras...")
+        gerar_ensaio(caminho, n)
+        colunas, _ = abrir_colunar(caminho)
+
+        print(f"{'':12s} {'montar+desenhar':>16s} {'zoom 1%':>10s}")
+        for nome, decimado in (("completo", False), ("decimado", True)):
+            t_inicial, t_zoom = medir(colunas, decimado)
+            print(f"{nome:12s} {t_inicial:15.2f}s {t_zoom:9.2f}s")
+        del colunas
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Benchmark: rampa em degraus (antiga) x rampa em malha fechada (rampa.py).
+
+Roda a varredura dos setpoints do script de aquisição (0 -> sp_inicial,
+os 20 setpoints, volta ao sp_inicial e a 0) no modelo do simulador
+(ModeloDinamometro, resposta de primeira ordem com TAU), em tempo
+simulado, e mede para cada rampa:
+
+    duracao    tempo até a rampa devolver o controle ao ensaio
+    assentado  tempo até o VelReal ficar dentro de ±TOLERANCIA do alvo
+               (na antiga, a rampa acaba antes disso: o patamar começa
+               com o rotor ainda chegando)
+    excesso    maior passagem do alvo pelo VelReal
+
+Uso:
+    python benchmarks/bench_rampa.py [--perfil s] [--aceleracao 20] [--tau 0.35]
+"""
+import argparse
+import math
+import os
+import sys
+
+import numpy as np
+
+PASTA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, PASTA)
+
+from rampa import ACELERACAO, JERK, PERFIS, TAXA_COMANDOS, TOLERANCIA, RampaMalhaFechada
+from simulador import TAU, ModeloDinamometro
+
+RAMPA_STEP = 5     # rampa antiga
+RAMPA_DELAY = 1
+SP_INICIAL = 73.30
+SETPOINTS = [73.30, 83.78, 94.25, 99.48, 104.72, 109.96, 115.19, 120.43, 125.66, 130.90,
+             136.14, 141.37, 146.61, 151.84, 157.08, 167.55, 178.02, 188.50, 198.97, 209.44]
+TAXA = 2000.0      # amostras/s do modelo
+
+
+class Planta:
+    """ModeloDinamometro em tempo simulado, devolvendo linhas como as do buffer."""
+
+    def __init__(self, tau):
+        self.modelo = ModeloDinamometro(tau=tau, semente=0)
+        self.t = 0.0
+
+    def avancar(self, duracao):
+        n = max(int(round(duracao * TAXA)), 1)
+        dados = self.modelo.gerar(n, 1 / TAXA)
+        chegada = self.t + np.arange(1, n + 1) / TAXA
+        self.t = chegada[-1]
+        return np.column_stack((chegada, dados))
+
+
+def assentamento(linhas, alvo, inicio, sinal, janela=32):
+    """(tempo desde inicio até o VelReal entrar de vez na banda, excesso)."""
+    vel = np.convolve(linhas[:, 2], np.ones(janela) / janela, mode="valid")
+    t = linhas[janela - 1:, 0]
+    fora = np.flatnonzero(np.abs(vel - alvo) > TOLERANCIA)
+    t_ok = t[fora[-1] + 1] if len(fora) and fora[-1] + 1 < len(t) else (t[0] if not len(fora) else np.inf)
+    excesso = max(float(((vel - alvo) * sinal).max()), 0.0)
+    return t_ok - inicio, excesso
+
+
+def rampa_degraus(planta, atual, alvo):
+    inicio = planta.t
+    passo = RAMPA_STEP if alvo > atual else -RAMPA_STEP
+    sp = atual
+    linhas = []
+    while (passo > 0 and sp < alvo) or (passo < 0 and sp > alvo):
+        sp += passo
+        if (passo > 0 and sp > alvo) or (passo < 0 and sp < alvo):
+            sp = alvo
+        planta.modelo.comando(f"T{sp}")
+        linhas.append(planta.avancar(RAMPA_DELAY))
+    duracao = planta.t - inicio
+    linhas.append(planta.avancar(5.0))   # o que o patamar seguinte veria
+    t_ok, excesso = assentamento(np.concatenate(linhas), alvo, inicio, math.copysign(1, alvo - atual))
+    planta.t = inicio + duracao          # o ensaio segue no fim da rampa
+    return duracao, t_ok, excesso
+
+
+def rampa_malha_fechada(planta, atual, alvo, perfil, aceleracao):
+    inicio = planta.t
+    rampa = RampaMalhaFechada(atual, alvo, inicio, perfil, aceleracao, JERK)
+    linhas = []
+    while True:
+        sp = rampa.comando(planta.t)
+        if sp is not None:
+            planta.modelo.comando(f"T{sp}")
+        novas = planta.avancar(rampa.periodo)
+        linhas.append(novas)
+        rampa.atualizar(novas)
+        if rampa.concluida(planta.t):
+            break
+    t_ok, excesso = assentamento(np.concatenate(linhas), alvo, inicio, rampa.perfil.sinal)
+    return planta.t - inicio, t_ok, max(excesso, rampa.excesso)
+
+
+def varredura(f):
+    alvos = [SP_INICIAL] + SETPOINTS + [SP_INICIAL, 0.0]
+    atual = 0.0
+    resultados = []
+    for alvo in alvos:
+        if alvo != atual:
+            resultados.append((atual, alvo, *f(atual, alvo)))
+        atual = alvo
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rampa em degraus x malha fechada")
+    parser.add_argument("--perfil", choices=PERFIS, default="s")
+    parser.add_argument("--aceleracao", type=float, default=ACELERACAO, help="rad/s²")
+    parser.add_argument("--tau", type=float, default=TAU, help="constante de tempo do modelo [s]")
+    args = parser.parse_args()
+
+    planta = Planta(args.tau)
+    antiga = varredura(lambda a, b: rampa_degraus(planta, a, b))
+    planta = Planta(args.tau)
+    nova = varredura(lambda a, b: rampa_malha_fechada(planta, a, b, args.perfil, args.aceleracao))
+
+    print(f"perfil {args.perfil}, {args.aceleracao:g} rad/s², {TAXA_COMANDOS:g} Hz, "
+          f"tolerância ±{TOLERANCIA:g} rad/s, tau {args.tau:g} s")
+    print(f"{'de':>7} {'para':>7} | {'degraus: dur':>12} {'assent.':>8} {'exc.':>5} | "
+          f"{'malha: dur':>10} {'assent.':>8} {'exc.':>5}")
+    for (a, b, d0, s0, e0), (_, _, d1, s1, e1) in zip(antiga, nova):
+        print(f"{a:7.2f} {b:7.2f} | {d0:12.2f} {s0:8.2f} {e0:5.2f} | {d1:10.2f} {s1:8.2f} {e1:5.2f}")
+    total0 = sum(r[2] for r in antiga)
+    total1 = sum(r[2] for r in nova)
+    print(f"total das rampas: degraus {total0:.1f} s, malha fechada {total1:.1f} s "
+          f"({total0 - total1:.1f} s a menos por varredura)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,72 @@
+import argparse
 import serial
 import time
 import matplotlib.pyplot as plt
 import sys
-import msvcrt  # detectar ENTER sem travar
+try:
+    import msvcrt  # detectar ENTER sem travar (Windows)
+except ImportError:
+    msvcrt = None
+
+from amostras import AmostrasColunares
+from conexao import Conexao, zerar_ads
+from leitura_serial import LeitorSerial
+from metricas import instrumentar
+from ensaio_async import aquisitar_async
+from rampa import RampaMalhaFechada, executar_rampa
+from estatistica_online import DwellAdaptativo
+from gravacao import COLUNAS, FASE_PATAMAR, novo_gravador
+from ajuste_calibracao import formatar_polinomio
+from registro_calibracao import FORMATO_DATA, RegistroCalibracao, coef_load_de, coeficientes, obter_calibracao
+from resumo_ensaio import ResumoPatamares
+from plot_ao_vivo import PlotAoVivo
+from tempo_amostras import ReconstrutorTempo
 
 # === CONFIGURAÇÕES Serial ===
 PORTA = "COM6"
 BAUD = 230400
 TIMEOUT = 0.01
-espera = 15.0     # segundos para garantir inicialização
+PROTOCOLO = "ascii"   # "ascii" (texto) ou "binario" (frames com seq e CRC)
+TAXA_NOMINAL = None   # amostras/s do firmware; None estima na primeira janela
+espera = 15.0     # segundos máximos até o fluxo começar (conexao.py; pronto antes disso, segue)
 
 # === CONFIGURAÇÕES Calibração ===
 TEMPO_CALIBRACAO = 2  # segundos por massa
 massas = [4.66, 10.75, 16.59, 23.96, 28.62, 33.63, 38.00]  # g
 braco = 26 + 15  # mm → torque
+MUX = 0          # canal do ADS1256: 0 = DIFF_0_1 (comando M0), 1 = DIFF_2_3 (M1)
+GRAU_CALIBRACAO = 1      # grau do polinômio torque x ADC
+PESOS_CALIBRACAO = None  # None, "n" (amostras por massa) ou "variancia" (n/s²)
 
 # === CONFIGURAÇÕES Ensaio ===
 TEMPO_AQUISICAO = 5.0
 TEMPO_ZERO = 5.0
-RAMPA_STEP = 5
-RAMPA_DELAY = 1
+PGA = 64                  # ganho do ADS1256 configurado no firmware (setPGA(PGA_64))
+FORMATO_SAIDA = "colunar" # "colunar" (binário, gravado em chunks) ou "txt"
+PLOT_AO_VIVO = True       # gráfico ao vivo em outro processo (plot_ao_vivo.py)
+ENSAIO_ASYNC = True       # grava também rampas e holds (ensaio_async.py)
+
+# === CONFIGURAÇÕES Rampa (rampa.py) ===
+RAMPA_PERFIL = "s"          # "linear" ou "s" (curva S, sem degrau de aceleração)
+RAMPA_ACELERACAO = 20.0     # rad/s² (0 -> 209 rad/s em ~11 s; antes 5 rad/s por segundo)
+RAMPA_JERK = 80.0           # rad/s³ (só na curva S)
+RAMPA_TAXA = 20.0           # Hz de envio dos setpoints do perfil
+RAMPA_TOLERANCIA = 1.0      # rad/s: a rampa acaba com o VelReal dentro de alvo ± tolerância...
+RAMPA_ASSENTAMENTO = 0.5    # ...por este tempo [s]
+RAMPA_TIMEOUT = 10.0        # s após o perfil; depois segue com aviso
+
+# === CONFIGURAÇÕES Dwell adaptativo ===
+DWELL_ADAPTATIVO = True   # encerra o patamar quando a média converge (senão TEMPO_AQUISICAO fixo)
+DWELL_MIN = 2.0           # s mínimos por setpoint
+DWELL_MAX = 15.0          # s máximos por setpoint
+ALVO_ERRO_V1 = 5.0        # erro padrão alvo da média de V1 [contagens do ADC]
+ALVO_ERRO_VELREAL = 0.01  # erro padrão alvo da média de VelReal [rad/s]
+
+# === CONFIGURAÇÕES Resumo Cp x TSR (mesmos valores do plot_v1-0.py) ===
+D_ROTOR = 22e-2           # metros
+V_VENTO = 7.0             # m/s
+RHO = 1.225               # kg/m³
+COEF_LOAD = None          # [a, b] em N.m por contagem; None usa a calibração da opção 1 ou a do registro
 
 setpoints = [
                  73.30,   # 700 rpm
@@ -58,84 +105,128 @@ def spinner(i):
     return símbolos[i % len(símbolos)]
 
 # ============================================================
-# LEITURA DE LINHA
+# COLETA SEM ATRASO + TELEMETRIA EM TEMPO REAL (SOMENTE ENSAIO)
 # ============================================================
 
-def ler_linha(ser):
-    try:
-        linha = ser.readline()
-        if not linha:
-            return None
-        linha = linha.decode("utf-8", errors="ignore").strip()
-        if not linha:
-            return None
-        return [float(x) for x in linha.split("\t")]
-    except:
-        return None
+# taxa de referência compartilhada entre as janelas da sessão
+reconstrutor = ReconstrutorTempo(TAXA_NOMINAL)
 
-# ============================================================
-# COLETA SEM ATRASO + TELEMETRIA EM TEMPO REAL (SOMENTE ENSAIO)
-# ============================================================
+def novo_dwell():
+    """Critério de parada do patamar (colunas do buffer: 2 = VelReal, 7 = V1)."""
+    return DwellAdaptativo({"V1": (7, ALVO_ERRO_V1), "VelReal": (2, ALVO_ERRO_VELREAL)},
+                           DWELL_MIN, DWELL_MAX)
+
+def nova_rampa(atual, alvo, inicio):
+    """Rampa em malha fechada no VelReal com as configurações acima."""
+    return RampaMalhaFechada(atual, alvo, inicio, RAMPA_PERFIL, RAMPA_ACELERACAO, RAMPA_JERK,
+                             RAMPA_TAXA, RAMPA_TOLERANCIA, RAMPA_ASSENTAMENTO, RAMPA_TIMEOUT)
 
-def coletar_janela(ser, duracao_s, sp=None):
+def coletar_janela(leitor, duracao_s, sp=None, dwell=None, destino=None, chave=None, fixas=None):
     """
-    Coleta dados reais durante duracao_s segundos,
-    drenando o buffer por completo e mostrando telemetria
-    em tempo real (opção 2) somente quando sp != None.
+    Coleta a janela de duracao_s segundos a partir do buffer
+    da thread de leitura, mostrando telemetria em tempo real
+    (opção 2) somente quando sp != None.
+
+    Com dwell (DwellAdaptativo), a duração é decidida por ele: a
+    janela acaba quando o erro padrão das médias atinge o alvo.
+
+    Retorna (resultados, info). resultados é um array NumPy com
+    tempo reconstruído + 8 campos + tempo de chegada do bloco por
+    linha; com destino (AmostrasColunares), é a vista das linhas
+    acrescentadas nele (com a chave e as colunas de fixas), no layout
+    das colunas do destino. info traz taxa estimada, deriva, lacunas, o backlog
+    máximo da porta na janela e, com dwell, o tempo de patamar e a
+    incerteza atingida.
+
+    A leitura da serial nunca para: aqui só se marca o início
+    da janela, espera-se o tempo e recolhe-se o que chegou.
     """
 
-    ser.reset_input_buffer()  
-    time.sleep(0.002)
+    buffer = leitor.buffer
+    metricas = leitor.metricas
+    laco = metricas.laco("coletar_janela")
+    leitor.zerar_backlog()
+    if sp is not None:
+        metricas.abrir_janela()
+    inicio = buffer.marca()
+    cursor = inicio
 
     t0 = time.time()
-    resultados = []
-    in_waiting_max = 0
-    
     ultimo_print = t0
+    total_print = inicio
     intervalo_print = 0.8  # no máximo 10 Hz para evitar acumulo de backlog
 
-    while time.time() - t0 < duracao_s:
-
-        # maior backlog observado
-        if ser.in_waiting > in_waiting_max:
-            in_waiting_max = ser.in_waiting
-
-        # drena
-        while ser.in_waiting > 0:
-            dados = ler_linha(ser)
-            if dados and len(dados) >= 8:
-                timestamp = time.time()
-                resultados.append([timestamp] + dados)
-
-                # Telemetria SOMENTE no modo ensaio (sp != None)
-                if sp is not None:
-                    agora = timestamp
-                    if agora - ultimo_print >= intervalo_print:
-                        sys.stdout.write("\r"
-                            f"SP={sp:.2f} | "
-                            f"VelSet={dados[0]:.2f} | VelReal={dados[1]:.2f} | "
-                            f"Pos={dados[2]:.4f} | "
-                            f"Ax={dados[3]:.4f} | Ay={dados[4]:.4f} | Az={dados[5]:.4f} | "
-                            f"V1={dados[6]:.4f} | V2={dados[7]:.4f}       "
-                        )
-                        sys.stdout.flush()
-                        ultimo_print = agora
+    while True:
+        laco.iteracao()
+        decorrido = time.time() - t0
+        if dwell is not None:
+            fim = buffer.marca()
+            dwell.atualizar(buffer.intervalo(cursor, fim))
+            cursor = fim
+            if dwell.concluido(decorrido):
+                break
+        elif decorrido >= duracao_s:
+            break
+        time.sleep(0.02)
+
+        # Telemetria SOMENTE no modo ensaio (sp != None)
+        if sp is not None:
+            agora = time.time()
+            ultima = buffer.ultima()
+            if ultima is not None and agora - ultimo_print >= intervalo_print:
+                with metricas.tempo("console"):
+                    dados = ultima[1:]
+                    total = buffer.marca()
+                    sys.stdout.write("\r"
+                        f"SP={sp:.2f} | "
+                        f"VelSet={dados[0]:.2f} | VelReal={dados[1]:.2f} | "
+                        f"Pos={dados[2]:.4f} | "
+                        f"Ax={dados[3]:.4f} | Ay={dados[4]:.4f} | Az={dados[5]:.4f} | "
+                        f"V1={dados[6]:.4f} | V2={dados[7]:.4f} | "
+                        f"{(total - total_print) / (agora - ultimo_print):.0f} amostras/s | "
+                        f"backlog {leitor.in_waiting_max} B       "
+                    )
+                    sys.stdout.flush()
+                ultimo_print, total_print = agora, total
+
+    if sp is not None:
+        metricas.fechar_janela()
+    amostras = buffer.intervalo(inicio, buffer.marca())
+    tempos, info = reconstrutor.reconstruir(amostras[:, 0])
+    if destino is None:
+        destino = AmostrasColunares(capacidade=len(amostras))
+    resultados = destino.reservar(len(amostras), chave, fixas)
+    k = destino.indice("VelSet")
+    resultados[:, destino.indice("TimeStamp")] = tempos
+    resultados[:, k:k + amostras.shape[1] - 1] = amostras[:, 1:]
+    resultados[:, destino.indice("TempoChegada")] = amostras[:, 0]
+    info["in_waiting_max"] = leitor.in_waiting_max
+    if dwell is not None:
+        info.update(dwell.resumo())
 
     print()  # pular linha
-    return resultados, in_waiting_max
+    if info["lacunas"] or info["deriva_alta"]:
+        print(f" Atenção: {info['lacunas']} lacuna(s) (~{info['amostras_faltando']} amostras), "
+              f"taxa {info['taxa_estimada']:.1f} amostras/s (deriva {100 * info['deriva']:+.2f}%)")
+    return resultados, info
 
 # ============================================================
 # CALIBRAÇÃO
 # ============================================================
 
-def calibrar(ser, massas):
+def calibrar(leitor, massas, plot=None):
+    """
+    Com plot (PlotAoVivo), as amostras de cada massa vão para o
+    processo do gráfico; sem ele, o gráfico é desenhado aqui mesmo.
+    """
     input("\nPressione ENTER para iniciar a calibração...")
 
     leituras = []
-    todas_amostras = []
+    todas_amostras = AmostrasColunares(["Massa[g]", *COLUNAS[1:11]], coluna_chave="Massa[g]")
 
-    plt.ion()
-    fig, ax = plt.subplots(figsize=(7,5))
+    if plot is None:
+        plt.ion()
+        fig, ax = plt.subplots(figsize=(7,5))
 
     i = 0
     while i < len(massas):
@@ -145,22 +236,22 @@ def calibrar(ser, massas):
 
         if resposta.lower() == "d" and i > 0:
             ultima_massa = massas[i-1]
-            todas_amostras = [am for am in todas_amostras if am[0] != ultima_massa]
+            todas_amostras.descartar(ultima_massa)
             leituras.pop()
             i -= 1
+            if plot is not None:
+                plot.descartar(ultima_massa)
             print(f" Medição da massa {ultima_massa} g descartada.")
             continue
         else:
             print(f"Medição para {m} g...")
 
         # coleta sem atraso (sem telemetria)
-        amostras, _ = coletar_janela(ser, TEMPO_CALIBRACAO, sp=None)
-
-        for a in amostras:
-            todas_amostras.append([m, a[7]])  # a[7] = V1 original
+        amostras, _ = coletar_janela(leitor, TEMPO_CALIBRACAO, sp=None, destino=todas_amostras, chave=m)
+        v1 = amostras[:, todas_amostras.indice("V1")]
 
         n = len(amostras)
-        media = sum(a[7] for a in amostras) / n if n else 0
+        media = v1.mean() if n else 0
 
         if len(leituras) > i:
             leituras[i] = media
@@ -169,197 +260,274 @@ def calibrar(ser, massas):
 
         print(f"Massa {m} g -> média leitura: {media:.4f}")
 
-        # gráfico igual antes
-        ax.clear()
-        ax.set_xlabel("Massa [g]")
-        ax.set_ylabel("Leitura [int]")
-        ax.set_title("Calibração da célula de carga - Canal 1")
-        ax.grid(True, linestyle="--", alpha=0.6)
+        if plot is not None:
+            plot.massa(m, v1)
+        else:
+            # gráfico igual antes
+            ax.clear()
+            ax.set_xlabel("Massa [g]")
+            ax.set_ylabel("Leitura [int]")
+            ax.set_title("Calibração da célula de carga - Canal 1")
+            ax.grid(True, linestyle="--", alpha=0.6)
 
-        massas_plot = [am[0] for am in todas_amostras]
-        tensoes_plot = [am[1] for am in todas_amostras]
-        ax.scatter(massas_plot, tensoes_plot, s=15, alpha=0.5)
+            ax.scatter(todas_amostras.coluna("Massa[g]"), todas_amostras.coluna("V1"), s=15, alpha=0.5)
 
-        ax.plot(massas[:len(leituras)], leituras, "o-", color="tab:red")
-        plt.pause(0.05)
+            ax.plot(massas[:len(leituras)], leituras, "o-", color="tab:red")
+            plt.pause(0.05)
 
         if i == len(massas) - 1:
             escolha = input("\nÚltima medida concluída. Pressione ENTER para concluir ou 'd' para descartar a última: ").lower()
             if escolha == "d":
-                todas_amostras = [am for am in todas_amostras if am[0] != m]
+                todas_amostras.descartar(m)
                 leituras.pop()
+                if plot is not None:
+                    plot.descartar(m)
                 continue
             else:
-                print(" Concluindo calibração, feche a janela do gráfico...")
+                if plot is None:
+                    print(" Concluindo calibração, feche a janela do gráfico...")
                 i += 1
         else:
             i += 1
 
-    plt.ioff()
-    plt.show()
+    if plot is None:
+        plt.ioff()
+        plt.show()
 
     nome = f"calibracao_samples_{time.strftime('%Y%m%d_%H%M%S')}.txt"
     with open(nome, "w") as f:
-        f.write("Massa[g]\tTorque[N.mm]\tLeitura[int]\n")
-        for m, v in todas_amostras:
-            f.write(f"{m}\t{m*braco*9.81*(1e-3):5f}\t{v}\n")
+        f.write("Massa[g]\tTorque[N.mm]\tLeitura[int]\tMUX\n")
+        for m, v in zip(todas_amostras.coluna("Massa[g]").tolist(), todas_amostras.coluna("V1").tolist()):
+            f.write(f"{m}\t{m*braco*9.81*(1e-3):5f}\t{v}\t{MUX}\n")
 
     print(f"\n Amostras da calibração salvas em {nome}")
-    return "ok"
+    return nome
 
 # ============================================================
 # RAMPA
 # ============================================================
 
-def aplicar_rampa(ser, atual, alvo):
-    if atual == alvo:
-        return alvo
-
-    passo = RAMPA_STEP if alvo > atual else -RAMPA_STEP
-    sp = atual
-
-    while (passo > 0 and sp < alvo) or (passo < 0 and sp > alvo):
-        sp += passo
-        if (passo > 0 and sp > alvo) or (passo < 0 and sp < alvo):
-            sp = alvo
-        ser.write(f"T{sp}\n".encode())
-        
-        sys.stdout.write(f"\rAplicando rampa [rad/s]: {sp} ")
-        sys.stdout.flush()
-        time.sleep(RAMPA_DELAY)
-
-    return alvo
+def aplicar_rampa(leitor, atual, alvo):
+    """Perfil de RAMPA_ACELERACAO até alvo; volta quando o VelReal assenta."""
+    return executar_rampa(leitor, atual, alvo, nova_rampa)
 
 # ============================================================
 # AQUISIÇÃO DOS SETPOINTS
 # ============================================================
 
-def aquisitar_varios_setpoints(ser, setpoints, tempo, sp_inicial, atual):
-    dados_gerais = []
-
+def aquisitar_varios_setpoints(leitor, gravador, setpoints, tempo, sp_inicial, atual, resumo=None):
+    """
+    Executa o ensaio; cada janela vai direto para o gravador,
+    sem acumular o ensaio inteiro em memória. Com resumo
+    (ResumoPatamares), cada setpoint concluído entra na tabela Cp x TSR.
+    """
     print(f"\nAplicando rampa até {sp_inicial} rad/s...")
-    atual = aplicar_rampa(ser, atual, sp_inicial)
+    atual = aplicar_rampa(leitor, atual, sp_inicial)
 
     print(f"\nSetpoint inicial atingido: {sp_inicial} rad/s")
     print("Aperte ENTER para começar o ensaio.")
 
-    while True:
-        if msvcrt.kbhit() and msvcrt.getwch() == "\r":
-            break
-        time.sleep(0.05)
+    if msvcrt is not None:
+        while True:
+            if msvcrt.kbhit() and msvcrt.getwch() == "\r":
+                break
+            time.sleep(0.05)
+    else:
+        input()
 
     # TEMPO ZERO (ESPERA, SEM COLETA)
     print(f"\nHold inicial por {TEMPO_ZERO}s...")
 
-    # descarta tudo que está no buffer antes do hold
-    ser.reset_input_buffer()
-    time.sleep(0.002)
-
     t0 = time.time()
     i_spin = 0
+    laco = leitor.metricas.laco("hold")
     while time.time() - t0 < TEMPO_ZERO:
+        laco.iteracao()
         restante = TEMPO_ZERO - (time.time() - t0)
-        sys.stdout.write(f"\rAguardando estabilização: {restante:4.1f}s {spinner(i_spin)}  ")
-        sys.stdout.flush()
+        with leitor.metricas.tempo("console"):
+            sys.stdout.write(f"\rAguardando estabilização: {restante:4.1f}s {spinner(i_spin)}  ")
+            sys.stdout.flush()
         i_spin += 1
         time.sleep(0.05)
 
     print("\rHold concluído.                                 ")
 
     # ENSAIO PRINCIPAL
+    # uma janela por vez no layout do gravador, reaproveitando a mesma memória
+    janela = AmostrasColunares(COLUNAS, coluna_chave="Setpoint")
+    canais = slice(janela.indice("VelSet"), janela.indice("V2") + 1)
     for sp in setpoints:
-        atual = aplicar_rampa(ser, atual, sp)
+        atual = aplicar_rampa(leitor, atual, sp)
 
         print(f"\r--- Setpoint {sp} rad/s ---           ")
-        amostras, _ = coletar_janela(ser, tempo, sp=sp)
+        dwell = novo_dwell() if DWELL_ADAPTATIVO else None
+        janela.limpar()
+        amostras, info = coletar_janela(leitor, tempo, sp=sp, dwell=dwell,
+                                        destino=janela, chave=sp, fixas={"Fase": FASE_PATAMAR})
+        gravador.registrar_janela({"setpoint": sp, **info})
+        gravador.adicionar(amostras)
 
-        for a in amostras:
-            dados_gerais.append([sp] + a)
+        if resumo is not None:
+            resumo.adicionar(sp, amostras[:, canais])
+            resumo.fechar_patamar(sp)
 
-    return dados_gerais, atual
+    return atual
 
 # ============================================================
-# SALVA TXT
+# METADADOS DO ENSAIO
 # ============================================================
 
-def salvar_txt(dados):
-    nome = f"aquisicao_{time.strftime('%Y%m%d_%H%M%S')}.txt"
-    with open(nome, "w") as f:
-        f.write("Setpoint\tTimeStamp\tVelSet\tVelReal\tPos\tAx\tAy\tAz\tV1\tV2\n")
-        for linha in dados:
-            f.write("\t".join(str(x) for x in linha) + "\n")
-    print(f"\n Dados salvos em {nome}")
+def metadados_ensaio(ser, sp_inicial, arquivo_calibracao, calibracao=None, firmware=None):
+    return {
+        "setpoints": setpoints,
+        "sp_inicial": sp_inicial,
+        "pga": PGA,
+        "mux": MUX,
+        "porta": ser.port,
+        "baud": ser.baudrate,
+        "protocolo": PROTOCOLO,
+        "firmware": firmware or {},  # banners do setup (conexao.py)
+        "tempo_aquisicao": TEMPO_AQUISICAO,
+        "tempo_zero": TEMPO_ZERO,
+        "dwell": {
+            "adaptativo": DWELL_ADAPTATIVO,
+            "min_s": DWELL_MIN,
+            "max_s": DWELL_MAX,
+            "alvo_erro_V1": ALVO_ERRO_V1,
+            "alvo_erro_VelReal": ALVO_ERRO_VELREAL,
+        },
+        "rampa": {
+            "perfil": RAMPA_PERFIL,
+            "aceleracao": RAMPA_ACELERACAO,
+            "jerk": RAMPA_JERK,
+            "taxa_hz": RAMPA_TAXA,
+            "tolerancia": RAMPA_TOLERANCIA,
+            "assentamento_s": RAMPA_ASSENTAMENTO,
+        },
+        "calibracao": {
+            "arquivo": arquivo_calibracao,  # None se não houve calibração nesta sessão
+            "registro": calibracao["chave"] if calibracao else None,  # entrada usada (calibracoes.json)
+            "massas": massas,
+            "braco_mm": braco,
+        },
+    }
 
 # ============================================================
 # MENU PRINCIPAL
 # ============================================================
 
 def main():
-    with serial.Serial(PORTA, BAUD, timeout=TIMEOUT) as ser:
-        t0 = time.time()
-        i_spin = 0
-
-        while time.time() - t0 < espera:
-            sys.stdout.write(f"\rGarantindo inicialização... {(espera-(time.time() - t0)):4.1f} {spinner(i_spin)}  ")
-            sys.stdout.flush()
-            i_spin += 1
-            time.sleep(0.05)
-
-        print(f"\rConectado em {PORTA} @ {BAUD}                                          ")
-
-        while True:
-            print("\n=== MENU ===")
-            print("1 - Calibração")
-            print("2 - Ensaio")
-            print("3 - Sair")
-            op = input("Escolha: ")
-
-            if op == "1":
-                print("Iniciando calibração...")
-                ser.write(b"M3\n") #zera o ads
-                time.sleep(3)
-                ser.write(b"M0\n") #volta pro modo normal canal 0
-                time.sleep(3)
-                calibrar(ser, massas)
-
-            elif op == "2":
-                atual = 0
-
-                while True:
-                    print("Iniciando ensaio...")
-                    ser.write(b"M3\n") #zera o ads
-                    time.sleep(3)
-                    ser.write(b"M0\n") #volta pro modo normal canal 0
-                    time.sleep(3)
-                    sp_inicial = float(input("\nDigite o SETPOINT inicial (rad/s): "))
-
-                    dados, ultimo_sp = aquisitar_varios_setpoints(
-                        ser, setpoints, TEMPO_AQUISICAO, sp_inicial, atual
-                    )
-
-                    salvar_txt(dados)
-
-                    print("\n Voltando para o set inicial...")
-                    aplicar_rampa(ser, ultimo_sp, sp_inicial)
-                    atual = sp_inicial
-
-                    repetir = input("\nDeseja fazer outro ensaio? (s/n): ").lower()
-                    if repetir != "s":
-                        tunel = input("\nDesligue o túnel. Desligado? (s/n): ").lower()
-                        while tunel != "s":
-                            tunel = input("Desligue o túnel. Desligado? (s/n): ").lower()
-                        break
-
-                print("\nEncerrando... aplicando rampa até 0 rpm")
-                aplicar_rampa(ser, atual, 0)
-                ser.write(b"T0\n")
-
-            elif op == "3":
-                print("Saindo...")
-                break
-
-            else:
-                print("Opção inválida.")
+    parser = argparse.ArgumentParser(description="Calibração e ensaio do dinamômetro.")
+    parser.add_argument("--porta", default=PORTA,
+                        help="porta serial (ex: COM6, /dev/ttyUSB0 ou o pty do simulador.py)")
+    parser.add_argument("--baud", type=int, default=BAUD)
+    parser.add_argument("--metricas", help="exporta métricas da aquisição (.prom = Prometheus, senão JSON-lines)")
+    parser.add_argument("--perfil", type=int, metavar="N", help="cProfile da N-ésima janela de ensaio")
+    args = parser.parse_args()
+
+    with serial.Serial(args.porta, args.baud, timeout=TIMEOUT) as ser:
+        leitor = LeitorSerial(ser, protocolo=PROTOCOLO)
+        leitor.start()
+        exportador = instrumentar(leitor, args.metricas, args.perfil)
+        plot = PlotAoVivo(leitor).start() if PLOT_AO_VIVO else None
+        try:
+            def progresso(decorrido):
+                sys.stdout.write(f"\rAguardando o dinamômetro... {decorrido:4.1f}s {spinner(int(decorrido / 0.05))}  ")
+                sys.stdout.flush()
+
+            conexao = Conexao(leitor)
+            conexao.aguardar_pronto(espera, progresso)
+            print(f"\rConectado em {ser.port} @ {ser.baudrate}                                          ")
+            if "pga" in conexao.info:
+                print(f"Firmware: PGA {conexao.info['pga']}, MUX {conexao.info.get('mux')}, "
+                      f"DRATE {conexao.info.get('drate')}")
+                if isinstance(conexao.info["pga"], int) and 2 ** conexao.info["pga"] != PGA:
+                    print(f"[aviso] PGA do firmware (x{2 ** conexao.info['pga']}) diferente de PGA = {PGA}")
+
+            arquivo_calibracao = None
+
+            while True:
+                print("\n=== MENU ===")
+                print("1 - Calibração")
+                print("2 - Ensaio")
+                print("3 - Sair")
+                op = input("Escolha: ")
+
+                if op == "1":
+                    print("Iniciando calibração...")
+                    zerar_ads(conexao, MUX)  # M3 (SELFCAL) e volta ao canal MUX, confirmados pelo fluxo
+                    arquivo_calibracao = calibrar(leitor, massas, plot)
+                    calibracao, _ = obter_calibracao([arquivo_calibracao], braco, PGA, grau=GRAU_CALIBRACAO,
+                                                     pesos=PESOS_CALIBRACAO, mux=MUX)
+                    print(f" Calibração registrada: T = {formatar_polinomio(coeficientes(calibracao))} "
+                          f"(R² = {calibracao['r2']:.5f})")
+
+                elif op == "2":
+                    atual = 0
+
+                    while True:
+                        print("Iniciando ensaio...")
+                        zerar_ads(conexao, MUX)
+                        sp_inicial = float(input("\nDigite o SETPOINT inicial (rad/s): "))
+
+                        # calibração: a desta sessão ou a mais recente do registro (sem reajustar)
+                        calibracao = None
+                        if COEF_LOAD is None:
+                            if arquivo_calibracao is not None:
+                                calibracao, _ = obter_calibracao([arquivo_calibracao], braco, PGA, grau=GRAU_CALIBRACAO,
+                                                                 pesos=PESOS_CALIBRACAO, mux=MUX)
+                            else:
+                                calibracao = RegistroCalibracao().por_data(time.strftime(FORMATO_DATA), PGA, MUX)
+                            if calibracao is not None:
+                                print(f"Calibração de {calibracao['data']}: T = {formatar_polinomio(coeficientes(calibracao))}")
+                        coef = coef_load_de(calibracao) if calibracao else COEF_LOAD
+                        resumo = ResumoPatamares(coef, RHO, V_VENTO, D_ROTOR)
+
+                        # grava conforme coleta; um Ctrl-C ou queda mantém o que já foi gravado
+                        with novo_gravador(FORMATO_SAIDA, metadados_ensaio(ser, sp_inicial, arquivo_calibracao, calibracao, conexao.info)) as gravador:
+                            try:
+                                if ENSAIO_ASYNC:
+                                    ultimo_sp = aquisitar_async(
+                                        leitor, gravador, reconstrutor, setpoints, TEMPO_AQUISICAO,
+                                        sp_inicial, atual, TEMPO_ZERO, nova_rampa,
+                                        novo_dwell=novo_dwell if DWELL_ADAPTATIVO else None, resumo=resumo
+                                    )
+                                else:
+                                    ultimo_sp = aquisitar_varios_setpoints(
+                                        leitor, gravador, setpoints, TEMPO_AQUISICAO, sp_inicial, atual, resumo
+                                    )
+                            finally:
+                                resumo.salvar(gravador.caminho)   # também os patamares de um ensaio interrompido
+
+                        print("\n Voltando para o set inicial...")
+                        aplicar_rampa(leitor, ultimo_sp, sp_inicial)
+                        atual = sp_inicial
+
+                        repetir = input("\nDeseja fazer outro ensaio? (s/n): ").lower()
+                        if repetir != "s":
+                            tunel = input("\nDesligue o túnel. Desligado? (s/n): ").lower()
+                            while tunel != "s":
+                                tunel = input("Desligue o túnel. Desligado? (s/n): ").lower()
+                            break
+
+                    print("\nEncerrando... aplicando rampa até 0 rpm")
+                    aplicar_rampa(leitor, atual, 0)
+                    ser.write(b"T0\n")
+
+                elif op == "3":
+                    print("Saindo...")
+                    break
+
+                else:
+                    print("Opção inválida.")
+        finally:
+            # também num Ctrl-C ou erro no meio do ensaio: o exportador grava
+            # as métricas finais e a thread do leitor não fica presa na serial
+            if plot is not None:
+                plot.parar()
+            leitor.parar()
+            if exportador is not None:
+                exportador.parar()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,145 @@
+"""
+Leitura rápida dos arquivos de texto (aquisicao_*.txt, calibracao_*.txt)
+com cache binário.
+
+    - separador decidido pelo cabeçalho (tab, vírgula ou espaços),
+      sem tentar um e cair no outro por exceção;
+    - só as colunas pedidas são convertidas, com dtypes compactos
+      (float32 onde não se perde nada, float64 nos tempos, setpoint e Pos);
+    - as colunas convertidas ficam em <arquivo>.cache/ ao lado do
+      original, uma .npy por coluna; a próxima abertura é um np.load
+      memory-mapped. O cache vale enquanto o tamanho e o mtime do
+      original forem os mesmos; colunas pedidas depois são convertidas
+      e acrescentadas ao cache.
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+# === CONFIGURAÇÕES Carregador ===
+SUFIXO_CACHE = ".cache"
+DTYPE_PADRAO = "float32"   # VelSet, VelReal, acelerações, V1 (24 bits cabe exato), V2...
+DTYPES = {
+    "Setpoint": "float64",      # agrupado por valor: mantém o que foi gravado
+    "TimeStamp": "float64",     # segundos epoch precisam de float64
+    "Pos": "float64",           # ângulo acumulado, cresce sem limite (Pos % 2π no azimute e na vibração)
+    "TempoChegada": "float64",
+    "Massa[g]": "float64",
+    "Torque[N.mm]": "float64",
+    "Leitura[int]": "float64",
+}
+
+
+def detectar_separador(cabecalho):
+    if "\t" in cabecalho:
+        return "\t"
+    if "," in cabecalho:
+        return ","
+    return r"\s+"
+
+
+def ler_cabecalho(arquivo):
+    with open(arquivo, encoding="utf-8", errors="replace") as f:
+        cabecalho = f.readline().rstrip("\r\n")
+    sep = detectar_separador(cabecalho)
+    nomes = cabecalho.split() if sep == r"\s+" else [n.strip() for n in cabecalho.split(sep)]
+    return sep, nomes
+
+# ============================================================
+# CACHE
+# ============================================================
+
+def _pasta_cache(arquivo):
+    return arquivo + SUFIXO_CACHE
+
+
+def _assinatura(arquivo):
+    st = os.stat(arquivo)
+    return {"tamanho": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def _ler_meta_cache(arquivo):
+    caminho = os.path.join(_pasta_cache(arquivo), "meta.json")
+    try:
+        with open(caminho, encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if meta.get("origem") != _assinatura(arquivo):
+        return None   # original mudou: cache inválido
+    return meta
+
+
+def _gravar_cache(arquivo, meta, colunas):
+    pasta = _pasta_cache(arquivo)
+    os.makedirs(pasta, exist_ok=True)
+    for nome, valores in colunas.items():
+        indice = meta["nomes"].index(nome)
+        np.save(os.path.join(pasta, f"{indice}.npy"), valores)   # índice: nomes podem ter [ ] . /
+        meta["colunas"][nome] = str(valores.dtype)
+    tmp = os.path.join(pasta, "meta.json.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, os.path.join(pasta, "meta.json"))
+
+# ============================================================
+# LEITURA
+# ============================================================
+
+def _resolver(colunas, nomes, opcionais):
+    """Posições ou nomes -> nomes do cabeçalho, na ordem pedida."""
+    if colunas is None:
+        return list(nomes)
+    resolvidas = []
+    for c in colunas:
+        if isinstance(c, int):
+            resolvidas.append(nomes[c])
+        elif c in nomes:
+            resolvidas.append(c)
+        elif c not in opcionais:
+            raise KeyError(f"Coluna {c!r} não existe em {nomes}")
+    return resolvidas
+
+
+def carregar_txt(arquivo, colunas=None, opcionais=(), cache=True):
+    """
+    Lê um arquivo de texto com cabeçalho e devolve um DataFrame só com
+    as colunas pedidas (nomes ou posições; None = todas). Colunas em
+    opcionais que não existirem no arquivo são ignoradas.
+    """
+    sep, nomes = ler_cabecalho(arquivo)
+    pedidas = _resolver(colunas, nomes, opcionais)
+
+    meta = _ler_meta_cache(arquivo) if cache else None
+    if meta is None:
+        meta = {"origem": _assinatura(arquivo), "separador": sep, "nomes": nomes, "colunas": {}}
+
+    # colunas ainda não convertidas, ou de um cache gravado com outro dtype
+    faltando = [c for c in pedidas if meta["colunas"].get(c) != DTYPES.get(c, DTYPE_PADRAO)]
+    if faltando:
+        dtypes = {c: DTYPES.get(c, DTYPE_PADRAO) for c in faltando}
+        try:
+            df = pd.read_csv(arquivo, sep=sep, usecols=faltando, dtype=dtypes)
+        except ValueError:
+            # linha corrompida no meio: o que não for número vira NaN
+            df = pd.read_csv(arquivo, sep=sep, usecols=faltando, dtype=str)
+            df = df.apply(pd.to_numeric, errors="coerce").astype(dtypes)
+        novas = {c: df[c].to_numpy() for c in faltando}
+        if cache:
+            try:
+                _gravar_cache(arquivo, meta, novas)
+            except OSError:
+                pass   # sem permissão de escrita ao lado do original: segue sem cache
+    else:
+        novas = {}
+
+    dados = {}
+    for c in pedidas:
+        if c in novas:
+            dados[c] = novas[c]
+        else:
+            indice = meta["nomes"].index(c)
+            dados[c] = np.load(os.path.join(_pasta_cache(arquivo), f"{indice}.npy"), mmap_mode="r")
+    return pd.DataFrame(dados, copy=False)
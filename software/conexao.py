@@ -0,0 +1,206 @@
+"""
+Prontidão do dinamômetro por handshake, no lugar das esperas fixas.
+
+Antes: 15 s fixos depois de abrir a porta e 3 s depois de cada M3
+(SELFCAL do ADS1256) e de cada M0/M1. Aqui a espera dura o que o
+firmware de fato precisa:
+
+    - início: os banners do setup ("MOT: ...", "Freio iniciado",
+      "Data rate: ...", "PGA:", "MUX:", "DRATE:") são interpretados e
+      o dispositivo está pronto quando chegam AMOSTRAS_FLUXO amostras
+      de 8 colunas depois do último banner (um reset do ESP32 ao abrir
+      a porta reinicia a contagem). Sem banners (placa já rodando),
+      basta o fluxo;
+    - troca de modo: o Commander ecoa o valor ("3.00") e o próprio
+      fluxo mostra o modo novo: no M3 e no M2 o ADS não é lido e o V1
+      congela; no M0/M1 ele volta a variar (descartando AMOSTRAS_DESCARTE
+      amostras da troca de MUX); no M2 os canais do acelerômetro variam.
+      Só contam amostras depois do eco (ou do envio, sem eco).
+
+Os timeouts (TIMEOUT_INICIO, TIMEOUT_MODO) são o antigo pior caso:
+estourados, segue com aviso, como antes.
+"""
+import time
+
+import numpy as np
+
+# === CONFIGURAÇÕES Conexão ===
+TIMEOUT_INICIO = 15.0     # s máximos até o fluxo começar (antigo `espera`)
+TIMEOUT_MODO = 3.0        # s máximos por troca de modo (antigo sleep)
+AMOSTRAS_FLUXO = 200      # amostras seguidas após o último banner
+AMOSTRAS_CONFIRMACAO = 40 # amostras com a assinatura do modo novo
+AMOSTRAS_DESCARTE = 20    # amostras logo após a troca de MUX (filtro do ADS assentando)
+INTERVALO = 0.02          # s entre verificações
+
+# colunas do buffer (chegada + 8 campos)
+COLUNA_V1 = 7
+COLUNAS_ACC = [4, 5, 6]
+MODOS = {0: "DIFF_0_1", 1: "DIFF_2_3", 2: "acelerômetro", 3: "SELFCAL"}
+
+# ============================================================
+# BANNERS DO FIRMWARE
+# ============================================================
+
+def interpretar_banner(linha, info):
+    """
+    Atualiza info com uma linha de texto do setup do firmware.
+    Retorna True se a linha é um banner (e não um eco de comando).
+    """
+    if linha.startswith("MOT:"):
+        texto = linha[4:].strip()
+        info.setdefault("motor", []).append(texto)
+        if texto.startswith("Ready"):
+            info["motor_pronto"] = True
+        elif "failed" in texto.lower():
+            info["motor_pronto"] = False
+    elif linha.startswith("Freio iniciado"):
+        info["freio"] = True
+    elif linha.startswith("ADXL345 não encontrado"):
+        info["adxl"] = False
+    elif linha.startswith("Data rate:"):
+        taxa, _, faixa = linha[len("Data rate:"):].partition("/")
+        info["adxl_taxa"] = taxa.strip()
+        info["adxl_faixa"] = faixa.replace("g-Range:", "").strip()
+    elif linha.split(":")[0] in ("PGA", "MUX", "DRATE"):
+        nome, _, valor = linha.partition(":")
+        try:
+            info[nome.lower()] = int(valor)
+        except ValueError:
+            info[nome.lower()] = valor.strip()
+    else:
+        return False
+    return True
+
+
+def eco(linha):
+    """Valor do eco do Commander ("3.00"), ou None."""
+    try:
+        return float(linha)
+    except ValueError:
+        return None
+
+# ============================================================
+# CONEXÃO
+# ============================================================
+
+class Conexao:
+    """Handshake sobre um LeitorSerial já rodando."""
+
+    def __init__(self, leitor):
+        self.leitor = leitor
+        self.info = {}              # dados dos banners
+        self.ultimo_banner = None   # chegada do último banner
+        self.ecos = []              # (chegada, valor) desde o último comando
+        self._visto = -np.inf       # chegada da última mensagem já lida
+
+    def _ler_mensagens(self):
+        # as linhas de um mesmo bloco têm a mesma chegada: filtra antes de avançar
+        novas = [m for m in list(self.leitor.mensagens) if m[0] > self._visto]
+        for chegada, texto in novas:
+            if interpretar_banner(texto, self.info):
+                self.ultimo_banner = chegada
+            else:
+                valor = eco(texto)
+                if valor is not None:
+                    self.ecos.append((chegada, valor))
+        if novas:
+            self._visto = novas[-1][0]
+
+    def aguardar_pronto(self, timeout=TIMEOUT_INICIO, progresso=None):
+        """
+        Espera o fluxo de amostras estabilizar. progresso(decorrido)
+        é chamado a cada verificação (spinner). Retorna True se pronto.
+        """
+        buffer = self.leitor.buffer
+        cursor = buffer.marca()
+        contagem = 0
+        banner = None
+        t0 = time.monotonic()
+        while time.monotonic() - t0 < timeout:
+            if self.leitor.erro is not None:
+                raise self.leitor.erro
+            self._ler_mensagens()
+            fim = buffer.marca()
+            novas = buffer.intervalo(cursor, fim)
+            cursor = fim
+            if self.ultimo_banner is not None:
+                if self.ultimo_banner != banner:   # banner novo (ex.: reset): recomeça
+                    banner, contagem = self.ultimo_banner, 0
+                novas = novas[novas[:, 0] > banner]
+            contagem += len(novas)
+            if contagem >= AMOSTRAS_FLUXO:
+                self.info["pronto_s"] = round(time.monotonic() - t0, 2)
+                return True
+            if progresso is not None:
+                progresso(time.monotonic() - t0)
+            time.sleep(INTERVALO)
+        print(f"\n[aviso] fluxo de amostras não estabilizou em {timeout:g}s")
+        return False
+
+    def enviar(self, comando, timeout=TIMEOUT_MODO):
+        """
+        Envia um comando do Commander (ex.: "G6") e espera o eco do
+        valor. Retorna True se o eco chegou.
+        """
+        self._ler_mensagens()
+        self.ecos = []
+        self.leitor.ser.write(f"{comando}\n".encode())
+        valor = eco(comando[1:])
+        t0 = time.monotonic()
+        while time.monotonic() - t0 < timeout:
+            time.sleep(INTERVALO)
+            self._ler_mensagens()
+            if any(v == valor for _, v in self.ecos):
+                return True
+        print(f"\n[aviso] sem eco do comando {comando} em {timeout:g}s")
+        return False
+
+    def trocar_modo(self, modo, timeout=TIMEOUT_MODO):
+        """Envia M{modo} e espera o fluxo confirmar. Retorna True se confirmado."""
+        modo = int(modo)
+        buffer, relogio = self.leitor.buffer, self.leitor.relogio
+        self._ler_mensagens()
+        self.ecos = []
+        cursor = buffer.marca()
+        envio = relogio.agora()
+        self.leitor.ser.write(f"M{modo}\n".encode())
+
+        partes = []
+        t0 = time.monotonic()
+        while time.monotonic() - t0 < timeout:
+            time.sleep(INTERVALO)
+            self._ler_mensagens()
+            fim = buffer.marca()
+            partes.append(buffer.intervalo(cursor, fim))
+            cursor = fim
+            referencia = next((c for c, v in self.ecos if v == modo), envio)
+            novas = np.concatenate(partes)
+            if confirma_modo(modo, novas[novas[:, 0] > referencia]):
+                self.info["modo"] = modo
+                return True
+        print(f"\n[aviso] troca para o modo {modo} ({MODOS.get(modo, '?')}) "
+              f"não confirmada pelo fluxo em {timeout:g}s")
+        return False
+
+
+def confirma_modo(modo, amostras):
+    """True se as amostras (chegadas após o comando) têm a assinatura do modo."""
+    if modo in (0, 1):
+        recentes = amostras[AMOSTRAS_DESCARTE:, COLUNA_V1]
+        return len(recentes) >= AMOSTRAS_CONFIRMACAO and np.ptp(recentes) > 0
+    if modo == 3:
+        recentes = amostras[-AMOSTRAS_CONFIRMACAO:, COLUNA_V1]
+        return len(recentes) == AMOSTRAS_CONFIRMACAO and np.ptp(recentes) == 0
+    if modo == 2:
+        recentes = amostras[AMOSTRAS_DESCARTE:]
+        return len(recentes) >= AMOSTRAS_CONFIRMACAO and \
+            np.ptp(recentes[:, COLUNAS_ACC], axis=0).max() > 0 and np.ptp(recentes[:, COLUNA_V1]) == 0
+    return len(amostras) >= AMOSTRAS_CONFIRMACAO
+
+
+def zerar_ads(conexao, mux):
+    """SELFCAL do ADS1256 (M3) e volta ao canal mux, cada um confirmado pelo fluxo."""
+    t0 = time.monotonic()
+    conexao.trocar_modo(3)
+    conexao.trocar_modo(mux)
+    print(f"ADS zerado, canal {MODOS.get(int(mux), mux)} ({time.monotonic() - t0:.1f}s)")
@@ -0,0 +1,103 @@
+"""
+Decimação de séries longas para os gráficos.
+
+Um ensaio tem milhões de amostras e a tela só alguns milhares de
+pixels de largura. Os gráficos recebem no máximo alguns pontos por
+pixel, recalculados a cada zoom/pan a partir das amostras visíveis:
+com zoom suficiente aparece a resolução completa.
+
+    minmax: mínimo e máximo de cada faixa (linhas: picos e envelope
+            preservados)
+    passo:  uma a cada k amostras (pontos/scatter: densidade preservada)
+"""
+import numpy as np
+
+N_BINS = 800            # faixas min/max quando a largura do eixo não é conhecida
+PONTOS_POR_PIXEL = 4    # modo passo
+
+
+def decimar_minmax(x, y, n_bins=N_BINS):
+    """
+    Reduz (x, y) a no máximo 2*n_bins pontos: em cada faixa de
+    índices, o mínimo e o máximo de y, na ordem em que aparecem.
+    Picos e envelope continuam visíveis no gráfico.
+    """
+    n = len(y)
+    if n <= 2 * n_bins:
+        return x, y
+    tamanho = n // n_bins
+    corte = tamanho * n_bins
+    yb = y[:corte].reshape(n_bins, tamanho)
+    xb = x[:corte].reshape(n_bins, tamanho)
+    i_min = yb.argmin(axis=1)
+    i_max = yb.argmax(axis=1)
+    primeiro = np.minimum(i_min, i_max)
+    segundo = np.maximum(i_min, i_max)
+    linhas = np.arange(n_bins)
+    xs = np.column_stack((xb[linhas, primeiro], xb[linhas, segundo])).ravel()
+    ys = np.column_stack((yb[linhas, primeiro], yb[linhas, segundo])).ravel()
+    # sobra do fim (menos de uma faixa) entra como um par min/max
+    if corte < n:
+        resto = slice(corte, n)
+        i = np.sort([y[resto].argmin(), y[resto].argmax()]) + corte
+        xs = np.concatenate((xs, x[i]))
+        ys = np.concatenate((ys, y[i]))
+    return xs, ys
+
+
+def decimar_passo(x, y, max_pontos):
+    """Uma amostra a cada ceil(n/max_pontos)."""
+    passo = max(1, -(-len(y) // max_pontos))
+    return x[::passo], y[::passo]
+
+
+class LinhaDecimada:
+    """
+    Line2D que mostra só a versão decimada de (x, y) e se refaz
+    quando o limite x do eixo muda. x precisa ser crescente
+    (índice da amostra ou tempo).
+    """
+
+    def __init__(self, ax, x, y, *args, modo="minmax", **kwargs):
+        self.ax = ax
+        self.x = np.asarray(x, dtype=np.float64)
+        self.y = np.asarray(y, dtype=np.float64)
+        self.modo = modo
+        (self.linha,) = ax.plot(*self._decimar(0, len(self.x)), *args, **kwargs)
+        # lambda (e não método) para o callback manter a referência viva
+        ax.callbacks.connect("xlim_changed", lambda ax: self.atualizar())
+
+    def _largura_pixels(self):
+        try:
+            return max(int(self.ax.get_window_extent().width), 100)
+        except Exception:
+            return N_BINS
+
+    def _decimar(self, i0, i1):
+        x, y = self.x[i0:i1], self.y[i0:i1]
+        largura = self._largura_pixels()
+        if self.modo == "passo":
+            return decimar_passo(x, y, PONTOS_POR_PIXEL * largura)
+        return decimar_minmax(x, y, largura)
+
+    def atualizar(self):
+        x0, x1 = sorted(self.ax.get_xlim())
+        # uma amostra além de cada borda, para a linha chegar até elas
+        i0 = max(np.searchsorted(self.x, x0) - 1, 0)
+        i1 = min(np.searchsorted(self.x, x1, side="right") + 1, len(self.x))
+        self.linha.set_data(*self._decimar(i0, i1))
+
+
+def plot_decimado(ax, *dados, modo="minmax", **kwargs):
+    """
+    Como ax.plot(y) ou ax.plot(x, y, fmt), decimado.
+    Retorna a LinhaDecimada (a Line2D está em .linha).
+    """
+    if len(dados) == 1 or isinstance(dados[1], str):
+        y = np.asarray(dados[0])
+        x = np.arange(len(y))
+        resto = dados[1:]
+    else:
+        x, y = dados[0], dados[1]
+        resto = dados[2:]
+    return LinhaDecimada(ax, x, y, *resto, modo=modo, **kwargs)
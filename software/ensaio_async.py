@@ -0,0 +1,278 @@
+"""
+Motor de ensaio em asyncio: grava também rampas e holds.
+
+No ensaio síncrono, aplicar_rampa bloqueia até o VelReal assentar e o
+que o dinamômetro mede durante rampas e hold é descartado. Aqui cada parte
+roda como uma tarefa concorrente:
+
+    gravação  - drena o buffer da thread de leitura, rotula cada
+                amostra com a fase e grava
+    comandos  - fila de comandos (T, M) escritos na serial
+    console   - linha de telemetria
+    sequência - rampas, hold e patamares (só agenda comandos e muda
+                a fase; nunca bloqueia as outras tarefas)
+
+A fase de cada amostra é decidida pelo tempo de chegada do bloco em
+relação ao instante da mudança de fase (mesmo relógio do leitor).
+"""
+import asyncio
+import sys
+import time
+
+import numpy as np
+
+from gravacao import FASE_HOLD, FASE_PATAMAR, FASE_RAMPA, NOMES_FASE
+from rampa import RampaMalhaFechada, avisar
+
+INTERVALO_GRAVACAO = 0.05  # s entre drenagens do buffer
+INTERVALO_CONSOLE = 0.8    # s entre atualizações da telemetria
+MAX_TRECHO = 50000         # amostras acumuladas antes de gravar um trecho longo (fora dos patamares)
+
+
+class MotorEnsaio:
+    def __init__(self, leitor, gravador, reconstrutor, nova_rampa=RampaMalhaFechada, novo_dwell=None,
+                 resumo=None, concluido=None):
+        self.leitor = leitor
+        self.gravador = gravador
+        self.reconstrutor = reconstrutor
+        self.nova_rampa = nova_rampa  # fábrica de RampaMalhaFechada (atual, alvo, inicio)
+        self.novo_dwell = novo_dwell  # fábrica de DwellAdaptativo; None = patamar de tempo fixo
+        self.resumo = resumo          # ResumoPatamares (tabela Cp x TSR) ou None
+        self.concluido = concluido    # concluido(sp) depois de gravar cada patamar completo (checkpoint) ou None
+
+        self.cursor = leitor.buffer.marca()
+        self.pendentes = []           # blocos ainda não gravados do trecho atual
+        self._fase_trecho = FASE_HOLD # fase/sp do trecho em gravação
+        self._sp_trecho = 0.0
+        self.fase = FASE_HOLD         # fase/sp da sequência (mais recente)
+        self.sp = 0.0
+        self.mudancas = []            # (instante, fase, sp, info do trecho que termina)
+        self.comandos = asyncio.Queue()
+        self.erro_serial = None       # exceção de uma escrita na serial (porta desconectada)
+        self.rodando = True
+
+    # --------------------------------------------------------
+    # FASES E COMANDOS
+    # --------------------------------------------------------
+
+    def mudar_fase(self, fase, sp, info_trecho=None):
+        self.mudancas.append((self.leitor.relogio.agora(), fase, sp, info_trecho))
+        self.fase, self.sp = fase, sp
+
+    async def enviar(self, comando):
+        if self.erro_serial is not None:
+            raise self.erro_serial
+        await self.comandos.put(comando)
+
+    async def _tarefa_comandos(self):
+        while True:
+            comando = await self.comandos.get()
+            try:
+                if self.erro_serial is None:
+                    await asyncio.to_thread(self.leitor.ser.write, f"{comando}\n".encode())
+            except Exception as e:   # porta fechada/desconectada: a sequência para no próximo envio
+                self.erro_serial = e
+            finally:
+                self.comandos.task_done()   # senão o comandos.join() do fim espera para sempre
+
+    # --------------------------------------------------------
+    # GRAVAÇÃO
+    # --------------------------------------------------------
+
+    def _gravar_trecho(self, fase, sp, info_trecho=None, interrompido=False):
+        if not self.pendentes:
+            return
+        amostras = np.concatenate(self.pendentes)
+        self.pendentes = []
+        if len(amostras) == 0:
+            return
+        tempos, info = self.reconstrutor.reconstruir(amostras[:, 0])
+        n = len(amostras)
+        # patamar interrompido no meio (Ctrl-C, erro): as amostras vão como
+        # hold, fora das médias por patamar, e a janela fica marcada
+        self.gravador.adicionar(np.column_stack((
+            np.full(n, sp), tempos, amostras[:, 1:], amostras[:, 0],
+            np.full(n, FASE_HOLD if interrompido else fase),
+        )))
+        if fase == FASE_PATAMAR:
+            self.gravador.registrar_janela({"setpoint": sp, **info, **(info_trecho or {}),
+                                            **({"interrompido": True} if interrompido else {})})
+            if interrompido:
+                print(f"\n Patamar {sp} interrompido: gravado como hold, fora do resumo")
+                return   # não conta para o checkpoint: o setpoint é medido de novo
+            if self.resumo is not None:
+                self.resumo.adicionar(sp, amostras[:, 1:])
+                self.resumo.fechar_patamar(sp)
+            if self.concluido is not None:
+                self.concluido(sp)
+
+    def _drenar(self):
+        fim = self.leitor.buffer.marca()
+        novas = self.leitor.buffer.intervalo(self.cursor, fim)
+        self.cursor = fim
+
+        # aplica as mudanças de fase já ocorridas: o que chegou antes
+        # do instante da mudança pertence ao trecho anterior
+        while self.mudancas:
+            instante, fase, sp, info_trecho = self.mudancas[0]
+            corte = np.searchsorted(novas[:, 0], instante)
+            self.pendentes.append(novas[:corte])
+            novas = novas[corte:]
+            self._gravar_trecho(self._fase_trecho, self._sp_trecho, info_trecho)
+            self._fase_trecho, self._sp_trecho = fase, sp
+            self.mudancas.pop(0)
+
+        self.pendentes.append(novas)
+        # o patamar é gravado inteiro, para reconstruir o tempo da janela toda
+        if self._fase_trecho != FASE_PATAMAR and sum(len(p) for p in self.pendentes) > MAX_TRECHO:
+            self._gravar_trecho(self._fase_trecho, self._sp_trecho)
+
+    async def _tarefa_gravacao(self):
+        metricas = self.leitor.metricas
+        laco = metricas.laco("gravacao")
+        while self.rodando:
+            laco.iteracao()
+            with metricas.tempo("gravacao"):
+                self._drenar()
+            await asyncio.sleep(INTERVALO_GRAVACAO)
+        self._drenar()
+        # a sequência sempre fecha o patamar (mudar_fase para hold); um
+        # patamar ainda aberto aqui é um ensaio interrompido no meio dele
+        self._gravar_trecho(self._fase_trecho, self._sp_trecho,
+                            interrompido=self._fase_trecho == FASE_PATAMAR)
+
+    # --------------------------------------------------------
+    # CONSOLE
+    # --------------------------------------------------------
+
+    async def _tarefa_console(self):
+        buffer, metricas = self.leitor.buffer, self.leitor.metricas
+        anterior = (time.monotonic(), buffer.marca())
+        while True:
+            await asyncio.sleep(INTERVALO_CONSOLE)
+            ultima = buffer.ultima()
+            if ultima is None:
+                continue
+            with metricas.tempo("console"):
+                agora = (time.monotonic(), buffer.marca())
+                taxa = (agora[1] - anterior[1]) / (agora[0] - anterior[0])
+                anterior = agora
+                dados = ultima[1:]
+                sys.stdout.write("\r"
+                    f"[{NOMES_FASE[self.fase]:7s}] SP={self.sp:.2f} | "
+                    f"VelSet={dados[0]:.2f} | VelReal={dados[1]:.2f} | "
+                    f"V1={dados[6]:.4f} | V2={dados[7]:.4f} | "
+                    f"{taxa:.0f} amostras/s | backlog {self.leitor.in_waiting_max} B       "
+                )
+                sys.stdout.flush()
+
+    # --------------------------------------------------------
+    # SEQUÊNCIA DO ENSAIO
+    # --------------------------------------------------------
+
+    async def rampa(self, atual, alvo):
+        """
+        Rampa em malha fechada (rampa.py), sem bloquear a gravação. O
+        trecho todo é gravado com o alvo na coluna Setpoint; o setpoint
+        instantâneo do perfil fica no VelSet.
+        """
+        if atual == alvo:
+            return alvo
+
+        relogio, buffer = self.leitor.relogio, self.leitor.buffer
+        cursor = buffer.marca()
+        laco = self.leitor.metricas.laco("rampa")
+        rampa = self.nova_rampa(atual, alvo, relogio.agora())
+        self.mudar_fase(FASE_RAMPA, alvo)
+        while True:
+            laco.iteracao()
+            agora = relogio.agora()
+            sp = rampa.comando(agora)
+            if sp is not None:
+                await self.enviar(f"T{sp}")
+            fim = buffer.marca()
+            rampa.atualizar(buffer.intervalo(cursor, fim))
+            cursor = fim
+            if rampa.concluida(agora):
+                break
+            await asyncio.sleep(rampa.periodo)
+        avisar(rampa)
+        return alvo
+
+    async def hold(self, sp, duracao):
+        self.mudar_fase(FASE_HOLD, sp)
+        await asyncio.sleep(duracao)
+
+    async def patamar(self, sp, duracao):
+        metricas = self.leitor.metricas
+        self.leitor.zerar_backlog()
+        metricas.abrir_janela()
+        self.mudar_fase(FASE_PATAMAR, sp)
+        if self.novo_dwell is None:
+            await asyncio.sleep(duracao)
+            metricas.fechar_janela()
+            self.mudar_fase(FASE_HOLD, sp, {"in_waiting_max": self.leitor.in_waiting_max})
+            return
+
+        # dwell adaptativo: acompanha as amostras do patamar até a média convergir
+        dwell = self.novo_dwell()
+        buffer = self.leitor.buffer
+        cursor = buffer.marca()
+        laco = metricas.laco("patamar")
+        t0 = time.monotonic()
+        while not dwell.concluido(time.monotonic() - t0):
+            laco.iteracao()
+            await asyncio.sleep(INTERVALO_GRAVACAO)
+            fim = buffer.marca()
+            dwell.atualizar(buffer.intervalo(cursor, fim))
+            cursor = fim
+        metricas.fechar_janela()
+        self.mudar_fase(FASE_HOLD, sp, {**dwell.resumo(), "in_waiting_max": self.leitor.in_waiting_max})
+
+    async def executar(self, setpoints, tempo, sp_inicial, atual, tempo_zero, esperar_enter=True):
+        self._sp_trecho = self.sp = atual
+        auxiliares = [
+            asyncio.create_task(self._tarefa_comandos()),
+            asyncio.create_task(self._tarefa_console()),
+        ]
+        gravacao = asyncio.create_task(self._tarefa_gravacao())
+
+        try:
+            print(f"\nAplicando rampa até {sp_inicial} rad/s...")
+            atual = await self.rampa(atual, sp_inicial)
+            self.mudar_fase(FASE_HOLD, sp_inicial)
+
+            if esperar_enter:
+                print(f"\nSetpoint inicial atingido: {sp_inicial} rad/s")
+                print("Aperte ENTER para começar o ensaio.")
+                await asyncio.to_thread(input)
+
+            print(f"\nHold inicial por {tempo_zero}s...")
+            await self.hold(sp_inicial, tempo_zero)
+
+            for sp in setpoints:
+                atual = await self.rampa(atual, sp)
+                print(f"\r--- Setpoint {sp} rad/s ---           ")
+                await self.patamar(sp, tempo)
+
+            self.mudar_fase(FASE_HOLD, atual)
+            await self.comandos.join()
+            if self.erro_serial is not None:
+                raise self.erro_serial
+        finally:
+            self.rodando = False
+            await gravacao
+            for t in auxiliares:
+                t.cancel()
+            await asyncio.gather(*auxiliares, return_exceptions=True)
+            print()
+
+        return atual
+
+
+def aquisitar_async(leitor, gravador, reconstrutor, setpoints, tempo, sp_inicial, atual,
+                    tempo_zero, nova_rampa=RampaMalhaFechada, esperar_enter=True, novo_dwell=None,
+                    resumo=None, concluido=None):
+    """Ponto de entrada síncrono: roda o ensaio completo no asyncio."""
+    motor = MotorEnsaio(leitor, gravador, reconstrutor, nova_rampa, novo_dwell, resumo, concluido)
+    return asyncio.run(motor.executar(setpoints, tempo, sp_inicial, atual, tempo_zero, esperar_enter))
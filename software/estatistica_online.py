@@ -0,0 +1,147 @@
+"""
+Estatística online das janelas de aquisição.
+
+Welford: média e variância atualizadas a cada bloco que chega, sem
+guardar as amostras (blocos combinados pela fórmula de Chan, vetorizada
+por canal).
+
+Erro padrão: as amostras de um patamar são autocorrelacionadas
+(oscilação do rotor, filtro do ADC), então sigma/sqrt(n) subestima a
+incerteza da média. Usa-se o método das médias por lotes: as amostras
+são agrupadas em lotes consecutivos de TAMANHO_LOTE e o erro padrão
+sai da dispersão das médias dos lotes, que já carrega a correlação.
+"""
+import numpy as np
+
+# === CONFIGURAÇÕES Estatística ===
+TAMANHO_LOTE = 200   # amostras por lote (bem maior que o tempo de correlação)
+MIN_LOTES = 10       # lotes mínimos para confiar no erro padrão
+
+
+class Welford:
+    """Média, variância, mínimo e máximo acumulados, um valor por canal."""
+
+    def __init__(self, n_canais=1):
+        self.n = 0
+        self.media = np.zeros(n_canais)
+        self.m2 = np.zeros(n_canais)
+        self.minimo = np.full(n_canais, np.inf)
+        self.maximo = np.full(n_canais, -np.inf)
+
+    def atualizar(self, x):
+        """x: array (n_amostras x n_canais) com as amostras novas."""
+        x = np.asarray(x, dtype=np.float64).reshape(-1, len(self.media))
+        nb = len(x)
+        if nb == 0:
+            return
+        media_b = x.mean(axis=0)
+        m2_b = ((x - media_b) ** 2).sum(axis=0)
+        n = self.n + nb
+        delta = media_b - self.media
+        self.media = self.media + delta * nb / n
+        self.m2 = self.m2 + m2_b + delta ** 2 * self.n * nb / n
+        self.n = n
+        self.minimo = np.minimum(self.minimo, x.min(axis=0))
+        self.maximo = np.maximum(self.maximo, x.max(axis=0))
+
+    @property
+    def variancia(self):
+        if self.n < 2:
+            return np.full(len(self.media), np.nan)
+        return self.m2 / (self.n - 1)
+
+    @property
+    def desvio(self):
+        return np.sqrt(self.variancia)
+
+
+class EstatisticaJanela:
+    """
+    Welford das amostras + Welford das médias de lote, por canal.
+
+    erro_padrao(): sqrt(var(médias dos lotes) / n_lotes), ou inf se
+    ainda não há MIN_LOTES lotes completos.
+    fator_correlacao(): quanto a variância da média é maior que no
+    caso de amostras independentes (~2*tau_int); n/fator é o número
+    efetivo de amostras.
+    """
+
+    def __init__(self, n_canais=1, tamanho_lote=TAMANHO_LOTE):
+        self.tamanho_lote = tamanho_lote
+        self.amostras = Welford(n_canais)
+        self.lotes = Welford(n_canais)
+        self.resto = np.empty((0, n_canais))
+
+    def atualizar(self, x):
+        x = np.asarray(x, dtype=np.float64).reshape(-1, len(self.amostras.media))
+        self.amostras.atualizar(x)
+
+        x = np.concatenate((self.resto, x))
+        n_lotes = len(x) // self.tamanho_lote
+        corte = n_lotes * self.tamanho_lote
+        if n_lotes:
+            medias = x[:corte].reshape(n_lotes, self.tamanho_lote, -1).mean(axis=1)
+            self.lotes.atualizar(medias)
+        self.resto = x[corte:]
+
+    @property
+    def media(self):
+        return self.amostras.media
+
+    def erro_padrao(self):
+        if self.lotes.n < MIN_LOTES:
+            return np.full(len(self.media), np.inf)
+        return np.sqrt(self.lotes.variancia / self.lotes.n)
+
+    def fator_correlacao(self):
+        if self.lotes.n < MIN_LOTES:
+            return np.full(len(self.media), np.nan)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return self.tamanho_lote * self.lotes.variancia / self.amostras.variancia
+
+# ============================================================
+# CRITÉRIO DE PARADA DO PATAMAR
+# ============================================================
+
+class DwellAdaptativo:
+    """
+    Decide quando encerrar a janela de um setpoint: assim que o erro
+    padrão de todos os canais atinge o alvo, respeitando o tempo
+    mínimo e o máximo.
+
+    canais: dict nome -> (índice da coluna nas amostras do buffer, alvo)
+    """
+
+    def __init__(self, canais, tempo_min, tempo_max):
+        self.nomes = list(canais)
+        self.indices = [canais[c][0] for c in self.nomes]
+        self.alvos = np.array([canais[c][1] for c in self.nomes], dtype=np.float64)
+        self.tempo_min = tempo_min
+        self.tempo_max = tempo_max
+        self.estatistica = EstatisticaJanela(len(self.nomes))
+        self.decorrido = 0.0
+
+    def atualizar(self, amostras):
+        """amostras: linhas do buffer (chegada + 8 campos)."""
+        if len(amostras):
+            self.estatistica.atualizar(amostras[:, self.indices])
+
+    def convergiu(self):
+        return bool(np.all(self.estatistica.erro_padrao() <= self.alvos))
+
+    def concluido(self, decorrido):
+        self.decorrido = decorrido
+        if decorrido >= self.tempo_max:
+            return True
+        return decorrido >= self.tempo_min and self.convergiu()
+
+    def resumo(self):
+        """Dwell e incerteza atingida, para o resumo da janela."""
+        erro = self.estatistica.erro_padrao()
+        fator = self.estatistica.fator_correlacao()
+        resumo = {"dwell_s": round(self.decorrido, 3), "convergiu": self.convergiu()}
+        for k, nome in enumerate(self.nomes):
+            resumo[f"media_{nome}"] = float(self.estatistica.media[k])
+            resumo[f"erro_padrao_{nome}"] = float(erro[k]) if np.isfinite(erro[k]) else None
+            resumo[f"fator_correlacao_{nome}"] = float(fator[k]) if np.isfinite(fator[k]) else None
+        return resumo
@@ -0,0 +1,222 @@
+"""
+Filtros O(n) por patamar, em blocos.
+
+Substituem moving_average (np.convolve, O(n*janela), aplicado no
+sinal inteiro). Aqui:
+
+    MediaMovel(janela)    média centrada por soma acumulada, O(n)
+    MedianaMovel(janela)  mediana centrada (robusta a picos)
+    IIR(alfa)             passa-baixa de primeira ordem, causal:
+                          y[n] = y[n-1] + alfa*(x[n] - y[n-1])
+
+O sinal é dividido nos trechos em que set_omega é constante e o
+estado do filtro é zerado em cada troca de setpoint, então a média
+de um patamar não é contaminada pelo vizinho. As bordas de cada
+trecho usam reflexão, como o np.pad(mode='reflect') do moving_average.
+
+Tudo roda em blocos (filtrar_blocos / filtrar com saida=np.memmap),
+então serve para ensaios maiores que a memória.
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+TAMANHO_BLOCO = 1 << 20      # amostras por bloco
+BLOCO_MEDIANA = 1 << 16      # saídas por vez na mediana (memória ~ bloco*janela)
+LIMITE_IIR = 1e6             # maior fator (1-alfa)^-k dentro de um bloco do IIR
+
+# ============================================================
+# FILTROS DE JANELA CENTRADA
+# ============================================================
+
+class _FiltroJanela:
+    """
+    Base dos filtros de janela centrada com estado por trecho.
+
+    processar(x) recebe amostras do trecho atual e devolve as que já
+    têm o lado direito da janela completo (atraso de janela//2
+    amostras); finalizar() fecha o trecho refletindo a borda direita
+    e devolve o resto. A saída total tem o mesmo tamanho da entrada.
+    """
+
+    def __init__(self, janela):
+        if janela < 1 or janela % 2 == 0:
+            raise ValueError("Use valor ímpar para a janela.")
+        self.janela = janela
+        self.p = janela // 2
+        self.reiniciar()
+
+    def reiniciar(self):
+        self.inicio = True
+        self.ctx = np.empty(0)     # p amostras (ou reflexão) antes da primeira pendente
+        self.pend = np.empty(0)    # amostras ainda sem saída
+
+    def _valido(self, a):
+        """len(a) - 2p saídas da janela sobre a (já com as bordas)."""
+        raise NotImplementedError
+
+    def processar(self, x):
+        p = self.p
+        self.pend = np.concatenate((self.pend, np.asarray(x, dtype=np.float64)))
+        n_prontos = len(self.pend) - p
+        if n_prontos <= 0:
+            return np.empty(0)
+        if self.inicio:
+            esquerda = self.pend[1:p + 1][::-1]   # reflexão no início do trecho
+        else:
+            esquerda = self.ctx
+        a = np.concatenate((esquerda, self.pend))
+        saida = self._valido(a[:n_prontos + 2 * p])
+        self.ctx = a[n_prontos:n_prontos + p]
+        self.pend = self.pend[n_prontos:]
+        self.inicio = False
+        return saida
+
+    def finalizar(self):
+        p = self.p
+        if len(self.pend) == 0:
+            saida = np.empty(0)
+        elif self.inicio:
+            saida = self._valido(np.pad(self.pend, p, mode="reflect"))
+        else:
+            b = np.concatenate((self.ctx, self.pend))
+            saida = self._valido(np.concatenate((b, b[-p - 1:-1][::-1])))
+        self.reiniciar()
+        return saida
+
+
+class MediaMovel(_FiltroJanela):
+    """Média móvel centrada por soma acumulada: O(n), qualquer janela."""
+
+    def _valido(self, a):
+        w = self.janela
+        ref = a[len(a) // 2]   # tira o nível DC antes de acumular (precisão)
+        c = np.cumsum(a - ref)
+        soma = c[w - 1:].copy()
+        soma[1:] -= c[:-w]
+        return soma / w + ref
+
+
+class MedianaMovel(_FiltroJanela):
+    """Mediana móvel centrada, calculada em sub-blocos de BLOCO_MEDIANA."""
+
+    def _valido(self, a):
+        janelas = sliding_window_view(a, self.janela)
+        saida = np.empty(len(janelas))
+        for i in range(0, len(janelas), BLOCO_MEDIANA):
+            saida[i:i + BLOCO_MEDIANA] = np.median(janelas[i:i + BLOCO_MEDIANA], axis=1)
+        return saida
+
+# ============================================================
+# IIR DE PRIMEIRA ORDEM
+# ============================================================
+
+class IIR:
+    """
+    Passa-baixa de primeira ordem (causal, com atraso de fase).
+    Começa cada trecho no valor da primeira amostra.
+
+    Sem laço por amostra: dentro de um sub-bloco de k amostras,
+    y[n] - y0 = alfa*r^n*cumsum((x - y0)*r^-n), r = 1 - alfa;
+    o sub-bloco é limitado para r^-k não passar de LIMITE_IIR.
+    """
+
+    def __init__(self, alfa):
+        if not 0 < alfa <= 1:
+            raise ValueError("alfa deve estar em (0, 1].")
+        self.alfa = alfa
+        r = 1 - alfa
+        self.bloco = TAMANHO_BLOCO if r == 0 else int(np.log(LIMITE_IIR) / -np.log(r))
+        self.bloco = max(1, min(self.bloco, TAMANHO_BLOCO))
+        if r > 0:
+            k = np.arange(self.bloco)
+            self.r_pot = r ** k
+            self.r_neg = 1 / self.r_pot
+        self.reiniciar()
+
+    def reiniciar(self):
+        self.y = None
+
+    def processar(self, x):
+        x = np.asarray(x, dtype=np.float64)
+        if len(x) == 0:
+            return np.empty(0)
+        if self.alfa == 1:
+            return x.copy()
+        if self.y is None:
+            self.y = x[0]
+        saida = np.empty(len(x))
+        for i in range(0, len(x), self.bloco):
+            xb = x[i:i + self.bloco] - self.y   # relativo ao estado (precisão)
+            m = len(xb)
+            saida[i:i + m] = self.alfa * self.r_pot[:m] * np.cumsum(xb * self.r_neg[:m]) + self.y
+            self.y = saida[i + m - 1]
+        return saida
+
+    def finalizar(self):
+        self.reiniciar()
+        return np.empty(0)
+
+# ============================================================
+# APLICAÇÃO POR PATAMAR
+# ============================================================
+
+def filtrar_blocos(blocos, filtro):
+    """
+    blocos: iterável de (x, set_omega) em pedaços consecutivos.
+    set_omega pode ter mais de uma coluna (ex.: setpoint e fase): o
+    trecho muda quando qualquer uma muda. Gera a saída filtrada em
+    pedaços (nem sempre do mesmo tamanho da entrada); concatenados,
+    têm o tamanho do sinal.
+    """
+    sp_atual = None
+    for x, sp in blocos:
+        x = np.asarray(x, dtype=np.float64)
+        sp = np.asarray(sp)
+        if len(x) == 0:
+            continue
+        mudou = sp[1:] != sp[:-1]
+        if mudou.ndim > 1:
+            mudou = mudou.any(axis=1)
+        trocas = np.flatnonzero(mudou) + 1
+        if sp_atual is not None and np.any(sp[0] != sp_atual):
+            trocas = np.concatenate(([0], trocas))
+        inicio = 0
+        for fim in trocas:
+            if fim > inicio:
+                yield filtro.processar(x[inicio:fim])
+            yield filtro.finalizar()
+            inicio = fim
+        yield filtro.processar(x[inicio:])
+        sp_atual = sp[-1]
+    yield filtro.finalizar()
+
+
+def filtrar(x, set_omega, filtro, tamanho_bloco=TAMANHO_BLOCO, saida=None, fase=None):
+    """
+    Filtra x por patamar de set_omega, bloco a bloco.
+
+    Com fase (coluna Fase dos ensaios que gravam rampas e holds, em que
+    a rampa já tem o alvo no Setpoint), o trecho muda também com a
+    fase: o transitório da rampa não entra no filtro do patamar.
+
+    x e set_omega podem ser np.memmap (abrir_colunar); com saida
+    (ex.: np.memmap aberto em modo "w+") nada do tamanho do sinal
+    fica em memória.
+    """
+    x = np.asarray(x)
+    set_omega = np.asarray(set_omega)
+    fase = np.asarray(fase) if fase is not None else None
+    n = len(x)
+    if saida is None:
+        saida = np.empty(n)
+
+    def chave(i):
+        sp = set_omega[i:i + tamanho_bloco]
+        return sp if fase is None else np.column_stack((sp, fase[i:i + tamanho_bloco]))
+
+    blocos = ((x[i:i + tamanho_bloco], chave(i)) for i in range(0, n, tamanho_bloco))
+    pos = 0
+    for pedaco in filtrar_blocos(blocos, filtro):
+        saida[pos:pos + len(pedaco)] = pedaco
+        pos += len(pedaco)
+    return saida
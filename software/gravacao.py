@@ -0,0 +1,208 @@
+import json
+import os
+import time
+
+import numpy as np
+
+# === CONFIGURAÇÕES Gravação ===
+TAMANHO_CHUNK = 8192   # linhas acumuladas antes de cada escrita em disco
+EXTENSAO = ".col"      # diretório do formato colunar
+
+# TimeStamp: tempo reconstruído da amostra; TempoChegada: chegada do bloco no host;
+# Fase: parte do ensaio em que a amostra foi medida (códigos abaixo)
+COLUNAS = ["Setpoint", "TimeStamp", "VelSet", "VelReal", "Pos", "Ax", "Ay", "Az", "V1", "V2",
+           "TempoChegada", "Fase"]
+
+FASE_RAMPA = 0
+FASE_HOLD = 1
+FASE_PATAMAR = 2   # janela de aquisição no setpoint
+NOMES_FASE = {FASE_RAMPA: "rampa", FASE_HOLD: "hold", FASE_PATAMAR: "patamar"}
+
+# ============================================================
+# FORMATO COLUNAR
+# ============================================================
+#
+# aquisicao_AAAAMMDD_HHMMSS.col/
+#     meta.json        colunas, dtype, metadados do ensaio, estado,
+#                      resumo de cada janela (taxa, deriva, lacunas...)
+#     Setpoint.bin     float64 little-endian, uma coluna por arquivo
+#     TimeStamp.bin
+#     ...
+#
+# Cada coluna cresce por append a cada chunk, então um ensaio
+# interrompido continua legível até o último chunk gravado.
+# Na leitura as colunas são abertas com np.memmap (sem cópia).
+
+DTYPE = "<f8"
+
+
+def _arquivo_coluna(caminho, coluna):
+    return os.path.join(caminho, f"{coluna}.bin")
+
+
+def _escrever_meta(caminho, meta):
+    # escreve num temporário e troca, para nunca deixar um meta.json pela metade
+    tmp = os.path.join(caminho, "meta.json.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, os.path.join(caminho, "meta.json"))
+
+
+class GravadorColunar:
+    """
+    Grava a aquisição em disco conforme ela acontece, em chunks de
+    tamanho fixo, uma coluna por arquivo binário.
+
+    adicionar() recebe arrays (n x len(colunas)) e só escreve quando
+    o chunk enche; fechar() descarrega o resto e marca o ensaio como
+    completo no meta.json.
+    """
+
+    def __init__(self, caminho, metadados=None, colunas=COLUNAS, tamanho_chunk=TAMANHO_CHUNK):
+        self.caminho = caminho
+        self.colunas = list(colunas)
+        self.chunk = np.empty((tamanho_chunk, len(self.colunas)))
+        self.n_chunk = 0
+        self.n_amostras = 0
+
+        os.makedirs(caminho, exist_ok=False)
+        self.arquivos = [open(_arquivo_coluna(caminho, c), "ab") for c in self.colunas]
+
+        self.meta = {
+            "colunas": self.colunas,
+            "dtype": DTYPE,
+            "criado": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "estado": "gravando",
+            "n_amostras": 0,
+            "metadados": metadados or {},
+            "janelas": [],
+        }
+        _escrever_meta(caminho, self.meta)
+
+    def adicionar(self, linhas):
+        linhas = np.asarray(linhas, dtype=np.float64).reshape(-1, len(self.colunas))
+        while len(linhas):
+            n = min(len(linhas), len(self.chunk) - self.n_chunk)
+            self.chunk[self.n_chunk:self.n_chunk + n] = linhas[:n]
+            self.n_chunk += n
+            linhas = linhas[n:]
+            if self.n_chunk == len(self.chunk):
+                self.descarregar()
+
+    def registrar_janela(self, info):
+        """Guarda o resumo de uma janela no meta.json."""
+        self.meta["janelas"].append(info)
+        self.meta["n_amostras"] = self.n_amostras + self.n_chunk
+        _escrever_meta(self.caminho, self.meta)
+
+    def descarregar(self):
+        if self.n_chunk == 0:
+            return
+        for k, f in enumerate(self.arquivos):
+            f.write(self.chunk[:self.n_chunk, k].astype(DTYPE).tobytes())
+            f.flush()
+        self.n_amostras += self.n_chunk
+        self.n_chunk = 0
+
+    def fechar(self):
+        if self.arquivos is None:
+            return
+        self.descarregar()
+        for f in self.arquivos:
+            f.close()
+        self.arquivos = None
+        self.meta["estado"] = "completo"
+        self.meta["n_amostras"] = self.n_amostras
+        _escrever_meta(self.caminho, self.meta)
+        print(f"\n Dados salvos em {self.caminho}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+
+
+class GravadorTxt:
+    """
+    Mesma interface do GravadorColunar, no formato texto original
+    (separado por tab). Também grava conforme a aquisição acontece.
+    Metadados e resumos de janela vão para <nome>_meta.json ao lado.
+    """
+
+    def __init__(self, caminho, metadados=None, colunas=COLUNAS):
+        self.caminho = caminho
+        self.colunas = list(colunas)
+        self.n_amostras = 0
+        self.f = open(caminho, "w")
+        self.f.write("\t".join(self.colunas) + "\n")
+        self.caminho_meta = os.path.splitext(caminho)[0] + "_meta.json"
+        self.meta = {"metadados": metadados or {}, "janelas": []}
+
+    def registrar_janela(self, info):
+        self.meta["janelas"].append(info)
+        with open(self.caminho_meta, "w", encoding="utf-8") as f:
+            json.dump(self.meta, f, indent=2, ensure_ascii=False)
+
+    def adicionar(self, linhas):
+        for linha in np.asarray(linhas).tolist():
+            self.f.write("\t".join(str(x) for x in linha) + "\n")
+        self.n_amostras += len(linhas)
+        self.f.flush()
+
+    def fechar(self):
+        if self.f.closed:
+            return
+        self.f.close()
+        print(f"\n Dados salvos em {self.caminho}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+
+
+def novo_gravador(formato, metadados=None, pasta=None):
+    """Cria o gravador com o nome padrão aquisicao_AAAAMMDD_HHMMSS (na pasta, se dada)."""
+    nome = f"aquisicao_{time.strftime('%Y%m%d_%H%M%S')}"
+    if pasta:
+        os.makedirs(pasta, exist_ok=True)
+        nome = os.path.join(pasta, nome)
+    if formato == "colunar":
+        return GravadorColunar(nome + EXTENSAO, metadados)
+    if formato == "txt":
+        return GravadorTxt(nome + ".txt", metadados)
+    raise ValueError(f"Formato de saída desconhecido: {formato}")
+
+# ============================================================
+# LEITURA
+# ============================================================
+
+def eh_colunar(caminho):
+    return os.path.isdir(caminho) and os.path.exists(os.path.join(caminho, "meta.json"))
+
+
+def abrir_colunar(caminho):
+    """
+    Abre um ensaio gravado em formato colunar, memory-mapped.
+
+    Retorna (colunas, meta): dict nome -> np.memmap (somente leitura)
+    e o conteúdo do meta.json. Se o ensaio foi interrompido, todas
+    as colunas são cortadas no menor comprimento gravado.
+    """
+    with open(os.path.join(caminho, "meta.json"), encoding="utf-8") as f:
+        meta = json.load(f)
+
+    dtype = np.dtype(meta["dtype"])
+    tamanhos = [os.path.getsize(_arquivo_coluna(caminho, c)) // dtype.itemsize
+                for c in meta["colunas"]]
+    n = min(tamanhos) if tamanhos else 0
+
+    colunas = {}
+    for c in meta["colunas"]:
+        if n == 0:
+            colunas[c] = np.empty(0, dtype=dtype)
+        else:
+            colunas[c] = np.memmap(_arquivo_coluna(caminho, c), dtype=dtype, mode="r", shape=(n,))
+    return colunas, meta
@@ -0,0 +1,478 @@
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from metricas import Metricas
+from tempo_amostras import RelogioMonotonico
+
+# === CONFIGURAÇÕES Leitor ===
+CAPACIDADE_BUFFER = 200000   # amostras mantidas no buffer circular
+TAMANHO_BLOCO = 65536        # bytes máximos por ser.read()
+N_CAMPOS = 8                 # VelSet, VelReal, Pos, Ax, Ay, Az, V1, V2
+MAX_MENSAGENS = 500          # linhas de texto do firmware guardadas (banners, ecos do Commander)
+
+# ============================================================
+# BUFFER CIRCULAR
+# ============================================================
+
+class BufferCircular:
+    """
+    Buffer circular limitado, compartilhado entre a thread de leitura
+    (produtora) e o programa principal (consumidor).
+
+    As amostras ficam num array NumPy pré-alocado (capacidade x colunas).
+    Cada amostra recebe um índice sequencial (total de amostras já
+    recebidas). O consumidor marca um índice e depois pede tudo o que
+    chegou a partir dele, sem interferir na leitura.
+    """
+
+    def __init__(self, capacidade=CAPACIDADE_BUFFER, colunas=N_CAMPOS + 1):
+        self.capacidade = capacidade
+        self.dados = np.empty((capacidade, colunas))
+        self.total = 0          # amostras recebidas desde o início
+        self.sobrescritas = 0   # amostras perdidas por overflow do buffer
+        self.lock = threading.Lock()
+
+    def adicionar(self, novas):
+        n = len(novas)
+        if n == 0:
+            return
+        with self.lock:
+            guardadas = min(self.total, self.capacidade)
+            excesso = guardadas + n - self.capacidade
+            if excesso > 0:
+                self.sobrescritas += excesso
+            if n > self.capacidade:
+                novas = novas[-self.capacidade:]
+            pos = (self.total + n - len(novas)) % self.capacidade
+            parte = min(len(novas), self.capacidade - pos)
+            self.dados[pos:pos + parte] = novas[:parte]
+            self.dados[:len(novas) - parte] = novas[parte:]
+            self.total += n
+
+    def marca(self):
+        """Índice da próxima amostra a chegar."""
+        with self.lock:
+            return self.total
+
+    def ultima(self):
+        with self.lock:
+            if self.total == 0:
+                return None
+            return self.dados[(self.total - 1) % self.capacidade].copy()
+
+    def intervalo(self, inicio, fim=None):
+        """
+        Cópia das amostras com índice em [inicio, fim). As que já
+        foram sobrescritas ficam de fora.
+        """
+        with self.lock:
+            if fim is None or fim > self.total:
+                fim = self.total
+            inicio = max(inicio, self.total - self.capacidade)
+            if inicio >= fim:
+                return self.dados[:0].copy()
+            a = inicio % self.capacidade
+            b = a + (fim - inicio)
+            if b <= self.capacidade:
+                return self.dados[a:b].copy()
+            return np.concatenate((self.dados[a:], self.dados[:b - self.capacidade]))
+
+# ============================================================
+# THREAD DE LEITURA
+# ============================================================
+
+class LeitorSerial(threading.Thread):
+    """
+    Thread dedicada à aquisição: lê blocos grandes da porta serial,
+    converte (texto ou frames binários, escolhido ao conectar) e
+    coloca as amostras no buffer circular.
+
+    O programa principal só consome janelas do buffer, então prints,
+    gráficos e comandos de rampa nunca atrasam a leitura.
+    """
+
+    def __init__(self, ser, capacidade=CAPACIDADE_BUFFER, tamanho_bloco=TAMANHO_BLOCO,
+                 protocolo="ascii", relogio=None):
+        super().__init__(daemon=True)
+        self.ser = ser
+        self.buffer = BufferCircular(capacidade)
+        self.tamanho_bloco = tamanho_bloco
+        self.protocolo = protocolo
+        if protocolo == "binario":
+            self.parser = DecodificadorBinario()
+        elif protocolo == "ascii":
+            self.parser = ParserLote()
+        else:
+            raise ValueError(f"Protocolo desconhecido: {protocolo}")
+        self.relogio = relogio or RelogioMonotonico()
+        self.mensagens = deque(maxlen=MAX_MENSAGENS)   # (chegada, texto) das linhas que não são amostras
+        self.in_waiting_max = 0   # maior backlog visto na porta (na janela, ver zerar_backlog)
+        self.in_waiting_pico = 0  # ... e na sessão
+        self.erro = None
+        self._parar = threading.Event()
+
+        # contadores da thread (lidos pelo Metricas só na exportação)
+        self.bytes_lidos = 0
+        self.amostras_lidas = 0
+        self.tempo_serial = 0.0   # s dentro de in_waiting/read (inclui a espera por dados)
+        self.tempo_parse = 0.0    # s convertendo e colocando no buffer
+        self.metricas = Metricas()
+        self.metricas.fontes.append(self.contadores)
+        self.latencia = self.metricas.histograma("leitor_iteracao_segundos")
+
+    @property
+    def linhas_invalidas(self):
+        return self.parser.linhas_invalidas
+
+    def contadores(self):
+        valores = {
+            "bytes_total": self.bytes_lidos,
+            "amostras_total": self.amostras_lidas,
+            "linhas_invalidas_total": self.parser.linhas_invalidas,
+            "serial_segundos_total": self.tempo_serial,
+            "parse_segundos_total": self.tempo_parse,
+            "in_waiting_max_bytes": self.in_waiting_max,
+            "in_waiting_pico_bytes": self.in_waiting_pico,
+            "buffer_sobrescritas_total": self.buffer.sobrescritas,
+        }
+        if self.protocolo == "binario":
+            valores["frames_perdidos_total"] = self.parser.frames_perdidos
+            valores["bytes_descartados_total"] = self.parser.bytes_descartados
+        return valores
+
+    def run(self):
+        perf_counter = time.perf_counter
+        try:
+            while not self._parar.is_set():
+                t0 = perf_counter()
+                pendente = self.ser.in_waiting
+                if pendente > self.in_waiting_max:
+                    self.in_waiting_max = pendente
+                    if pendente > self.in_waiting_pico:
+                        self.in_waiting_pico = pendente
+
+                # bloqueia no máximo TIMEOUT da porta quando não há nada
+                bloco = self.ser.read(min(max(pendente, 1), self.tamanho_bloco))
+                t1 = perf_counter()
+                self.tempo_serial += t1 - t0
+                if self.metricas.captura is not None:
+                    self.metricas.captura.acompanhar("leitor")
+                if not bloco:
+                    continue
+
+                timestamp = self.relogio.agora()  # chegada do bloco
+                dados = self.parser.processar(bloco)
+                if self.parser.mensagens:
+                    self.mensagens.extend((timestamp, m) for m in self.parser.mensagens)
+                    self.parser.mensagens.clear()
+                if len(dados):
+                    novas = np.empty((len(dados), N_CAMPOS + 1))
+                    novas[:, 0] = timestamp
+                    novas[:, 1:] = dados
+                    self.buffer.adicionar(novas)
+                    self.amostras_lidas += len(dados)
+                self.bytes_lidos += len(bloco)
+                t2 = perf_counter()
+                self.tempo_parse += t2 - t1
+                self.latencia.observar(t2 - t0)
+        except Exception as e:  # porta fechada/desconectada
+            self.erro = e
+
+    def zerar_backlog(self):
+        self.in_waiting_max = 0
+
+    def parar(self):
+        self._parar.set()
+        self.join(timeout=1.0)
+
+# ============================================================
+# CONVERSÃO EM LOTE
+# ============================================================
+
+def converter_bloco(buf, n_campos=N_CAMPOS):
+    """
+    Converte um buffer de bytes com várias linhas completas
+    (separadas por \\n, campos separados por \\t) num array
+    NumPy (n_linhas x n_campos) numa única chamada.
+
+    Retorna (dados, n_invalidas). Linhas com número de campos
+    diferente de n_campos ou com valores não numéricos são
+    contadas como inválidas; linhas vazias são ignoradas.
+    """
+    bytes_ = np.frombuffer(buf, dtype=np.uint8)
+    eh_tab = bytes_ == 9  # '\t'
+    fins = np.flatnonzero(bytes_ == 10)  # '\n'
+    if len(fins) == 0 or fins[-1] != len(bytes_) - 1:
+        fins = np.append(fins, len(bytes_))
+
+    if np.count_nonzero(eh_tab) == (n_campos - 1) * len(fins):
+        # caso comum: toda linha tem o número certo de campos
+        n_invalidas = 0
+        n_validas = len(fins)
+        texto = buf
+    else:
+        # tabs e caracteres "visíveis" por linha, via soma acumulada
+        inicios = np.concatenate(([0], fins[:-1] + 1))
+        tabs = np.concatenate(([0], np.cumsum(eh_tab, dtype=np.int32)))
+        visiveis = np.concatenate(([0], np.cumsum(bytes_ > 32, dtype=np.int32)))
+        n_tabs = tabs[fins] - tabs[inicios]
+        vazias = (visiveis[fins] - visiveis[inicios]) == 0
+
+        validas = (n_tabs == n_campos - 1) & ~vazias
+        n_invalidas = int(np.count_nonzero(~validas & ~vazias))
+        n_validas = int(np.count_nonzero(validas))
+        if n_validas == 0:
+            return np.empty((0, n_campos)), n_invalidas
+
+        tamanhos = fins - inicios + 1
+        mascara = np.repeat(validas, tamanhos)[:len(bytes_)]
+        texto = bytes_[mascara].tobytes()
+
+    try:
+        valores = np.loadtxt(texto.splitlines(), delimiter="\t", ndmin=2)
+        if valores.size == n_validas * n_campos:
+            return valores.reshape(n_validas, n_campos), n_invalidas
+    except ValueError:
+        pass
+
+    # algum campo malformado: isola as linhas ruins uma a uma
+    linhas = []
+    for linha in texto.split(b"\n"):
+        if not linha.strip():
+            continue
+        dados = converter_linha(linha, n_campos)
+        if dados is None:
+            n_invalidas += 1
+        else:
+            linhas.append(dados)
+    return np.array(linhas, dtype=np.float64).reshape(-1, n_campos), n_invalidas
+
+
+class ParserLote:
+    """
+    Parser incremental do fluxo de texto: recebe blocos arbitrários
+    de bytes, guarda a última linha incompleta para o próximo bloco
+    e devolve as linhas completas já convertidas por converter_bloco.
+    Linhas de texto (banners, ecos dos comandos) ficam em mensagens.
+    """
+
+    def __init__(self, n_campos=N_CAMPOS):
+        self.n_campos = n_campos
+        self.resto = b""
+        self.linhas_validas = 0
+        self.linhas_invalidas = 0
+        self.mensagens = []
+
+    def processar(self, bloco):
+        buf = self.resto + bloco
+        corte = buf.rfind(b"\n") + 1
+        self.resto = buf[corte:]  # linha incompleta fica para o próximo bloco
+        if corte == 0:
+            return np.empty((0, self.n_campos))
+
+        dados, n_invalidas = converter_bloco(buf[:corte], self.n_campos)
+        self.linhas_validas += len(dados)
+        self.linhas_invalidas += n_invalidas
+        if n_invalidas:
+            # raro (início e comandos): separa o texto das linhas que não são amostras
+            for linha in buf[:corte].split(b"\n"):
+                if linha.count(b"\t") != self.n_campos - 1 and linha.strip():
+                    self.mensagens.append(linha.decode("utf-8", errors="ignore").strip())
+        return dados
+
+# ============================================================
+# PROTOCOLO BINÁRIO
+# ============================================================
+#
+# Frame de tamanho fixo, little-endian (38 bytes):
+#
+#   sync   uint16  0x5AA5 (bytes A5 5A)
+#   seq    uint16  contador de frames (dá a volta em 65535)
+#   VelSet, VelReal, Pos, Ax, Ay, Az   float32
+#   V1     int32   leitura bruta do ADS1256
+#   V2     float32
+#   crc    uint16  CRC-16/CCITT-FALSE de seq + canais
+#
+# Contra ~60-80 bytes por amostra em texto.
+
+SYNC = 0x5AA5
+FRAME_DTYPE = np.dtype([
+    ("sync", "<u2"), ("seq", "<u2"),
+    ("vel_set", "<f4"), ("vel_real", "<f4"), ("pos", "<f4"),
+    ("ax", "<f4"), ("ay", "<f4"), ("az", "<f4"),
+    ("v1", "<i4"), ("v2", "<f4"),
+    ("crc", "<u2"),
+])
+TAMANHO_FRAME = FRAME_DTYPE.itemsize
+CAMPOS_FRAME = ["vel_set", "vel_real", "pos", "ax", "ay", "az", "v1", "v2"]
+
+
+def _tabela_crc16(poli=0x1021):
+    tabela = np.zeros(256, dtype=np.uint16)
+    for i in range(256):
+        crc = i << 8
+        for _ in range(8):
+            crc = ((crc << 1) ^ poli) if crc & 0x8000 else (crc << 1)
+        tabela[i] = crc & 0xFFFF
+    return tabela
+
+_TABELA_CRC = _tabela_crc16()
+
+
+def crc16_frames(bytes_frames):
+    """
+    CRC-16/CCITT-FALSE de várias mensagens de mesmo tamanho de uma vez.
+    bytes_frames: array uint8 (n_frames x n_bytes). Vetorizado sobre os
+    frames, com um passo por coluna de byte.
+    """
+    crc = np.full(len(bytes_frames), 0xFFFF, dtype=np.uint16)
+    for j in range(bytes_frames.shape[1]):
+        idx = ((crc >> 8) ^ bytes_frames[:, j]) & 0xFF
+        crc = (crc << 8) ^ _TABELA_CRC[idx]
+    return crc
+
+
+def codificar_frames(dados, seq_inicial=0):
+    """
+    Monta frames binários a partir de um array (n x 8). Usado pelo
+    simulador e para gerar fluxos sintéticos de teste.
+    """
+    dados = np.asarray(dados, dtype=np.float64).reshape(-1, N_CAMPOS)
+    frames = np.zeros(len(dados), dtype=FRAME_DTYPE)
+    frames["sync"] = SYNC
+    frames["seq"] = (seq_inicial + np.arange(len(dados))) & 0xFFFF
+    for k, campo in enumerate(CAMPOS_FRAME):
+        frames[campo] = dados[:, k]
+    brutos = frames.view(np.uint8).reshape(len(dados), TAMANHO_FRAME)
+    frames["crc"] = crc16_frames(brutos[:, 2:-2])
+    return frames.tobytes()
+
+
+class DecodificadorBinario:
+    """
+    Decodificador incremental dos frames binários. Mesma interface
+    do ParserLote: processar(bloco) devolve um array (n x 8).
+
+    Enquanto o fluxo está alinhado os frames são decodificados e
+    verificados em lote. Quando a sincronia se perde (bytes perdidos
+    ou corrompidos), procura a próxima palavra de sync e continua.
+    Frames perdidos são contados pelos saltos do contador seq.
+    """
+
+    def __init__(self):
+        self.resto = b""
+        self.ultimo_seq = None
+        self.frames_validos = 0
+        self.frames_corrompidos = 0   # CRC inválido
+        self.frames_perdidos = 0      # saltos na sequência
+        self.bytes_descartados = 0    # lixo pulado na ressincronização
+        self.mensagens = []           # texto não é separado no binário (vai como lixo)
+
+    @property
+    def linhas_invalidas(self):
+        return self.frames_corrompidos
+
+    def processar(self, bloco):
+        buf = self.resto + bloco
+        bytes_ = np.frombuffer(buf, dtype=np.uint8)
+        sync = np.flatnonzero((bytes_[:-1] == 0xA5) & (bytes_[1:] == 0x5A))
+
+        partes = []
+        pos = 0
+        while True:
+            # próximo sync a partir de pos
+            k = np.searchsorted(sync, pos)
+            if k == len(sync):
+                # sem sync: guarda só o último byte (pode ser metade de um)
+                corte = max(pos, len(buf) - 1)
+                self.bytes_descartados += corte - pos
+                pos = corte
+                break
+            self.bytes_descartados += int(sync[k]) - pos
+            pos = int(sync[k])
+
+            n = (len(buf) - pos) // TAMANHO_FRAME
+            if n == 0:
+                break
+
+            # quantos frames seguidos continuam alinhados a partir de pos
+            inicios = pos + TAMANHO_FRAME * np.arange(n)
+            alinhados = (bytes_[inicios] == 0xA5) & (bytes_[inicios + 1] == 0x5A)
+            n_alinhados = n if alinhados.all() else int(np.argmin(alinhados))
+
+            fim = pos + n_alinhados * TAMANHO_FRAME
+            frames = np.frombuffer(buf, dtype=FRAME_DTYPE, count=n_alinhados, offset=pos)
+            brutos = bytes_[pos:fim].reshape(n_alinhados, TAMANHO_FRAME)
+            ok = crc16_frames(brutos[:, 2:-2]) == frames["crc"]
+
+            if ok.all():
+                partes.append(frames)
+                pos = fim
+            else:
+                # aceita até o primeiro frame ruim e ressincroniza logo depois
+                # do seu sync (o "frame" pode ter sido um falso sync no meio
+                # de dados válidos)
+                ruim = int(np.argmin(ok))
+                partes.append(frames[:ruim])
+                self.frames_corrompidos += 1
+                pos += ruim * TAMANHO_FRAME + 1
+
+        self.resto = buf[pos:]
+
+        if not partes:
+            return np.empty((0, N_CAMPOS))
+        frames = np.concatenate(partes)
+        if len(frames) == 0:
+            return np.empty((0, N_CAMPOS))
+        self._contar_perdidos(frames["seq"])
+        self.frames_validos += len(frames)
+
+        dados = np.empty((len(frames), N_CAMPOS))
+        for k, campo in enumerate(CAMPOS_FRAME):
+            dados[:, k] = frames[campo]
+        return dados
+
+    def _contar_perdidos(self, seq):
+        seq = seq.astype(np.int64)
+        if self.ultimo_seq is not None:
+            seq = np.concatenate(([self.ultimo_seq], seq))
+        saltos = (np.diff(seq) - 1) % 65536
+        self.frames_perdidos += int(saltos.sum())
+        self.ultimo_seq = int(seq[-1])
+
+# ============================================================
+# CONVERSÃO LINHA A LINHA
+# ============================================================
+
+def converter_linha(linha, n_campos=N_CAMPOS):
+    """Converte uma linha em bytes para lista de n_campos floats, ou None."""
+    linha = linha.decode("utf-8", errors="ignore").strip()
+    if not linha:
+        return None
+    try:
+        dados = [float(x) for x in linha.split("\t")]
+    except ValueError:
+        return None
+    if len(dados) != n_campos:
+        return None
+    return dados
+
+
+def ler_linha(ser):
+    """
+    Leitura original, uma linha por chamada (ser.readline()).
+    Mantida como referência para o benchmark do parser em lote.
+    """
+    try:
+        linha = ser.readline()
+        if not linha:
+            return None
+        linha = linha.decode("utf-8", errors="ignore").strip()
+        if not linha:
+            return None
+        return [float(x) for x in linha.split("\t")]
+    except:
+        return None
@@ -0,0 +1,306 @@
+"""
+Instrumentação da aquisição e exportação de métricas.
+
+A linha de telemetria mostra só a última amostra; aqui fica o que o
+laço de aquisição está fazendo enquanto roda:
+
+    - thread de leitura (LeitorSerial): bytes e amostras lidos, linhas
+      inválidas / frames perdidos, tempo dentro do ser.read() (inclui a
+      espera por dados) x tempo de parse, pico de in_waiting e
+      histograma da duração de cada iteração;
+    - laços do programa principal (coletar_janela, rampa, hold,
+      patamar): histograma do intervalo entre iterações (o sleep
+      nominal + o atraso) e o tempo gasto escrevendo no console.
+
+Cada LeitorSerial tem um Metricas (leitor.metricas); os laços só
+chamam laco(nome).iteracao() e tempo("console"), que custam algumas
+somas. O ExportadorMetricas grava um retrato a cada INTERVALO_EXPORTACAO
+num arquivo local:
+
+    *.prom    formato texto do Prometheus (o arquivo é substituído a
+              cada exportação; serve ao textfile collector do
+              node_exporter)
+    outro     JSON-lines, uma linha por exportação, com as taxas
+              (amostras/s, bytes/s) do intervalo e p50/p90/p99/máx
+
+CapturaPerfil roda o cProfile numa janela escolhida, no programa
+principal e na thread de leitura, e salva <base>_<thread>.prof
+(abre com python -m pstats ou snakeviz).
+"""
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# === CONFIGURAÇÕES Métricas ===
+INTERVALO_EXPORTACAO = 5.0   # s entre exportações
+PREFIXO = "dinamometro_"     # prefixo dos nomes no Prometheus
+LIMITES_LATENCIA = (0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.03, 0.05, 0.06, 0.08, 0.1, 0.2, 0.5, 1.0, 2.0)  # s
+QUANTIS = (0.5, 0.9, 0.99)
+LINHAS_PERFIL = 15           # funções mostradas no resumo do cProfile
+ESPERA_PERFIL = 0.5          # s para as outras threads fecharem o perfil
+
+# ============================================================
+# HISTOGRAMA
+# ============================================================
+
+class Histograma:
+    """Contagens por faixa (limites superiores, como os buckets "le" do Prometheus)."""
+
+    def __init__(self, limites=LIMITES_LATENCIA):
+        self.limites = list(limites)
+        self.contagens = [0] * (len(self.limites) + 1)   # a última faixa é +Inf
+        self.n = 0
+        self.soma = 0.0
+        self.maximo = 0.0
+
+    def observar(self, valor):
+        self.contagens[bisect_left(self.limites, valor)] += 1
+        self.n += 1
+        self.soma += valor
+        if valor > self.maximo:
+            self.maximo = valor
+
+    def quantil(self, q):
+        """Quantil q, interpolado dentro da faixa (como o histogram_quantile do Prometheus)."""
+        if self.n == 0:
+            return None
+        alvo = q * self.n
+        acumulado = 0
+        inferior = 0.0
+        for limite, contagem in zip(self.limites + [self.maximo], self.contagens):
+            superior = min(limite, self.maximo)
+            if contagem and acumulado + contagem >= alvo:
+                return inferior + (superior - inferior) * (alvo - acumulado) / contagem
+            acumulado += contagem
+            inferior = superior
+        return self.maximo
+
+    def resumo(self):
+        if self.n == 0:
+            return {"n": 0}
+        return {"n": self.n, "media": self.soma / self.n,
+                **{f"p{round(q * 100)}": self.quantil(q) for q in QUANTIS}, "max": self.maximo}
+
+# ============================================================
+# REGISTRO
+# ============================================================
+
+class Laco:
+    """Marca as iterações de um laço e registra o intervalo entre elas."""
+
+    def __init__(self, histograma):
+        self.histograma = histograma
+        self.anterior = None
+
+    def iteracao(self):
+        agora = time.perf_counter()
+        if self.anterior is not None:
+            self.histograma.observar(agora - self.anterior)
+        self.anterior = agora
+
+
+class Metricas:
+    """
+    Contadores e histogramas de uma sessão. fontes: funções sem
+    argumento que devolvem {nome: valor}, lidas só na exportação (a
+    thread de leitura mantém os próprios contadores como atributos).
+    """
+
+    def __init__(self):
+        self.contadores = {}   # nome -> valor acumulado
+        self.histogramas = {}  # (nome, rotulo) -> Histograma
+        self.fontes = []
+        self.captura = None    # CapturaPerfil pedida para alguma janela
+        self.janelas = 0       # janelas de patamar já abertas (para --perfil N)
+        self.inicio = time.time()
+
+    def incrementar(self, nome, valor=1):
+        self.contadores[nome] = self.contadores.get(nome, 0) + valor
+
+    def histograma(self, nome, rotulo=None):
+        chave = (nome, rotulo)
+        if chave not in self.histogramas:
+            self.histogramas[chave] = Histograma()
+        return self.histogramas[chave]
+
+    def laco(self, nome):
+        """Laco cujas iterações vão para o histograma laco_segundos{laco=nome}."""
+        return Laco(self.histograma("laco_segundos", nome))
+
+    @contextmanager
+    def tempo(self, nome):
+        """Soma o tempo do bloco em <nome>_segundos_total."""
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.incrementar(f"{nome}_segundos_total", time.perf_counter() - t0)
+
+    def abrir_janela(self):
+        """Início de uma janela de patamar; liga a CapturaPerfil se for a escolhida."""
+        self.janelas += 1
+        if self.captura is not None and self.captura.janela == self.janelas:
+            self.captura.iniciar()
+
+    def fechar_janela(self):
+        if self.captura is not None and self.captura.ativa:
+            self.captura.parar()
+
+    def retrato(self):
+        """Todos os valores agora: contadores, fontes e histogramas."""
+        valores = dict(self.contadores)
+        for fonte in self.fontes:
+            valores.update(fonte())
+        return valores, {chave: h for chave, h in list(self.histogramas.items())}
+
+# ============================================================
+# EXPORTAÇÃO
+# ============================================================
+
+def texto_prometheus(valores, histogramas, prefixo=PREFIXO):
+    """Formato texto de exposição do Prometheus."""
+    linhas = []
+    for nome, valor in sorted(valores.items()):
+        tipo = "counter" if nome.endswith("_total") else "gauge"
+        linhas += [f"# TYPE {prefixo}{nome} {tipo}", f"{prefixo}{nome} {float(valor):.9g}"]
+    tipos = set()
+    for (nome, rotulo), h in sorted(histogramas.items(), key=lambda kv: (kv[0][0], kv[0][1] or "")):
+        base = prefixo + nome
+        if base not in tipos:
+            linhas.append(f"# TYPE {base} histogram")
+            tipos.add(base)
+        rotulos = f'laco="{rotulo}",' if rotulo else ""
+        acumulado = 0
+        for limite, contagem in zip(h.limites, h.contagens):
+            acumulado += contagem
+            linhas.append(f'{base}_bucket{{{rotulos}le="{limite:g}"}} {acumulado}')
+        linhas.append(f'{base}_bucket{{{rotulos}le="+Inf"}} {h.n}')
+        sufixo = f"{{{rotulos.rstrip(',')}}}" if rotulos else ""
+        linhas += [f"{base}_sum{sufixo} {h.soma:.9g}", f"{base}_count{sufixo} {h.n}"]
+    return "\n".join(linhas) + "\n"
+
+
+class ExportadorMetricas(threading.Thread):
+    """Grava o retrato das métricas a cada intervalo (e uma última vez ao parar)."""
+
+    def __init__(self, metricas, caminho, intervalo=INTERVALO_EXPORTACAO):
+        super().__init__(daemon=True)
+        self.metricas = metricas
+        self.caminho = caminho
+        self.prometheus = caminho.endswith(".prom")
+        self.intervalo = intervalo
+        self.anterior = None   # (instante, valores) da exportação anterior, para as taxas
+        self._parar = threading.Event()
+
+    def run(self):
+        while not self._parar.wait(self.intervalo):
+            self.exportar()
+
+    def exportar(self):
+        valores, histogramas = self.metricas.retrato()
+        if self.prometheus:
+            # troca atômica: quem lê o arquivo nunca vê uma exportação pela metade
+            tmp = self.caminho + ".tmp"
+            with open(tmp, "w") as f:
+                f.write(texto_prometheus(valores, histogramas))
+            os.replace(tmp, self.caminho)
+            return
+
+        agora = time.monotonic()
+        taxas = {}
+        if self.anterior is not None:
+            dt = agora - self.anterior[0]
+            taxas = {nome[:-len("_total")] + "_por_s": (valor - self.anterior[1].get(nome, 0)) / dt
+                     for nome, valor in valores.items() if nome.endswith("_total") and dt > 0}
+        self.anterior = (agora, valores)
+        registro = {
+            "instante": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "decorrido_s": round(time.time() - self.metricas.inicio, 3),
+            "valores": valores,
+            "taxas": taxas,
+            "histogramas": {f'{nome}{{laco="{rotulo}"}}' if rotulo else nome: h.resumo()
+                            for (nome, rotulo), h in histogramas.items()},
+        }
+        with open(self.caminho, "a") as f:
+            f.write(json.dumps(registro) + "\n")
+
+    def parar(self):
+        self._parar.set()
+        self.join(timeout=1.0)
+        self.exportar()
+        print(f" Métricas salvas em {self.caminho}")
+
+# ============================================================
+# PERFIL (cProfile)
+# ============================================================
+
+class CapturaPerfil:
+    """
+    cProfile da janela número `janela` (1 = primeira). O programa
+    principal liga o perfil dele em iniciar(); as outras threads chamam
+    acompanhar(nome) a cada iteração e ligam/desligam o seu (o cProfile
+    só vê a thread em que foi ligado).
+    """
+
+    def __init__(self, base, janela=1):
+        self.base = base
+        self.janela = janela
+        self.ativa = False
+        self.concluida = False
+        self.perfis = {}   # nome da thread -> cProfile.Profile
+        self._fechados = {}
+
+    def iniciar(self):
+        print(f"\n[perfil] capturando a janela {self.janela}")
+        self.ativa = True
+        self.perfis["principal"] = perfil = cProfile.Profile()
+        perfil.enable()
+
+    def acompanhar(self, nome):
+        if self.concluida:
+            return
+        perfil = self.perfis.get(nome)
+        if self.ativa and perfil is None:
+            self.perfis[nome] = perfil = cProfile.Profile()
+            self._fechados[nome] = threading.Event()
+            perfil.enable()
+        elif not self.ativa and perfil is not None and not self._fechados[nome].is_set():
+            perfil.disable()
+            self._fechados[nome].set()
+
+    def parar(self):
+        self.perfis["principal"].disable()
+        self.ativa = False
+        for fechado in list(self._fechados.values()):
+            fechado.wait(ESPERA_PERFIL)
+        self.concluida = True
+
+        for nome, perfil in self.perfis.items():
+            caminho = f"{self.base}_{nome}.prof"
+            perfil.dump_stats(caminho)
+            saida = io.StringIO()
+            pstats.Stats(perfil, stream=saida).sort_stats("cumulative").print_stats(LINHAS_PERFIL)
+            print(f"\n[perfil] {nome}: {caminho}")
+            print(saida.getvalue().strip())
+
+
+def instrumentar(leitor, arquivo=None, janela_perfil=None):
+    """
+    Liga a exportação para arquivo e/ou o cProfile da janela número
+    janela_perfil de um LeitorSerial. Retorna o ExportadorMetricas
+    (parar() no fim) ou None.
+    """
+    if janela_perfil:
+        base = f"perfil_{time.strftime('%Y%m%d_%H%M%S')}"
+        leitor.metricas.captura = CapturaPerfil(base, janela_perfil)
+    if arquivo is None:
+        return None
+    exportador = ExportadorMetricas(leitor.metricas, arquivo)
+    exportador.start()
+    return exportador
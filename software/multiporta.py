@@ -0,0 +1,336 @@
+"""
+Aquisição simultânea de várias portas seriais (vários dinamômetros, ou
+um dinamômetro e um torquímetro de referência).
+
+Um processo por porta: cada um abre a serial, roda o LeitorSerial
+(thread de leitura + buffer circular), espera o fluxo (conexao.py) e
+grava o que chega no seu próprio GravadorColunar (<pasta>/<nome>.col).
+As amostras não passam pelo processo principal, então uma porta lenta,
+travada ou desconectada não atrasa as outras, e cada porta pode usar
+um núcleo.
+
+Base de tempo comum: todos os processos usam o offset do
+RelogioMonotonico criado no principal. perf_counter_ns é o mesmo
+relógio do sistema em todos os processos (CLOCK_MONOTONIC no Linux,
+QueryPerformanceCounter no Windows), então TempoChegada é comparável
+entre portas.
+
+Saúde e vazão: cada processo publica seus CONTADORES num array
+compartilhado (amostras, taxa, linhas inválidas, sobrescritas do
+buffer, backlog máximo da porta, segundos desde a última amostra);
+o principal mostra uma linha por porta.
+
+No fim, mesclar() reconstrói o tempo de cada amostra (ReconstrutorTempo)
+porta a porta e interpola todas na grade de tempo da porta de
+referência. Sai um .col com TimeStamp e as colunas <porta>_<canal>.
+Onde outra porta não tem amostra a menos de TOLERANCIA_PERIODOS
+períodos dela (lacuna, porta travada, antes do início ou depois do
+fim), a linha fica NaN nas colunas dessa porta.
+
+Uso:
+    python multiporta.py --porta COM6 --porta COM7 --nome freio --nome referencia --duracao 60
+    python multiporta.py --mesclar multiporta_20250101_120000
+"""
+import argparse
+import multiprocessing as mp
+import os
+import queue
+import shutil
+import sys
+import threading
+import time
+
+import numpy as np
+import serial
+
+from conexao import Conexao
+from gravacao import COLUNAS, EXTENSAO, GravadorColunar, abrir_colunar
+from leitura_serial import LeitorSerial
+from tempo_amostras import ReconstrutorTempo, RelogioMonotonico
+
+# === CONFIGURAÇÕES Multiporta ===
+BAUD = 230400
+TIMEOUT = 0.01
+PROTOCOLO = "ascii"
+INTERVALO = 0.1            # s entre drenagens do buffer para o disco
+INTERVALO_STATUS = 1.0     # s entre linhas de status
+TIMEOUT_INICIO = 15.0      # s até o fluxo de cada porta começar
+TIMEOUT_PARADA = 5.0       # s esperando cada processo terminar
+TOLERANCIA_PERIODOS = 3    # distância máxima ao vizinho na mescla (senão NaN)
+BLOCO_MESCLA = 1 << 18     # amostras da referência por vez na mescla
+
+CANAIS = COLUNAS[2:10]                   # VelSet..V2
+COLUNAS_PORTA = ["TempoChegada"] + CANAIS  # mesma ordem das linhas do buffer
+CONTADORES = ["estado", "amostras", "taxa", "invalidas", "sobrescritas", "backlog_max", "atraso_s"]
+C = {nome: k for k, nome in enumerate(CONTADORES)}
+CONECTANDO, GRAVANDO, ENCERRADO, ERRO = range(4)
+NOMES_ESTADO = {CONECTANDO: "conectando", GRAVANDO: "gravando", ENCERRADO: "encerrado", ERRO: "erro"}
+
+# ============================================================
+# PROCESSO DE UMA PORTA
+# ============================================================
+
+def _tarefa_comandos(ser, comandos, parar):
+    """Escreve os comandos assim que chegam (não espera a próxima drenagem)."""
+    while not parar.is_set():
+        try:
+            comando = comandos.get(timeout=INTERVALO)
+        except queue.Empty:
+            continue
+        ser.write(f"{comando}\n".encode())
+
+
+def _processo_porta(nome, porta, baud, protocolo, offset_ns, caminho, contadores, comandos,
+                    parar, resultados):
+    resultado = {"nome": nome, "porta": porta, "arquivo": None, "erro": None}
+    try:
+        ser = serial.Serial(porta, baud, timeout=TIMEOUT)
+    except (serial.SerialException, OSError) as e:
+        contadores[C["estado"]] = ERRO
+        resultados.put({**resultado, "erro": str(e)})
+        return
+
+    relogio = RelogioMonotonico(offset_ns)
+    with ser:
+        leitor = LeitorSerial(ser, protocolo=protocolo, relogio=relogio)
+        leitor.start()
+        conexao = Conexao(leitor)
+        resultado["pronto"] = conexao.aguardar_pronto(TIMEOUT_INICIO)
+        resultado["firmware"] = conexao.info
+
+        metadados = {"porta": porta, "nome": nome, "baud": baud, "protocolo": protocolo,
+                     "offset_ns": offset_ns, "firmware": conexao.info}
+        buffer = leitor.buffer
+        with GravadorColunar(caminho, metadados, COLUNAS_PORTA) as gravador:
+            resultado["arquivo"] = caminho
+            contadores[C["estado"]] = GRAVANDO
+            cursor = buffer.marca()
+            t_taxa, n_taxa = time.monotonic(), 0
+            ultima = relogio.agora()
+            threading.Thread(target=_tarefa_comandos, args=(ser, comandos, parar), daemon=True).start()
+            while True:
+                encerrar = parar.is_set() or leitor.erro is not None
+                fim = buffer.marca()
+                novas = buffer.intervalo(cursor, fim)
+                cursor = fim
+                if len(novas):
+                    gravador.adicionar(novas)
+                    ultima = novas[-1, 0]
+
+                agora = time.monotonic()
+                if agora - t_taxa >= INTERVALO_STATUS:
+                    contadores[C["taxa"]] = (gravador.n_amostras + gravador.n_chunk - n_taxa) / (agora - t_taxa)
+                    t_taxa, n_taxa = agora, gravador.n_amostras + gravador.n_chunk
+                contadores[C["amostras"]] = gravador.n_amostras + gravador.n_chunk
+                contadores[C["invalidas"]] = leitor.linhas_invalidas
+                contadores[C["sobrescritas"]] = buffer.sobrescritas
+                contadores[C["backlog_max"]] = leitor.in_waiting_max
+                contadores[C["atraso_s"]] = relogio.agora() - ultima
+                if encerrar:
+                    break
+                time.sleep(INTERVALO)
+        leitor.parar()
+
+    if leitor.erro is not None:
+        resultado["erro"] = str(leitor.erro)
+    contadores[C["estado"]] = ERRO if leitor.erro is not None else ENCERRADO
+    resultado.update({k: float(contadores[C[k]]) for k in CONTADORES[1:]})
+    resultados.put(resultado)
+
+# ============================================================
+# LADO PRINCIPAL
+# ============================================================
+
+class AquisicaoMultiporta:
+    """
+    Um processo de aquisição por porta. portas: {nome: caminho da
+    porta}. Os arquivos vão para pasta/<nome>.col.
+    """
+
+    def __init__(self, portas, pasta, baud=BAUD, protocolo=PROTOCOLO):
+        self.portas = dict(portas)
+        self.pasta = pasta
+        self.relogio = RelogioMonotonico()
+        self.parar_evento = mp.Event()
+        self.resultados = mp.Queue()
+        self.contadores = {nome: mp.RawArray("d", len(CONTADORES)) for nome in self.portas}
+        self.comandos = {nome: mp.Queue() for nome in self.portas}
+        self.processos = {}
+        os.makedirs(pasta, exist_ok=True)
+        for nome, porta in self.portas.items():
+            caminho = os.path.join(pasta, nome + EXTENSAO)
+            self.processos[nome] = mp.Process(
+                target=_processo_porta, name=f"porta-{nome}", daemon=True,
+                args=(nome, porta, baud, protocolo, self.relogio.offset_ns, caminho,
+                      self.contadores[nome], self.comandos[nome], self.parar_evento, self.resultados))
+
+    def start(self):
+        for p in self.processos.values():
+            p.start()
+        return self
+
+    def enviar(self, comando, nome=None):
+        """Comando do Commander (ex.: "T50") para uma porta ou, sem nome, para todas."""
+        for n in ([nome] if nome is not None else self.comandos):
+            self.comandos[n].put(comando)
+
+    def saude(self):
+        """{nome: {contador: valor}} no momento."""
+        saude = {}
+        for nome, c in self.contadores.items():
+            valores = dict(zip(CONTADORES, c[:]))
+            valores["estado"] = NOMES_ESTADO[int(valores["estado"])]
+            valores["vivo"] = self.processos[nome].is_alive()
+            saude[nome] = valores
+        return saude
+
+    def linha_status(self):
+        partes = []
+        for nome, s in self.saude().items():
+            partes.append(f"{nome}: {s['estado'][:4]} {s['taxa']:6.0f} a/s {int(s['amostras']):>9} "
+                          f"inv {int(s['invalidas'])} ovf {int(s['sobrescritas'])} atraso {s['atraso_s']:4.1f}s")
+        return " | ".join(partes)
+
+    def parar(self):
+        """Encerra todos os processos. Retorna {nome: resultado}."""
+        self.parar_evento.set()
+        resultados = {}
+        limite = time.monotonic() + TIMEOUT_PARADA
+        while len(resultados) < len(self.processos) and time.monotonic() < limite:
+            try:
+                r = self.resultados.get(timeout=0.1)
+            except queue.Empty:
+                if not any(p.is_alive() for p in self.processos.values()):
+                    break
+                continue
+            resultados[r["nome"]] = r
+        for nome, p in self.processos.items():
+            p.join(timeout=max(limite - time.monotonic(), 0.1))
+            if p.is_alive():   # porta travada no driver: não segura as outras
+                p.terminate()
+            if nome not in resultados:
+                resultados[nome] = {"nome": nome, "porta": self.portas[nome], "erro": "sem resposta",
+                                    "arquivo": os.path.join(self.pasta, nome + EXTENSAO)}
+        return resultados
+
+# ============================================================
+# MESCLA ALINHADA NO TEMPO
+# ============================================================
+
+def _tempos(colunas, taxa_nominal=None):
+    """Tempo reconstruído de cada amostra e o período estimado da porta."""
+    chegada = np.asarray(colunas["TempoChegada"], dtype=np.float64)
+    tempos, info = ReconstrutorTempo(taxa_nominal).reconstruir(chegada)
+    taxa = info["taxa_estimada"] or (len(chegada) - 1) / max(chegada[-1] - chegada[0], 1e-9)
+    return tempos, 1 / taxa, info
+
+
+def mesclar(pasta, nomes=None, referencia=None, saida=None, taxa_nominal=None):
+    """
+    Mescla os <nome>.col da pasta num .col alinhado no tempo da porta
+    de referência (a primeira, se None). Retorna o caminho da saída.
+    """
+    if nomes is None:
+        nomes = sorted(os.path.splitext(a)[0] for a in os.listdir(pasta) if a.endswith(EXTENSAO)
+                       and not a.startswith("mesclado"))
+    referencia = referencia or nomes[0]
+    nomes = [referencia] + [n for n in nomes if n != referencia]
+
+    portas = {}
+    for nome in nomes:
+        caminho = os.path.join(pasta, nome + EXTENSAO)
+        if not os.path.isdir(caminho):
+            print(f"[aviso] {nome}: {caminho} não existe, fora da mescla")
+            continue
+        colunas, meta = abrir_colunar(caminho)
+        if len(colunas["TempoChegada"]) < 2:
+            print(f"[aviso] {nome}: sem amostras, fora da mescla")
+            continue
+        tempos, periodo, info = _tempos(colunas, taxa_nominal)
+        portas[nome] = {"colunas": colunas, "tempos": tempos, "periodo": periodo, "info": info,
+                        "metadados": meta["metadados"]}
+    if referencia not in portas:
+        raise ValueError(f"Porta de referência {referencia} sem amostras")
+
+    # grade da referência inteira; fora do trecho de outra porta, NaN
+    t_ref = portas[referencia]["tempos"]
+
+    colunas_saida = ["TimeStamp"] + [f"{nome}_{c}" for nome in portas for c in CANAIS]
+    meta = {
+        "referencia": referencia,
+        "portas": {nome: {"taxa_estimada": 1 / p["periodo"], "n_amostras": len(p["tempos"]),
+                          "lacunas": p["info"]["lacunas"], "amostras_faltando": p["info"]["amostras_faltando"],
+                          "deriva": p["info"]["deriva"], "metadados": p["metadados"]}
+                   for nome, p in portas.items()},
+        "inicio": float(t_ref[0]), "fim": float(t_ref[-1]),
+    }
+    saida = saida or os.path.join(pasta, "mesclado" + EXTENSAO)
+    if os.path.isdir(saida):
+        shutil.rmtree(saida)   # mescla anterior (derivada; refeita do zero)
+    with GravadorColunar(saida, meta, colunas_saida) as gravador:
+        for i in range(0, len(t_ref), BLOCO_MESCLA):
+            t = t_ref[i:i + BLOCO_MESCLA]
+            bloco = np.empty((len(t), len(colunas_saida)))
+            bloco[:, 0] = t
+            k = 1
+            for nome, p in portas.items():
+                if nome == referencia:
+                    for c in CANAIS:
+                        bloco[:, k] = p["colunas"][c][i:i + len(t)]
+                        k += 1
+                    continue
+                tp = p["tempos"]
+                j = np.clip(np.searchsorted(tp, t), 1, len(tp) - 1)
+                distancia = np.minimum(np.abs(t - tp[j - 1]), np.abs(tp[j] - t))
+                lacuna = distancia > TOLERANCIA_PERIODOS * p["periodo"]
+                for c in CANAIS:
+                    valores = np.asarray(p["colunas"][c][j.min() - 1:j.max() + 1])
+                    bloco[:, k] = np.interp(t, tp[j.min() - 1:j.max() + 1], valores)
+                    bloco[lacuna, k] = np.nan
+                    k += 1
+            gravador.adicionar(bloco)
+    return saida
+
+# ============================================================
+# MAIN
+# ============================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Aquisição simultânea de várias portas seriais.")
+    parser.add_argument("--porta", action="append", default=[], help="porta serial (repetir para cada uma)")
+    parser.add_argument("--nome", action="append", default=[], help="nome de cada porta (mesma ordem)")
+    parser.add_argument("--baud", type=int, default=BAUD)
+    parser.add_argument("--protocolo", choices=["ascii", "binario"], default=PROTOCOLO)
+    parser.add_argument("--duracao", type=float, default=None, help="s de aquisição (sem: até Ctrl-C)")
+    parser.add_argument("--pasta", default=None, help="pasta de saída (padrão multiporta_AAAAMMDD_HHMMSS)")
+    parser.add_argument("--referencia", default=None, help="porta cuja grade de tempo é usada na mescla")
+    parser.add_argument("--mesclar", metavar="PASTA", help="só mescla uma aquisição já gravada")
+    args = parser.parse_args()
+
+    if args.mesclar:
+        print(f"Mesclado em {mesclar(args.mesclar, referencia=args.referencia)}")
+        return
+    if not args.porta:
+        parser.error("informe ao menos uma --porta")
+    nomes = args.nome + [f"porta{k}" for k in range(len(args.nome), len(args.porta))]
+    pasta = args.pasta or f"multiporta_{time.strftime('%Y%m%d_%H%M%S')}"
+
+    aquisicao = AquisicaoMultiporta(dict(zip(nomes, args.porta)), pasta, args.baud, args.protocolo).start()
+    t0 = time.monotonic()
+    try:
+        while args.duracao is None or time.monotonic() - t0 < args.duracao:
+            time.sleep(INTERVALO_STATUS)
+            sys.stdout.write("\r" + aquisicao.linha_status() + "  ")
+            sys.stdout.flush()
+    except KeyboardInterrupt:
+        pass
+    resultados = aquisicao.parar()
+    print()
+    for nome, r in resultados.items():
+        if r.get("erro"):
+            print(f"[aviso] {nome} ({r['porta']}): {r['erro']}")
+    print(f"Mesclado em {mesclar(pasta, nomes, args.referencia)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,391 @@
+"""
+Planos de ensaio declarativos e execução desacompanhada (headless).
+
+O ensaio do calibracao_aquisicao_v0-1.py depende de input() e do
+msvcrt.kbhit() (só Windows) para começar, e os setpoints, tempos e a
+rampa são constantes do módulo. Aqui cada ensaio é um plano num
+arquivo JSON e uma fila de planos roda inteira, sem operador:
+
+    {
+      "padrao": {"tempo_zero": 5, "pga": 64, "mux": 0},
+      "planos": [
+        {"nome": "varredura", "setpoints": [73.3, 83.78, 94.25],
+         "tempo_aquisicao": 5, "repeticoes": 3,
+         "rampa": {"perfil": "s", "aceleracao": 20},
+         "dwell": {"min_s": 2, "max_s": 15, "alvo_erro_V1": 5, "alvo_erro_VelReal": 0.01}},
+        {"nome": "lenta", "setpoints": [50, 60], "portao": "plano",
+         "mensagem_portao": "Troque o rotor"}
+      ]
+    }
+
+O arquivo pode ser também um plano só ou uma lista de planos; "padrao"
+vale para todos os planos do arquivo. Campos e valores padrão em PADRAO;
+"rampa" aceita os argumentos da RampaMalhaFechada; "dwell": null usa
+tempo_aquisicao fixo.
+
+Cada repetição de um plano é uma unidade (um arquivo de aquisição).
+O estado da fila fica em <fila>.estado.json e é atualizado a cada
+patamar concluído (checkpoint). Rodando de novo o mesmo comando depois
+de uma interrupção (queda de energia, Ctrl-C, porta caída), as unidades
+concluídas são puladas e a interrompida continua do primeiro setpoint
+não concluído, num arquivo novo (um patamar cortado no meio fica no
+arquivo antigo como hold, marcado "interrompido", e é medido de novo). Um plano editado depois de começar recomeça do zero.
+
+Portões de operador (opcionais): "portao": "plano" (antes da 1ª
+repetição) ou "repeticao" (antes de cada uma). A fila para até ENTER no
+terminal ou até o arquivo <fila>.continuar ser criado (touch, ex.: por
+ssh); --sem-portoes ignora todos.
+
+Uso:
+    python plano_ensaio.py --exemplo > noite.json
+    python plano_ensaio.py noite.json --porta /dev/ttyUSB0 --pasta ensaios/
+"""
+import argparse
+import copy
+import hashlib
+import json
+import math
+import os
+import queue
+import sys
+import threading
+import time
+
+import serial
+
+from conexao import Conexao, zerar_ads
+from ensaio_async import aquisitar_async
+from estatistica_online import DwellAdaptativo
+from gravacao import novo_gravador
+from leitura_serial import LeitorSerial
+from metricas import instrumentar
+from rampa import RampaMalhaFechada, executar_rampa
+from registro_calibracao import FORMATO_DATA, RegistroCalibracao, coef_load_de
+from resumo_ensaio import ResumoPatamares
+from tempo_amostras import ReconstrutorTempo
+
+# === CONFIGURAÇÕES Serial ===
+BAUD = 230400
+TIMEOUT = 0.01
+PROTOCOLO = "ascii"
+TAXA_NOMINAL = None
+
+# === CONFIGURAÇÕES Plano ===
+PADRAO = {
+    "nome": "plano",
+    "setpoints": [],          # rad/s, na ordem
+    "sp_inicial": None,       # None = primeiro setpoint
+    "tempo_aquisicao": 5.0,   # s por patamar (sem dwell adaptativo)
+    "tempo_zero": 5.0,        # s de hold no sp_inicial antes do 1º patamar
+    "repeticoes": 1,
+    "pga": 64,                # ganho do ADS1256 (1, 2, 4, ..., 64)
+    "mux": 0,                 # 0 = DIFF_0_1, 1 = DIFF_2_3
+    "zerar_ads": True,        # SELFCAL (M3) antes de cada repetição
+    "dwell": None,            # {"min_s", "max_s", "alvo_erro_V1", "alvo_erro_VelReal"} ou None
+    "rampa": {},              # argumentos da RampaMalhaFechada (perfil, aceleracao, jerk, ...)
+    "v_vento": 7.0,           # m/s, para o resumo Cp x TSR
+    "formato": "colunar",     # "colunar" ou "txt"
+    "portao": None,           # None, "plano" ou "repeticao"
+    "mensagem_portao": "",
+}
+CHAVES_DWELL = ("min_s", "max_s", "alvo_erro_V1", "alvo_erro_VelReal")
+CHAVES_RAMPA = ("perfil", "aceleracao", "jerk", "taxa", "tolerancia", "tempo_assentamento",
+                "timeout", "janela_media")
+D_ROTOR = 22e-2           # metros
+RHO = 1.225               # kg/m³
+INTERVALO_PORTAO = 0.5    # s entre verificações do arquivo de liberação
+
+# ============================================================
+# PLANOS
+# ============================================================
+
+def validar_plano(plano, padrao=None):
+    """Plano completo (PADRAO + padrao do arquivo + plano), verificado."""
+    completo = copy.deepcopy(PADRAO)
+    for origem in (padrao or {}, plano):
+        desconhecidas = set(origem) - set(PADRAO)
+        if desconhecidas:
+            raise ValueError(f"Campos desconhecidos no plano: {sorted(desconhecidas)}")
+        completo.update(copy.deepcopy(origem))
+
+    nome = completo["nome"]
+    if not completo["setpoints"]:
+        raise ValueError(f"Plano {nome}: lista de setpoints vazia")
+    completo["setpoints"] = [float(sp) for sp in completo["setpoints"]]
+    if completo["sp_inicial"] is None:
+        completo["sp_inicial"] = completo["setpoints"][0]
+    if int(completo["repeticoes"]) < 1:
+        raise ValueError(f"Plano {nome}: repeticoes deve ser >= 1")
+    if completo["pga"] not in [2 ** k for k in range(7)]:
+        raise ValueError(f"Plano {nome}: pga deve ser 1, 2, 4, 8, 16, 32 ou 64")
+    if completo["mux"] not in (0, 1):
+        raise ValueError(f"Plano {nome}: mux deve ser 0 ou 1")
+    if completo["portao"] not in (None, "plano", "repeticao"):
+        raise ValueError(f"Plano {nome}: portao deve ser null, \"plano\" ou \"repeticao\"")
+    if completo["dwell"] is not None and set(completo["dwell"]) != set(CHAVES_DWELL):
+        raise ValueError(f"Plano {nome}: dwell precisa de {CHAVES_DWELL}")
+    if set(completo["rampa"]) - set(CHAVES_RAMPA):
+        raise ValueError(f"Plano {nome}: rampa aceita {CHAVES_RAMPA}")
+    RampaMalhaFechada(0, 1, 0, **completo["rampa"])   # valida perfil e valores
+    return completo
+
+
+def carregar_fila(arquivos):
+    """Planos validados de um ou mais arquivos, na ordem."""
+    planos = []
+    for arquivo in arquivos:
+        with open(arquivo, encoding="utf-8") as f:
+            conteudo = json.load(f)
+        padrao = {}
+        if isinstance(conteudo, dict) and "planos" in conteudo:
+            padrao = conteudo.get("padrao", {})
+            conteudo = conteudo["planos"]
+        if isinstance(conteudo, dict):
+            conteudo = [conteudo]
+        planos += [validar_plano(p, padrao) for p in conteudo]
+    return planos
+
+
+def assinatura(plano):
+    """Hash do plano: um plano editado não reaproveita o estado antigo."""
+    return hashlib.sha1(json.dumps(plano, sort_keys=True).encode()).hexdigest()[:12]
+
+
+def exemplo():
+    """Fila de exemplo com os valores padrão (para --exemplo)."""
+    plano = {k: v for k, v in PADRAO.items() if k not in ("sp_inicial", "portao", "mensagem_portao")}
+    plano.update({"nome": "varredura", "setpoints": [73.30, 83.78, 94.25, 104.72, 115.19],
+                  "dwell": {"min_s": 2.0, "max_s": 15.0, "alvo_erro_V1": 5.0, "alvo_erro_VelReal": 0.01},
+                  "rampa": {"perfil": "s", "aceleracao": 20.0}})
+    return {"padrao": {}, "planos": [plano]}
+
+# ============================================================
+# ESTADO (CHECKPOINT)
+# ============================================================
+
+class EstadoFila:
+    """
+    <fila>.estado.json: por unidade (plano, repetição), quantos
+    setpoints já foram gravados, os arquivos e se terminou.
+    """
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self.unidades = {}
+        if os.path.exists(caminho):
+            with open(caminho, encoding="utf-8") as f:
+                self.unidades = json.load(f)["unidades"]
+
+    def unidade(self, chave):
+        return self.unidades.setdefault(chave, {"feitos": 0, "arquivos": [], "completo": False})
+
+    def salvar(self):
+        # temporário + troca: uma queda no meio nunca deixa o estado pela metade
+        tmp = self.caminho + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"atualizado": time.strftime("%Y-%m-%d %H:%M:%S"), "unidades": self.unidades},
+                      f, indent=2, ensure_ascii=False)
+        os.replace(tmp, self.caminho)
+
+# ============================================================
+# PORTÃO DE OPERADOR
+# ============================================================
+
+class Portao:
+    """Libera com ENTER no terminal (se houver) ou criando o arquivo."""
+
+    def __init__(self, arquivo, ativo=True):
+        self.arquivo = arquivo
+        self.ativo = ativo
+        self.linhas = queue.Queue()
+        if ativo and sys.stdin is not None and sys.stdin.isatty():
+            threading.Thread(target=self._ler_terminal, daemon=True).start()
+
+    def _ler_terminal(self):
+        for linha in sys.stdin:
+            self.linhas.put(linha)
+
+    def aguardar(self, mensagem):
+        if not self.ativo:
+            return
+        while not self.linhas.empty():   # ENTERs antigos não liberam
+            self.linhas.get_nowait()
+        print(f"\n[portão] {mensagem or 'Aguardando operador'}: ENTER ou  touch {self.arquivo}")
+        while True:
+            if os.path.exists(self.arquivo):
+                os.remove(self.arquivo)
+                return
+            try:
+                self.linhas.get(timeout=INTERVALO_PORTAO)
+                return
+            except queue.Empty:
+                pass
+
+# ============================================================
+# EXECUÇÃO
+# ============================================================
+
+def _nova_rampa(parametros):
+    return lambda atual, alvo, inicio: RampaMalhaFechada(atual, alvo, inicio, **parametros)
+
+
+def _novo_dwell(dwell):
+    if dwell is None:
+        return None
+    return lambda: DwellAdaptativo({"V1": (7, dwell["alvo_erro_V1"]), "VelReal": (2, dwell["alvo_erro_VelReal"])},
+                                   dwell["min_s"], dwell["max_s"])
+
+
+def _velset_atual(leitor):
+    """Setpoint em que o firmware está (VelSet da última amostra)."""
+    ultima = leitor.buffer.ultima()
+    return float(ultima[1]) if ultima is not None else 0.0
+
+
+class ExecutorFila:
+    def __init__(self, leitor, conexao, planos, estado, portao, pasta=None):
+        self.leitor = leitor
+        self.conexao = conexao
+        self.planos = planos
+        self.estado = estado
+        self.portao = portao
+        self.pasta = pasta
+        self.reconstrutor = ReconstrutorTempo(TAXA_NOMINAL)
+        self.pga = None   # PGA configurado nesta sessão
+
+    def configurar(self, plano):
+        if plano["pga"] != self.pga:
+            self.conexao.enviar(f"G{int(math.log2(plano['pga']))}")
+            self.pga = plano["pga"]
+        if plano["zerar_ads"]:
+            zerar_ads(self.conexao, plano["mux"])
+        else:
+            self.conexao.trocar_modo(plano["mux"])
+
+    def executar_unidade(self, plano, repeticao, chave):
+        unidade = self.estado.unidade(chave)
+        restantes = plano["setpoints"][unidade["feitos"]:]
+        if not restantes:
+            unidade["completo"] = True
+            self.estado.salvar()
+            return
+
+        self.configurar(plano)
+        calibracao = RegistroCalibracao().por_data(time.strftime(FORMATO_DATA), plano["pga"], plano["mux"])
+        coef = coef_load_de(calibracao) if calibracao else None
+        resumo = ResumoPatamares(coef, RHO, plano["v_vento"], D_ROTOR)
+        metadados = {
+            "plano": plano,
+            "repeticao": repeticao,
+            "setpoints_executados": restantes,
+            "retomado_de": unidade["feitos"] or None,
+            "porta": self.leitor.ser.port,
+            "baud": self.leitor.ser.baudrate,
+            "protocolo": self.leitor.protocolo,
+            "firmware": self.conexao.info,
+            "calibracao": {"registro": calibracao["chave"] if calibracao else None},
+        }
+
+        with novo_gravador(plano["formato"], metadados, self.pasta) as gravador:
+            unidade["arquivos"].append(gravador.caminho)
+            self.estado.salvar()
+
+            def concluido(sp):
+                descarregar = getattr(gravador, "descarregar", None)
+                if descarregar is not None:
+                    descarregar()   # o que o estado diz estar feito já está em disco
+                unidade["feitos"] += 1
+                self.estado.salvar()
+
+            try:
+                aquisitar_async(
+                    self.leitor, gravador, self.reconstrutor, restantes, plano["tempo_aquisicao"],
+                    plano["sp_inicial"], _velset_atual(self.leitor), plano["tempo_zero"],
+                    _nova_rampa(plano["rampa"]), esperar_enter=False,
+                    novo_dwell=_novo_dwell(plano["dwell"]), resumo=resumo, concluido=concluido,
+                )
+            finally:
+                resumo.salvar(gravador.caminho)   # também os patamares de uma unidade interrompida
+        unidade["completo"] = unidade["feitos"] >= len(plano["setpoints"])
+        self.estado.salvar()
+
+    def executar(self):
+        for i, plano in enumerate(self.planos):
+            for r in range(int(plano["repeticoes"])):
+                chave = f"{i}:{plano['nome']}:{assinatura(plano)}:{r}"
+                if self.estado.unidade(chave)["completo"]:
+                    print(f"{plano['nome']} #{r + 1}: já concluído, pulando")
+                    continue
+                if plano["portao"] == "repeticao" or (plano["portao"] == "plano" and r == 0):
+                    self.portao.aguardar(plano["mensagem_portao"])
+                print(f"\n=== {plano['nome']} #{r + 1}/{plano['repeticoes']} "
+                      f"({len(plano['setpoints'])} setpoints) ===")
+                self.executar_unidade(plano, r, chave)
+
+        print("\nFila concluída, rampa até 0")
+        executar_rampa(self.leitor, _velset_atual(self.leitor), 0)
+        self.leitor.ser.write(b"T0\n")
+
+# ============================================================
+# MAIN
+# ============================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Executa uma fila de planos de ensaio sem operador.")
+    parser.add_argument("planos", nargs="*", help="arquivos JSON de planos, na ordem")
+    parser.add_argument("--porta", help="porta serial (ex: /dev/ttyUSB0 ou o pty do simulador.py)")
+    parser.add_argument("--baud", type=int, default=BAUD)
+    parser.add_argument("--protocolo", choices=["ascii", "binario"], default=PROTOCOLO)
+    parser.add_argument("--pasta", default=None, help="pasta dos arquivos de aquisição")
+    parser.add_argument("--estado", default=None, help="arquivo de estado (padrão <1º plano>.estado.json)")
+    parser.add_argument("--do-zero", action="store_true", help="ignora o estado salvo")
+    parser.add_argument("--sem-portoes", action="store_true", help="não para nos portões de operador")
+    parser.add_argument("--verificar", action="store_true", help="só valida os planos e mostra a fila")
+    parser.add_argument("--exemplo", action="store_true", help="imprime uma fila de exemplo")
+    parser.add_argument("--metricas", help="exporta métricas da aquisição (.prom = Prometheus, senão JSON-lines)")
+    parser.add_argument("--perfil", type=int, metavar="N", help="cProfile da N-ésima janela de patamar")
+    args = parser.parse_args()
+
+    if args.exemplo:
+        print(json.dumps(exemplo(), indent=2, ensure_ascii=False))
+        return
+    if not args.planos:
+        parser.error("informe ao menos um arquivo de planos")
+    planos = carregar_fila(args.planos)
+    for p in planos:
+        print(f"{p['nome']}: {len(p['setpoints'])} setpoints x {p['repeticoes']} "
+              f"(PGA {p['pga']}, MUX {p['mux']}, portão {p['portao']})")
+    if args.verificar:
+        return
+    if not args.porta:
+        parser.error("--porta é obrigatório para executar")
+
+    base = os.path.splitext(args.planos[0])[0]
+    caminho_estado = args.estado or base + ".estado.json"
+    if args.do_zero and os.path.exists(caminho_estado):
+        os.remove(caminho_estado)
+    estado = EstadoFila(caminho_estado)
+    portao = Portao(base + ".continuar", ativo=not args.sem_portoes)
+
+    with serial.Serial(args.porta, args.baud, timeout=TIMEOUT) as ser:
+        leitor = LeitorSerial(ser, protocolo=args.protocolo)
+        leitor.start()
+        exportador = instrumentar(leitor, args.metricas, args.perfil)
+        conexao = Conexao(leitor)
+        if not conexao.aguardar_pronto():
+            raise SystemExit("Dinamômetro sem fluxo de amostras")
+        try:
+            ExecutorFila(leitor, conexao, planos, estado, portao, args.pasta).executar()
+        except KeyboardInterrupt:
+            print(f"\nInterrompido. Estado em {caminho_estado}: rode o mesmo comando para continuar.")
+            print("Aplicando rampa até 0 (Ctrl-C de novo para sair já)")
+            executar_rampa(leitor, _velset_atual(leitor), 0)
+            leitor.ser.write(b"T0\n")
+        finally:
+            leitor.parar()
+            if exportador is not None:
+                exportador.parar()
+
+
+if __name__ == "__main__":
+    main()
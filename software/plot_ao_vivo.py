@@ -0,0 +1,250 @@
+"""
+Gráfico ao vivo da calibração e do ensaio, em outro processo.
+
+O processo de aquisição só copia as amostras novas do buffer da
+thread de leitura para um anel em multiprocessing.shared_memory
+(thread alimentadora, 20 Hz) e manda eventos pequenos da calibração
+por uma fila. Desenhar fica todo no processo do gráfico: se ele
+atrasar, só perde quadros; a leitura da serial nunca espera por ele.
+
+No processo do gráfico cada quadro lê só os últimos JANELA_S segundos
+do anel, decima por min/max em N_BINS faixas e redesenha com blitting
+(fundo, eixos e textos só são redesenhados quando a escala muda).
+O custo do quadro não depende do número de amostras.
+
+    V1 x tempo
+    VelReal e VelSet x tempo
+    calibração: amostras (decimadas) por massa, médias e reta ajustada
+"""
+import multiprocessing as mp
+import queue
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from decimacao import decimar_minmax
+
+# === CONFIGURAÇÕES Plot ao vivo ===
+CAPACIDADE = 65536     # linhas do anel compartilhado
+JANELA_S = 10.0        # segundos mostrados nos gráficos de tempo
+N_BINS = 800           # faixas da decimação min/max (~ largura em pixels)
+INTERVALO_ALIMENTACAO = 0.05
+INTERVALO_QUADRO = 0.05
+MAX_PONTOS_MASSA = 400  # amostras de calibração enviadas por massa (decimadas)
+
+# colunas do anel: tempo de chegada, VelSet, VelReal, V1
+COLUNAS_BUFFER = [0, 1, 2, 7]   # índices nas linhas do BufferCircular
+T, VELSET, VELREAL, V1 = range(4)
+
+# ============================================================
+# ANEL EM MEMÓRIA COMPARTILHADA
+# ============================================================
+#
+# [total (int64)] [dados float64 CAPACIDADE x 4]
+# O escritor copia as linhas e só depois avança total; o leitor
+# relê total depois de copiar para descartar o que foi sobrescrito.
+
+def _abrir_anel(shm, capacidade):
+    total = np.ndarray((1,), dtype=np.int64, buffer=shm.buf)
+    dados = np.ndarray((capacidade, len(COLUNAS_BUFFER)), dtype=np.float64, buffer=shm.buf, offset=8)
+    return total, dados
+
+
+def _ler_ultimas(total, dados, janela_s):
+    capacidade = len(dados)
+    fim = int(total[0])
+    if fim == 0:
+        return dados[:0].copy()
+    inicio = max(0, fim - capacidade)
+    idx = np.arange(inicio, fim) % capacidade
+    linhas = dados[idx]
+    # descarta o que o escritor sobrescreveu durante a cópia
+    perdidas = int(total[0]) - fim
+    if perdidas > 0:
+        linhas = linhas[perdidas:]
+    if len(linhas):
+        linhas = linhas[linhas[:, T] >= linhas[-1, T] - janela_s]
+    return linhas
+
+# ============================================================
+# PROCESSO DO GRÁFICO
+# ============================================================
+
+def _limites(y, atual, margem=0.1):
+    """Novos limites se y saiu dos atuais ou ocupa pouco deles; senão None."""
+    if len(y) == 0:
+        return None
+    lo, hi = float(np.nanmin(y)), float(np.nanmax(y))
+    if not np.isfinite(lo) or not np.isfinite(hi):
+        return None
+    faixa = max(hi - lo, 1e-9)
+    a_lo, a_hi = atual
+    if lo >= a_lo and hi <= a_hi and faixa > 0.3 * (a_hi - a_lo):
+        return None
+    return lo - margem * faixa, hi + margem * faixa
+
+
+def _processo_plot(nome_shm, capacidade, eventos, parar):
+    import matplotlib.pyplot as plt
+
+    shm = shared_memory.SharedMemory(name=nome_shm)
+    total, dados = _abrir_anel(shm, capacidade)
+
+    fig, (ax_v1, ax_vel, ax_cal) = plt.subplots(3, 1, figsize=(9, 9))
+    fig.canvas.manager.set_window_title("Dinamômetro - ao vivo")
+    ax_v1.set_ylabel("V1 [int]")
+    ax_vel.set_ylabel("Velocidade [rad/s]")
+    ax_vel.set_xlabel("Tempo [s] (0 = agora)")
+    for ax in (ax_v1, ax_vel):
+        ax.set_xlim(-JANELA_S, 0)
+        ax.grid(True, linestyle="--", alpha=0.6)
+    ax_cal.set_xlabel("Massa [g]")
+    ax_cal.set_ylabel("Leitura [int]")
+    ax_cal.set_title("Calibração da célula de carga - Canal 1")
+    ax_cal.grid(True, linestyle="--", alpha=0.6)
+
+    (l_v1,) = ax_v1.plot([], [], lw=0.8, animated=True)
+    (l_real,) = ax_vel.plot([], [], lw=0.8, label="VelReal", animated=True)
+    (l_set,) = ax_vel.plot([], [], lw=1.2, label="VelSet", animated=True)
+    ax_vel.legend(loc="upper left")
+    (l_cal,) = ax_cal.plot([], [], ".", ms=3, alpha=0.5, animated=True)
+    (l_medias,) = ax_cal.plot([], [], "o-", color="tab:red", animated=True)
+    (l_reta,) = ax_cal.plot([], [], "--", color="k", lw=1, animated=True)
+    artistas = [l_v1, l_real, l_set, l_cal, l_medias, l_reta]
+
+    calibracao = {}   # massa -> (amostras decimadas, média)
+
+    plt.show(block=False)
+    fig.canvas.draw()
+    fundo = fig.canvas.copy_from_bbox(fig.bbox)
+
+    while not parar.is_set() and plt.fignum_exists(fig.number):
+        redesenhar = False
+
+        # eventos da calibração
+        while True:
+            try:
+                evento = eventos.get_nowait()
+            except queue.Empty:
+                break
+            if evento[0] == "massa":
+                _, massa, leituras, media = evento
+                calibracao[massa] = (leituras, media)
+            elif evento[0] == "descartar":
+                calibracao.pop(evento[1], None)
+            if calibracao:
+                massas = sorted(calibracao)
+                xs = np.concatenate([np.full(len(calibracao[m][0]), m) for m in massas])
+                ys = np.concatenate([calibracao[m][0] for m in massas])
+                medias = [calibracao[m][1] for m in massas]
+                l_cal.set_data(xs, ys)
+                l_medias.set_data(massas, medias)
+                if len(massas) >= 2:
+                    a, b = np.polyfit(massas, medias, 1)
+                    l_reta.set_data(massas, np.polyval([a, b], massas))
+                ax_cal.set_xlim(min(massas) - 2, max(massas) + 2)
+                ax_cal.set_ylim(float(ys.min()), float(ys.max()) if ys.max() > ys.min() else ys.min() + 1)
+            else:
+                for l in (l_cal, l_medias, l_reta):
+                    l.set_data([], [])
+            redesenhar = True
+
+        # séries de tempo: últimos JANELA_S segundos, decimadas
+        linhas = _ler_ultimas(total, dados, JANELA_S)
+        if len(linhas):
+            t = linhas[:, T] - linhas[-1, T]
+            l_v1.set_data(*decimar_minmax(t, linhas[:, V1]))
+            l_real.set_data(*decimar_minmax(t, linhas[:, VELREAL]))
+            l_set.set_data(*decimar_minmax(t, linhas[:, VELSET]))
+
+            novos = _limites(linhas[:, V1], ax_v1.get_ylim())
+            if novos:
+                ax_v1.set_ylim(*novos)
+                redesenhar = True
+            novos = _limites(linhas[:, [VELREAL, VELSET]], ax_vel.get_ylim())
+            if novos:
+                ax_vel.set_ylim(*novos)
+                redesenhar = True
+
+        if redesenhar:
+            # escala mudou: desenha eixos e textos de novo e guarda o fundo
+            fig.canvas.draw()
+            fundo = fig.canvas.copy_from_bbox(fig.bbox)
+        fig.canvas.restore_region(fundo)
+        for artista in artistas:
+            artista.axes.draw_artist(artista)
+        fig.canvas.blit(fig.bbox)
+        fig.canvas.flush_events()
+        time.sleep(INTERVALO_QUADRO)
+
+    plt.close(fig)
+    del total, dados
+    shm.close()
+
+# ============================================================
+# LADO DA AQUISIÇÃO
+# ============================================================
+
+class PlotAoVivo:
+    """
+    Abre o processo do gráfico e alimenta o anel compartilhado a
+    partir do buffer do LeitorSerial, numa thread própria.
+    Todos os métodos retornam na hora.
+    """
+
+    def __init__(self, leitor, capacidade=CAPACIDADE):
+        self.leitor = leitor
+        self.capacidade = capacidade
+        tamanho = 8 + capacidade * len(COLUNAS_BUFFER) * 8
+        self.shm = shared_memory.SharedMemory(create=True, size=tamanho)
+        self.total, self.dados = _abrir_anel(self.shm, capacidade)
+        self.total[0] = 0
+        self.eventos = mp.Queue()
+        self.parar_evento = mp.Event()
+        self.processo = mp.Process(target=_processo_plot, daemon=True,
+                                   args=(self.shm.name, capacidade, self.eventos, self.parar_evento))
+        self.alimentadora = threading.Thread(target=self._alimentar, daemon=True)
+
+    def start(self):
+        self.processo.start()
+        self.alimentadora.start()
+        return self
+
+    def _alimentar(self):
+        buffer = self.leitor.buffer
+        cursor = buffer.marca()
+        while not self.parar_evento.is_set():
+            time.sleep(INTERVALO_ALIMENTACAO)
+            fim = buffer.marca()
+            novas = buffer.intervalo(cursor, fim)[:, COLUNAS_BUFFER]
+            cursor = fim
+            novas = novas[-self.capacidade:]
+            n = len(novas)
+            if n == 0:
+                continue
+            inicio = int(self.total[0])
+            idx = np.arange(inicio, inicio + n) % self.capacidade
+            self.dados[idx] = novas
+            self.total[0] = inicio + n
+
+    def massa(self, massa, leituras):
+        """Amostras de V1 medidas com uma massa (calibração)."""
+        leituras = np.asarray(leituras, dtype=np.float64)
+        media = float(leituras.mean()) if len(leituras) else float("nan")
+        _, decimadas = decimar_minmax(np.arange(len(leituras)), leituras, MAX_PONTOS_MASSA // 2)
+        self.eventos.put_nowait(("massa", massa, decimadas, media))
+
+    def descartar(self, massa):
+        self.eventos.put_nowait(("descartar", massa))
+
+    def parar(self):
+        self.parar_evento.set()
+        self.alimentadora.join(timeout=1)
+        self.processo.join(timeout=2)
+        if self.processo.is_alive():
+            self.processo.terminate()
+        del self.total, self.dados
+        self.shm.close()
+        self.shm.unlink()
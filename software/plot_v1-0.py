@@ -1,7 +1,18 @@
+import os
+
 import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
 
+from ajuste_calibracao import ajustar_calibracao, formatar_polinomio
+from azimute import figura_polar, media_azimutal, tabela_azimutal
+from carregador import carregar_txt, ler_cabecalho
+from decimacao import plot_decimado
+from filtros import MediaMovel, filtrar
+from gravacao import FASE_PATAMAR, abrir_colunar, eh_colunar
+from registro_calibracao import RegistroCalibracao, coef_load_de, coeficientes, data_do_arquivo, obter_calibracao
+from vibracao import analisar_vibracao, figura_campbell, tabela_ordens
+
 # === CONFIGURAÇÕES CALIBRAÇÃO===
 ARQUIVOS = [
     "calibracao_samples_20251129_190617.txt", #TXT para usar na calibração (quantos quiser)
@@ -11,6 +22,10 @@ ARQUIVOS = [
 COL_MASSA = "Massa[g]"
 COL_LEITURA = "Leitura[int]"
 BRAÇO_MM = 26 + 15       # mm → torque
+PGA = 64                 # ganho do ADS1256 nas calibrações (entra no registro)
+MUX = 0                  # canal do ADS1256: 0 = DIFF_0_1 (comando M0), 1 = DIFF_2_3 (M1)
+GRAU_CALIBRACAO = 1      # grau do polinômio torque x ADC
+PESOS_CALIBRACAO = None  # None, "n" (amostras por massa) ou "variancia" (n/s²)
 # === CONFIGURAÇÕES ENSAIO===
 D_rotor = 22e-2          # metros
 V_vento = 7.0            # m/s
@@ -21,91 +36,54 @@ coef_freio = [11.394/1000, -1.577/1000]             #ignorar isso aqui
 
 R_rotor = D_rotor/2
 
-ARQUIVO = "aquisicao_20251119_173920.txt"            #TXT do ensaio
+ARQUIVO = "aquisicao_20251119_173920.txt"            #TXT do ensaio (ou diretório .col do formato colunar)
+ANALISE_VIBRACAO = True  # PSD e ordens de Ax/Ay/Az por setpoint (vibracao.py)
+ANALISE_AZIMUTAL = True  # torque e VelReal médios por ângulo do rotor (azimute.py)
+N_BINS_AZIMUTE = 72      # bins por volta (5°)
+# colunas lidas por nome nos arquivos dos gravadores (gravacao.py); os
+# txt antigos de 9 colunas, sem esses nomes, continuam por posição
+COLUNAS_ENSAIO = ["Setpoint", "TimeStamp", "VelReal", "Pos", "Ax", "Ay", "Az", "V1", "V2", "Fase"]
 
 # ============================================================
 # FUNÇÕES
 
-def curva_de_calibracao(arquivos, col_massa, col_leitura, braco_mm):
-    todos_dados = []
-    todos_medios = []
-
-    for arquivo in arquivos:
-
-        # === LEITURA ===
-        try:
-            df = pd.read_csv(arquivo, sep="\t")
-        except:
-            df = pd.read_csv(arquivo, sep=",")
-
-        # renomeia para garantir padronização
-        df = df.rename(columns={
-            df.columns[0]: col_massa,
-            df.columns[1]: "Torque_original_ignore",
-            df.columns[2]: col_leitura
-        })
-
-        df = df.dropna()
-
-        # === CÁLCULO DO TORQUE USANDO A MASSA ===
-        df["Torque[N.mm]"] = df[col_massa] / 1000 * 9.81 * braco_mm
-
-        # === REMOVE OUTLIERS NA LEITURA ===
-        Q1 = df[col_leitura].quantile(0.25)
-        Q3 = df[col_leitura].quantile(0.75)
-        IQR = Q3 - Q1
-        df = df[(df[col_leitura] >= Q1 - 2*IQR) &
-                (df[col_leitura] <= Q3 + 2*IQR)]
-
-        # === AGRUPA POR MASSA ===
-        agrupado = df.groupby(col_massa, as_index=False).agg({
-            col_leitura: "mean",
-            "Torque[N.mm]": "mean"
-        })
-
-        todos_dados.append(df[[col_leitura, "Torque[N.mm]"]])
-        todos_medios.append(agrupado[[col_leitura, "Torque[N.mm]"]])
-
-    # ================================================================
-    # CURVA DE CALIBRAÇÃO FINAL
-    # ================================================================
-    dados = pd.concat(todos_dados, ignore_index=True)
-    medios = pd.concat(todos_medios, ignore_index=True)
-
-    x = medios[col_leitura].values
-    y = medios["Torque[N.mm]"].values
-
-    a, b = np.polyfit(x, y, 1)
-    y_pred = a * x + b
-    r2 = 1 - np.sum((y - y_pred)**2) / np.sum((y - y.mean())**2)
+def curva_de_calibracao(arquivos, col_massa, col_leitura, braco_mm, grau=1, pesos=None, mux=0):
+    # leitura, filtro IQR por massa, médias, polinômio e bootstrap (ajuste_calibracao.py)
+    ajuste = ajustar_calibracao(arquivos, braco_mm, grau=grau, pesos=pesos, mux=mux)
+    dados, medios, r2 = ajuste["dados"], ajuste["medios"], ajuste["r2"]
+    x = medios[:, 0]
+    curva = formatar_polinomio(ajuste["coef"])
 
     # ================================================================
     # PLOT
     # ================================================================
     plt.figure(figsize=(8, 6))
 
-    plt.scatter(dados[col_leitura], dados["Torque[N.mm]"],
+    plt.scatter(dados[:, 0], dados[:, 1],
                 s=10, alpha=0.2, label="Dados brutos")
 
-    plt.scatter(medios[col_leitura], medios["Torque[N.mm]"],
+    plt.scatter(medios[:, 0], medios[:, 1],
                 s=50, edgecolor="k", label="Médias por massa")
 
     x_plot = np.linspace(min(x), max(x), 200)
-    plt.plot(x_plot, a * x_plot + b, linewidth=3,
-             label=f"T = {a:.6f}·ADC + {b:.6f}\nR²={r2:.5f}")
+    plt.plot(x_plot, np.poly1d(ajuste["coef"])(x_plot), linewidth=3,
+             label=f"T = {curva}\nR²={r2:.5f}")
 
     plt.xlabel("Leitura ADC [inteiro]")
     plt.ylabel("Torque [N·mm]")
     plt.grid(True, linestyle="--", alpha=0.6)
     plt.legend()
     plt.tight_layout()
-    plt.show()
+    plt.show(block=False)   # não trava o menu
+    plt.pause(0.1)
 
-    print(f"Curva final: T = {a:.6f}·ADC + {b:.6f}")
-    print(f"R² = {r2:.5f}")
+    print(f"Curva final ({ajuste['canal']}): T = {curva}")
+    print(f"R² = {r2:.5f}, {ajuste['removidas']} leitura(s) fora do IQR da massa removida(s)")
+    for grau_termo, c, (inf, sup) in zip(range(grau, -1, -1), ajuste["coef"], ajuste["ic"]):
+        print(f"  coef ADC^{grau_termo}: {c:.6g}  IC {100 * ajuste['confianca']:.0f}%: [{inf:.6g}, {sup:.6g}]")
 
     # retorna se quiser usar depois
-    return a, b, r2, dados, medios
+    return ajuste
 
 # ============================================================
 # MENU PRINCIPAL
@@ -116,6 +94,28 @@ def moving_average(signal, window):
     kernel = np.ones(window)/window
     return np.convolve(padded, kernel, mode='valid')
 
+def carregar_ensaio(arquivo, colunas=None, opcionais=()):
+    """
+    Lê o ensaio em texto (.txt) ou no formato colunar (.col).
+    O colunar é aberto memory-mapped, sem copiar as colunas; o texto
+    passa pelo carregador.py (só as colunas pedidas, com cache binário).
+    colunas: nomes ou posições (None = todas); opcionais podem faltar.
+    """
+    if eh_colunar(arquivo):
+        dados, meta = abrir_colunar(arquivo)
+        nomes = meta["colunas"]
+        if colunas is not None:
+            nomes = [nomes[c] if isinstance(c, int) else c for c in colunas
+                     if isinstance(c, int) or c in dados or c not in opcionais]
+        return pd.DataFrame({c: dados[c] for c in nomes}, copy=False)
+    return carregar_txt(arquivo, colunas, opcionais)
+
+def nomes_ensaio(arquivo):
+    """Nomes das colunas do ensaio (.txt ou .col), sem ler os dados."""
+    if eh_colunar(arquivo):
+        return abrir_colunar(arquivo)[1]["colunas"]
+    return ler_cabecalho(arquivo)[1]
+
 def media_por_patamar(df, coluna_patamar, coluna_valor):
     """
     df: dataframe contendo os dados
@@ -201,7 +201,7 @@ def calcular_tsr(omega, V, diametro, eps=1e-12):
     return tsr
 
 def main():
-    a = b = None   # coeficientes ainda não calculados
+    calibracao = None   # entrada do registro ainda não escolhida
 
     while True:
         print("\n=== MENU ===")
@@ -214,14 +214,18 @@ def main():
         # 1) CURVA DE CALIBRAÇÃO
         # -------------------------------------------------------------
         if op == "1":
-            a, b, r2, dados, medios = curva_de_calibracao(
-                ARQUIVOS,
-                COL_MASSA,
-                COL_LEITURA,
-                BRAÇO_MM
+            # reaproveita o ajuste do registro se os ARQUIVOS não mudaram
+            calibracao, nova = obter_calibracao(
+                ARQUIVOS, BRAÇO_MM, PGA,
+                ajuste=lambda arquivos, braco, **modelo: curva_de_calibracao(arquivos, COL_MASSA, COL_LEITURA,
+                                                                             braco, **modelo),
+                grau=GRAU_CALIBRACAO, pesos=PESOS_CALIBRACAO, mux=MUX
             )
+            if not nova:
+                print(f"\nCalibração de {calibracao['data']} reaproveitada do registro "
+                      f"(R² = {calibracao['r2']:.5f}).")
             print("\nCoeficientes obtidos:")
-            print(f"a = {a:.6f}, b = {b:.6f}")
+            print(f"T = {formatar_polinomio(coeficientes(calibracao))}")
 
         # -------------------------------------------------------------
         # 2) CURVAS DO ENSAIO
@@ -233,12 +237,16 @@ def main():
 
             # --- usar coeficientes da calibração
             if inp_load.strip() == "":
-                if a is None or b is None:
-                    print("\nERRO: Nenhuma calibração foi feita ainda!")
-                    print("Vá para a opção 1 primeiro.")
-                    continue
-                coef_load = [a/1000, b/1000]  # converter para N.m
-                print(f"Usando coeficientes da calibração: a={a:.6f}, b={b:.6f}")
+                if calibracao is None:
+                    # sem calibração nesta sessão: a mais recente do registro até a data do ensaio
+                    calibracao = RegistroCalibracao().por_data(data_do_arquivo(ARQUIVO), PGA, MUX)
+                    if calibracao is None:
+                        print("\nERRO: Nenhuma calibração foi feita ainda!")
+                        print("Vá para a opção 1 primeiro.")
+                        continue
+                    print(f"Calibração do registro: {calibracao['data']} ({', '.join(calibracao['arquivos'])})")
+                coef_load = coef_load_de(calibracao)  # converter para N.m
+                print(f"Usando coeficientes da calibração: T = {formatar_polinomio(coeficientes(calibracao))}")
 
             else:
                 # --- interpretar coeficientes manuais
@@ -256,55 +264,101 @@ def main():
 
 
 
-            df = pd.read_csv(ARQUIVO, sep="\t")
-
-            set_omega = df.iloc[:, 0]
-            real_omega = df.iloc[:, 2]
-            pos_rotor = df.iloc[:, 3]
-            acc_x = df.iloc[:, 4]
-            acc_y = df.iloc[:, 5]
-            acc_z = df.iloc[:, 6]
-            V_load = df.iloc[:, 7]
-            V_freio = df.iloc[:, 8]
+            por_nome = "VelReal" in nomes_ensaio(ARQUIVO)
+            if por_nome:
+                # gravadores novos (Setpoint, TimeStamp, VelSet, VelReal, Pos, ...): por nome
+                df = carregar_ensaio(ARQUIVO, colunas=COLUNAS_ENSAIO, opcionais=("Fase",))
+                set_omega = df["Setpoint"]
+                real_omega = df["VelReal"]
+                pos_rotor = df["Pos"]
+                acc_x = df["Ax"]
+                acc_y = df["Ay"]
+                acc_z = df["Az"]
+                V_load = df["V1"]
+                V_freio = df["V2"]
+            else:
+                # txt antigo de 9 colunas: por posição, como antes
+                df = carregar_ensaio(ARQUIVO, colunas=list(range(9)) + ["Fase"], opcionais=("Fase",))
+                set_omega = df.iloc[:, 0]
+                real_omega = df.iloc[:, 2]
+                pos_rotor = df.iloc[:, 3]
+                acc_x = df.iloc[:, 4]
+                acc_y = df.iloc[:, 5]
+                acc_z = df.iloc[:, 6]
+                V_load = df.iloc[:, 7]
+                V_freio = df.iloc[:, 8]
 
 
             #USAR VALOR ÍMPAR PARA A JANELA. GARANTE RETORNO COM MESMA QUNATIDADE DE ELEMENTOS.
-            V_load_avg = moving_average(V_load, 201)
-            V_freio_avg = moving_average(V_freio, 201)
-            real_omega_avg = moving_average(real_omega, 301)
+            # O(n) e por patamar de set_omega (e de Fase, se houver): o filtro não mistura
+            # setpoints vizinhos nem a rampa com o patamar (filtros.py)
+            fase = df["Fase"] if "Fase" in df else None
+            V_load_avg = filtrar(V_load, set_omega, MediaMovel(201), fase=fase)
+            V_freio_avg = filtrar(V_freio, set_omega, MediaMovel(201), fase=fase)
+            real_omega_avg = filtrar(real_omega, set_omega, MediaMovel(301), fase=fase)
 
             df["set_omega"] = set_omega
             df["V_load_avg"] = V_load_avg
             df["real_omega_avg"] = real_omega_avg
             df["V_freio_avg"] = V_freio_avg
 
-            medias_V_load_omega = media_por_patamar(df, 'set_omega', 'V_load_avg')
+            # ensaios com a coluna Fase também têm rampas e holds gravados;
+            # as médias por setpoint usam só as janelas de patamar
+            df_patamar = df[df["Fase"] == FASE_PATAMAR] if "Fase" in df else df
+
+            medias_V_load_omega = media_por_patamar(df_patamar, 'set_omega', 'V_load_avg')
             medias_torque_load_omega = aplicar_calibracao(medias_V_load_omega, coef_load)
 
-            medias_V_freio_omega = media_por_patamar(df, 'set_omega', 'V_freio_avg')
+            medias_V_freio_omega = media_por_patamar(df_patamar, 'set_omega', 'V_freio_avg')
             medias_torque_freio_omega = aplicar_calibracao(medias_V_freio_omega, coef_freio)
 
-            medias_real_omega = media_por_patamar(df, 'set_omega', 'real_omega_avg')
+            medias_real_omega = media_por_patamar(df_patamar, 'set_omega', 'real_omega_avg')
 
             cp_load = calcular_cp(medias_real_omega, medias_torque_load_omega, rho, V_vento, D_rotor)
-            #cp_freio = calcular_cp(medias_real_omega, medias_torque_freio_omega, rho, V_vento, D_rotor)
+            cp_freio = calcular_cp(medias_real_omega, medias_torque_freio_omega, rho, V_vento, D_rotor)
 
             tsr = calcular_tsr(medias_real_omega,V_vento, D_rotor)
 
+            # tabelas antes das figuras: um erro num gráfico não impede a exportação
+            base = os.path.splitext(ARQUIVO.rstrip("/\\"))[0]   # tabelas ao lado do ensaio
+
+            if ANALISE_VIBRACAO and not por_nome:
+                print("\n [aviso] arquivo antigo sem TimeStamp/Pos no cabeçalho: análise de vibração pulada")
+            elif ANALISE_VIBRACAO:
+                # Welch por setpoint e order tracking pela posição do rotor (vibracao.py)
+                espectros = analisar_vibracao(set_omega, df["TimeStamp"], df["Pos"],
+                                              [df["Ax"], df["Ay"], df["Az"]], fase)
+                tabela_ordens(espectros).to_csv(f"{base}_ordens.txt", sep="\t", index=False)
+                print(f"\n Amplitude das ordens por setpoint salva em {base}_ordens.txt")
+                figura_campbell(espectros, titulo="Vibração por setpoint - ADXL345")
+
+            if ANALISE_AZIMUTAL and not por_nome:
+                print(" [aviso] arquivo antigo sem Pos/V1 no cabeçalho: média por azimute pulada")
+            elif ANALISE_AZIMUTAL:
+                # ripple de torque por ângulo do rotor, em cada setpoint (azimute.py)
+                azimutal = media_azimutal(
+                    set_omega, df["Pos"],
+                    {"Torque[N.m]": (df["V1"], np.poly1d(coef_load)), "VelReal[rad/s]": (df["VelReal"], None)},
+                    fase, N_BINS_AZIMUTE
+                )
+                tabela_azimutal(azimutal).to_csv(f"{base}_azimute.txt", sep="\t", index=False)
+                print(f" Média por azimute salva em {base}_azimute.txt")
+                figura_polar(azimutal, "Média por azimute do rotor", {"Torque[N.m]": 1000})
 
 
             plt.figure(figsize=(14, 4))
             plt.xlabel("Amostras")
             plt.ylabel("Velocidade angular (rad/s)")
             plt.title("Velocidade angular - Setpoint vs Real (média móvel)")
-            plt.plot(set_omega, label="Setpoint")
-            plt.plot(real_omega_avg, label="Real (média móvel)")
+            # séries longas: decimadas por pixel e refeitas no zoom (decimacao.py)
+            plot_decimado(plt.gca(), set_omega, label="Setpoint")
+            plot_decimado(plt.gca(), real_omega_avg, label="Real (média móvel)")
             plt.grid()
             plt.legend()
             plt.tight_layout()
 
             plt.figure(figsize=(14, 4))
-            plt.scatter(range(len(pos_rotor)), pos_rotor % (2*np.pi), s=1)
+            plot_decimado(plt.gca(), pos_rotor % (2*np.pi), ".", ms=1, modo="passo")
             plt.gca().set_yticks([0, np.pi/2, np.pi, 3*np.pi/2, 2*np.pi])
             plt.yticks(
                 [0, np.pi/2, np.pi, 3*np.pi/2, 2*np.pi],
@@ -320,8 +374,8 @@ def main():
             plt.xlabel("Amostras")
             plt.ylabel("ADC bruto (bits)")
             plt.title("Medida célula de carga ADS1256 - Média móvel")
-            plt.plot(V_load)
-            plt.plot(V_load_avg)
+            plot_decimado(plt.gca(), V_load)
+            plot_decimado(plt.gca(), V_load_avg)
             plt.grid()
             plt.tight_layout()
 
@@ -329,8 +383,8 @@ def main():
             plt.xlabel("Amostras")
             plt.ylabel("Tensão de freio (Volts)")
             plt.title("Medida tensão de freio - Média móvel")
-            plt.plot(V_freio)
-            plt.plot(V_freio_avg)
+            plot_decimado(plt.gca(), V_freio)
+            plot_decimado(plt.gca(), V_freio_avg)
             plt.grid()
             plt.tight_layout()
 
@@ -385,7 +439,6 @@ def main():
             plt.legend()
             plt.tight_layout()
 
-
             plt.show()
 
         elif op == "3":
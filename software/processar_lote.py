@@ -0,0 +1,271 @@
+"""
+Processamento em lote dos ensaios, sem janelas (backend Agg).
+
+Para cada aquisicao_* de uma pasta (ou glob), num pool de processos:
+    carrega (.txt ou .col), filtra por patamar, calcula médias por
+    setpoint, aplica a calibração e calcula torque, Cp e TSR (mesmas
+    funções do plot_v1-0.py); grava <nome>_cp_tsr.txt e as figuras
+    em PNG, tudo dentro do processo trabalhador. Com --vibracao, também
+    <nome>_ordens.txt e <nome>_campbell.png (vibracao.py); com
+    --azimute, <nome>_azimute.txt e <nome>_azimute.png (azimute.py).
+
+No fim junta tudo em lote_cp_tsr.txt (uma linha por setpoint de cada
+ensaio, com a coluna Arquivo).
+
+Uso:
+    python processar_lote.py pasta_dos_ensaios --saida resultados
+    python processar_lote.py "dados/aquisicao_202511*" --calibracao calibracao_samples_x.txt
+    python processar_lote.py pasta --coef 0.004075 945.025 --processos 4
+
+Sem --calibracao nem --coef, cada ensaio usa a calibração mais recente
+do registro (calibracoes.json) até a data dele; sem registro, o
+coef_load do plot_v1-0.py.
+"""
+import argparse
+import glob
+import importlib.util
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import matplotlib
+matplotlib.use("Agg")   # antes do pyplot: os trabalhadores não abrem janelas
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+from azimute import figura_polar, media_azimutal, tabela_azimutal
+from decimacao import plot_decimado
+from filtros import MediaMovel, filtrar
+from gravacao import FASE_PATAMAR
+from registro_calibracao import RegistroCalibracao, coef_load_de, data_do_arquivo, obter_calibracao
+from vibracao import analisar_vibracao, figura_campbell, tabela_ordens
+
+PASTA = os.path.dirname(os.path.abspath(__file__))
+PADRAO = "aquisicao_*"
+JANELA_V = 201
+JANELA_OMEGA = 301
+
+_plot = None
+
+
+def modulo_plot():
+    """Importa plot_v1-0.py (nome com hífen) uma vez por processo."""
+    global _plot
+    if _plot is None:
+        spec = importlib.util.spec_from_file_location("plot_v1_0", os.path.join(PASTA, "plot_v1-0.py"))
+        _plot = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(_plot)
+    return _plot
+
+
+def listar_ensaios(entrada):
+    """Pasta (todos os aquisicao_*.txt / .col dentro) ou glob."""
+    if os.path.isdir(entrada) and not entrada.rstrip("/\\").endswith(".col"):
+        entrada = os.path.join(entrada, PADRAO)
+    # ignora os arquivos derivados (_resumo.txt, _cp_tsr.txt, ...) que ficam ao lado
+    derivados = ("_resumo.txt", "_cp_tsr.txt", "_ordens.txt", "_azimute.txt")
+    return [a for a in sorted(glob.glob(entrada))
+            if a.endswith((".txt", ".col")) and not a.endswith(derivados)]
+
+
+def colunas_ensaio(df):
+    """
+    Sinais usados nas contas. Arquivos gravados com cabeçalho são
+    lidos por nome; os antigos sem essas colunas, pelas mesmas
+    posições do plot_v1-0.py.
+    """
+    if "VelReal" in df:
+        return df["Setpoint"], df["VelReal"], df["Pos"], df["V1"], df["V2"]
+    return df.iloc[:, 0], df.iloc[:, 2], df.iloc[:, 3], df.iloc[:, 7], df.iloc[:, 8]
+
+
+def colunas_vibracao(df):
+    """
+    TimeStamp, Pos e Ax, Ay, Az, sempre por nome. Arquivos antigos sem
+    TimeStamp no cabeçalho devolvem None (a vibração é pulada).
+    """
+    if "TimeStamp" not in df:
+        return None
+    return df["TimeStamp"], df["Pos"], [df["Ax"], df["Ay"], df["Az"]]
+
+# ============================================================
+# UM ENSAIO (PROCESSO TRABALHADOR)
+# ============================================================
+
+def processar_ensaio(arquivo, coef_load, pasta_saida, v_vento, vibracao=False, azimute=False):
+    t0 = time.perf_counter()
+    p = modulo_plot()
+    nome = os.path.splitext(os.path.basename(arquivo.rstrip("/\\")))[0]
+
+    df = p.carregar_ensaio(arquivo)
+    set_omega, real_omega, pos_rotor, V_load, V_freio = colunas_ensaio(df)
+
+    # por setpoint e fase: a rampa (gravada com o alvo no Setpoint) não vaza para o patamar
+    fase = df["Fase"] if "Fase" in df else None
+    V_load_avg = filtrar(V_load, set_omega, MediaMovel(JANELA_V), fase=fase)
+    V_freio_avg = filtrar(V_freio, set_omega, MediaMovel(JANELA_V), fase=fase)
+    real_omega_avg = filtrar(real_omega, set_omega, MediaMovel(JANELA_OMEGA), fase=fase)
+
+    medias = pd.DataFrame({
+        "set_omega": np.asarray(set_omega),
+        "V_load_avg": V_load_avg,
+        "V_freio_avg": V_freio_avg,
+        "real_omega_avg": real_omega_avg,
+    })
+    if fase is not None:
+        medias = medias[np.asarray(fase) == FASE_PATAMAR]
+
+    medias_V_load = p.media_por_patamar(medias, "set_omega", "V_load_avg")
+    medias_V_freio = p.media_por_patamar(medias, "set_omega", "V_freio_avg")
+    medias_omega = p.media_por_patamar(medias, "set_omega", "real_omega_avg")
+    torque_load = p.aplicar_calibracao(medias_V_load, coef_load)
+    torque_freio = p.aplicar_calibracao(medias_V_freio, p.coef_freio)
+
+    tabela = pd.DataFrame({
+        "Setpoint": medias_omega.index,
+        "VelReal": medias_omega.values,
+        "V1": medias_V_load.values,
+        "V2": medias_V_freio.values,
+        "Torque_load[N.m]": np.asarray(torque_load),
+        "Torque_freio[N.m]": np.asarray(torque_freio),
+        "TSR": p.calcular_tsr(medias_omega.values, v_vento, p.D_rotor),
+        "Cp_load": p.calcular_cp(medias_omega.values, np.asarray(torque_load), p.rho, v_vento, p.D_rotor),
+        "Cp_freio": p.calcular_cp(medias_omega.values, -np.asarray(torque_freio), p.rho, v_vento, p.D_rotor),
+    })
+    tabela.to_csv(os.path.join(pasta_saida, f"{nome}_cp_tsr.txt"), sep="\t", index=False)
+
+    # figuras (Agg, direto para PNG)
+    fig, axs = plt.subplots(3, 1, figsize=(14, 10))
+    plot_decimado(axs[0], np.asarray(set_omega), label="Setpoint")
+    plot_decimado(axs[0], real_omega_avg, label="Real (média móvel)")
+    axs[0].set_ylabel("Velocidade angular (rad/s)")
+    axs[0].legend()
+    plot_decimado(axs[1], np.asarray(pos_rotor) % (2 * np.pi), ".", ms=1, modo="passo")
+    axs[1].set_ylabel("Posição angular do rotor (rad)")
+    plot_decimado(axs[2], np.asarray(V_load))
+    plot_decimado(axs[2], V_load_avg)
+    axs[2].set_ylabel("ADC bruto (bits)")
+    axs[2].set_xlabel("Amostras")
+    for ax in axs:
+        ax.grid()
+    fig.suptitle(nome)
+    fig.tight_layout()
+    fig.savefig(os.path.join(pasta_saida, f"{nome}_series.png"), dpi=100)
+    plt.close(fig)
+
+    fig, axs = plt.subplots(1, 2, figsize=(12, 4.5))
+    axs[0].plot(tabela["VelReal"], tabela["Torque_load[N.m]"] * 1000, "*-")
+    axs[0].set_xlabel("Velocidade angular (rad/s)")
+    axs[0].set_ylabel("Torque (N.mm)")
+    axs[1].plot(tabela["TSR"], tabela["Cp_load"], "*-", label="Célula de carga")
+    axs[1].plot(tabela["TSR"], tabela["Cp_freio"], "*-", label="Freio")
+    axs[1].set_xlabel("TSR")
+    axs[1].set_ylabel("Cp")
+    axs[1].legend()
+    for ax in axs:
+        ax.grid()
+    fig.suptitle(nome)
+    fig.tight_layout()
+    fig.savefig(os.path.join(pasta_saida, f"{nome}_cp_tsr.png"), dpi=100)
+    plt.close(fig)
+
+    sinais_vibracao = colunas_vibracao(df) if vibracao else None
+    if vibracao and sinais_vibracao is None:
+        print(f"[aviso] {nome}: arquivo antigo sem TimeStamp, análise de vibração pulada")
+    elif vibracao:
+        tempo, pos, acc = sinais_vibracao
+        espectros = analisar_vibracao(set_omega, tempo, pos, acc, fase)
+        tabela_ordens(espectros).to_csv(os.path.join(pasta_saida, f"{nome}_ordens.txt"), sep="\t", index=False)
+        fig = figura_campbell(espectros, titulo=nome)
+        fig.savefig(os.path.join(pasta_saida, f"{nome}_campbell.png"), dpi=100)
+        plt.close(fig)
+
+    if azimute and "VelReal" not in df:
+        print(f"[aviso] {nome}: arquivo antigo sem Pos/V1 no cabeçalho, média por azimute pulada")
+    elif azimute:
+        azimutal = media_azimutal(
+            set_omega, df["Pos"],
+            {"Torque[N.m]": (df["V1"], np.poly1d(coef_load)), "VelReal[rad/s]": (df["VelReal"], None)},
+            fase
+        )
+        tabela_azimutal(azimutal).to_csv(os.path.join(pasta_saida, f"{nome}_azimute.txt"), sep="\t", index=False)
+        fig = figura_polar(azimutal, nome, {"Torque[N.m]": 1000})
+        fig.savefig(os.path.join(pasta_saida, f"{nome}_azimute.png"), dpi=100)
+        plt.close(fig)
+
+    tabela.insert(0, "Arquivo", nome)
+    return tabela, len(df), time.perf_counter() - t0
+
+# ============================================================
+# MAIN
+# ============================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Cp x TSR de vários ensaios em paralelo, sem janelas.")
+    parser.add_argument("entrada", help="pasta com aquisicao_* ou glob")
+    parser.add_argument("--saida", default="resultados_lote")
+    parser.add_argument("--calibracao", nargs="+", help="arquivo(s) calibracao_samples_*.txt")
+    parser.add_argument("--coef", type=float, nargs=2, metavar=("A", "B"),
+                        help="coeficientes manuais da célula de carga em N.mm por ADC")
+    parser.add_argument("--braco", type=float, default=26 + 15, help="braço da calibração [mm]")
+    parser.add_argument("--pga", type=int, default=None, help="PGA da calibração (registro)")
+    parser.add_argument("--mux", type=int, default=0, choices=(0, 1),
+                        help="canal do ADS1256 dos ensaios: 0 = DIFF_0_1, 1 = DIFF_2_3")
+    parser.add_argument("--grau", type=int, default=1, help="grau do polinômio da --calibracao")
+    parser.add_argument("--v-vento", type=float, default=None, help="m/s (padrão: o do plot_v1-0.py)")
+    parser.add_argument("--processos", type=int, default=os.cpu_count())
+    parser.add_argument("--vibracao", action="store_true", help="espectros e ordens de Ax/Ay/Az por setpoint")
+    parser.add_argument("--azimute", action="store_true", help="torque e VelReal médios por ângulo do rotor")
+    args = parser.parse_args()
+
+    p = modulo_plot()
+    arquivos = listar_ensaios(args.entrada)
+    if not arquivos:
+        print(f"Nenhum ensaio encontrado em {args.entrada}")
+        return
+
+    if args.coef:
+        coef_fixo = [args.coef[0] / 1000, args.coef[1] / 1000]   # converter para N.m
+    elif args.calibracao:
+        coef_fixo = coef_load_de(obter_calibracao(args.calibracao, args.braco, args.pga,
+                                                  grau=args.grau, mux=args.mux)[0])
+    else:
+        coef_fixo = None
+    registro = RegistroCalibracao()
+
+    def coef_do_ensaio(arquivo):
+        if coef_fixo is not None:
+            return coef_fixo
+        calibracao = registro.por_data(data_do_arquivo(arquivo), args.pga, args.mux)
+        return coef_load_de(calibracao) if calibracao else p.coef_load
+    v_vento = args.v_vento if args.v_vento is not None else p.V_vento
+
+    os.makedirs(args.saida, exist_ok=True)
+    print(f"{len(arquivos)} ensaio(s), {args.processos} processo(s)")
+
+    t0 = time.perf_counter()
+    tabelas = []
+    with ProcessPoolExecutor(max_workers=args.processos) as pool:
+        futuros = {pool.submit(processar_ensaio, a, coef_do_ensaio(a), args.saida, v_vento,
+                               args.vibracao, args.azimute): a for a in arquivos}
+        for futuro in as_completed(futuros):
+            arquivo = futuros[futuro]
+            try:
+                tabela, n, dt = futuro.result()
+            except Exception as e:
+                print(f" ERRO em {arquivo}: {e}")
+                continue
+            tabelas.append(tabela)
+            print(f" {os.path.basename(arquivo.rstrip('/'))}: {n} amostras, {len(tabela)} setpoints, {dt:.1f}s")
+
+    if tabelas:
+        agregado = pd.concat(tabelas, ignore_index=True).sort_values(["Arquivo", "Setpoint"])
+        agregado.to_csv(os.path.join(args.saida, "lote_cp_tsr.txt"), sep="\t", index=False)
+    parede = time.perf_counter() - t0
+    print(f"\n Resultados em {args.saida}")
+    print(f" Tempo: {parede:.1f}s ({len(tabelas) / parede:.2f} ensaios/s com {args.processos} processo(s))")
+
+
+if __name__ == "__main__":
+    main()
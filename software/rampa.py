@@ -0,0 +1,199 @@
+"""
+Rampa de setpoint em malha fechada.
+
+A rampa antiga mandava T{sp} em degraus de RAMPA_STEP = 5 rad/s a cada
+RAMPA_DELAY = 1 s (0 -> 209 rad/s em ~42 s) e dava a rampa por
+concluída sem olhar o VelReal. Aqui:
+
+    - o perfil sp(t) é gerado no tempo com aceleração ACELERACAO
+      [rad/s²]: "linear" (aceleração constante) ou "s" (curva S: a
+      aceleração sobe e desce com jerk JERK, sem degrau de aceleração
+      no início e no fim, que é o que faz o controle passar do alvo);
+    - o setpoint é reenviado a TAXA_COMANDOS Hz enquanto o perfil anda;
+    - a rampa termina quando o VelReal medido (média móvel de
+      JANELA_MEDIA amostras) fica dentro de ±TOLERANCIA do alvo por
+      TEMPO_ASSENTAMENTO, contando só depois do fim do perfil. Se não
+      assentar em TIMEOUT_ASSENTAMENTO, segue com aviso.
+
+RampaMalhaFechada não faz I/O: recebe o instante (relógio do leitor)
+e as linhas do buffer e devolve o setpoint a enviar. executar_rampa
+é o laço síncrono; o ensaio_async usa a mesma classe.
+"""
+import math
+import sys
+import time
+
+import numpy as np
+
+# === CONFIGURAÇÕES Rampa ===
+PERFIL = "s"                # "linear" ou "s" (curva S)
+PERFIS = ("linear", "s")
+ACELERACAO = 20.0           # rad/s² (máxima, no perfil "s")
+JERK = 80.0                 # rad/s³, só no perfil "s"
+TAXA_COMANDOS = 20.0        # Hz de envio do T{sp} durante o perfil
+TOLERANCIA = 1.0            # rad/s em torno do alvo
+TEMPO_ASSENTAMENTO = 0.5    # s seguidos dentro da tolerância
+TIMEOUT_ASSENTAMENTO = 10.0 # s após o fim do perfil
+JANELA_MEDIA = 32           # amostras da média móvel do VelReal (tira o ruído do encoder)
+CASAS = 2                   # casas decimais dos setpoints intermediários
+COLUNA_VELREAL = 2          # no buffer: chegada, VelSet, VelReal, ...
+
+
+class PerfilRampa:
+    """sp(t) de atual até alvo; jerk=None dá o perfil linear."""
+
+    def __init__(self, atual, alvo, aceleracao=ACELERACAO, jerk=None):
+        if aceleracao <= 0 or (jerk is not None and jerk <= 0):
+            raise ValueError("aceleração e jerk devem ser positivos")
+        self.atual = float(atual)
+        self.alvo = float(alvo)
+        self.sinal = 1.0 if alvo >= atual else -1.0
+        self.delta = abs(self.alvo - self.atual)
+
+        a = aceleracao
+        t_j = 0.0 if jerk is None else a / jerk   # tempo de subida da aceleração
+        if jerk is not None and self.delta < a * t_j:
+            # degrau curto: não chega à aceleração máxima (perfil triangular)
+            a = math.sqrt(self.delta * jerk)
+            t_j = a / jerk
+        self.a, self.t_j = a, t_j
+        self.duracao = self.delta / a + t_j if self.delta > 0 else 0.0
+
+    def valor(self, t):
+        if t >= self.duracao:
+            return self.alvo
+        if t <= 0:
+            return self.atual
+        a, t_j, fim = self.a, self.t_j, self.duracao
+        if t < t_j:
+            s = a * t * t / (2 * t_j)
+        elif t <= fim - t_j:
+            s = a * t_j / 2 + a * (t - t_j)
+        else:
+            s = self.delta - a * (fim - t) ** 2 / (2 * t_j)
+        return self.atual + self.sinal * s
+
+
+class RampaMalhaFechada:
+    """
+    Uma rampa de atual até alvo, começando no instante inicio (mesmo
+    relógio da coluna de chegada do buffer).
+    """
+
+    def __init__(self, atual, alvo, inicio, perfil=PERFIL, aceleracao=ACELERACAO, jerk=JERK,
+                 taxa=TAXA_COMANDOS, tolerancia=TOLERANCIA, tempo_assentamento=TEMPO_ASSENTAMENTO,
+                 timeout=TIMEOUT_ASSENTAMENTO, janela_media=JANELA_MEDIA):
+        if perfil not in PERFIS:
+            raise ValueError(f"perfil deve ser um de {PERFIS}")
+        self.nome_perfil = perfil
+        self.perfil = PerfilRampa(atual, alvo, aceleracao, jerk if perfil == "s" else None)
+        self.alvo = alvo
+        self.inicio = inicio
+        self.fim_perfil = inicio + self.perfil.duracao
+        self.periodo = 1 / taxa
+        self.tolerancia = tolerancia
+        self.tempo_assentamento = tempo_assentamento
+        self.timeout = timeout
+        self.janela_media = janela_media
+
+        self.enviado = None       # último setpoint enviado
+        self.cauda = np.empty(0)  # últimas amostras de VelReal (continuidade da média móvel)
+        self.dentro_desde = None  # chegada da 1ª amostra da sequência atual dentro da banda
+        self.ultima_chegada = None
+        self.excesso = 0.0        # maior passagem do alvo medida [rad/s]
+        self.assentou = False
+        self.termino = None
+
+    def comando(self, agora):
+        """Setpoint a enviar agora, ou None se não mudou desde o último envio."""
+        t = agora - self.inicio
+        sp = self.alvo if t >= self.perfil.duracao else round(self.perfil.valor(t), CASAS)
+        if sp == self.enviado:
+            return None
+        self.enviado = sp
+        return sp
+
+    def atualizar(self, amostras):
+        """amostras: linhas do buffer (chegada + 8 campos)."""
+        if len(amostras) == 0:
+            return
+        vel = np.concatenate((self.cauda, amostras[:, COLUNA_VELREAL]))
+        self.cauda = vel[-(self.janela_media - 1):] if self.janela_media > 1 else vel[:0]
+        if len(vel) < self.janela_media:
+            return
+        acumulado = np.cumsum(np.concatenate(([0.0], vel)))
+        media = (acumulado[self.janela_media:] - acumulado[:-self.janela_media]) / self.janela_media
+        chegada = amostras[-len(media):, 0]
+
+        # só conta o que chegou depois do fim do perfil
+        depois = chegada >= self.fim_perfil
+        if not depois.any():
+            return
+        chegada, erro = chegada[depois], media[depois] - self.alvo
+        self.excesso = max(self.excesso, float((erro * self.perfil.sinal).max()))
+        fora = np.flatnonzero(np.abs(erro) > self.tolerancia)
+        if len(fora):
+            self.dentro_desde = chegada[fora[-1] + 1] if fora[-1] + 1 < len(chegada) else None
+        elif self.dentro_desde is None:
+            self.dentro_desde = chegada[0]
+        self.ultima_chegada = chegada[-1]
+
+    def concluida(self, agora):
+        if agora < self.fim_perfil:
+            return False
+        if self.dentro_desde is not None and \
+                self.ultima_chegada - self.dentro_desde >= self.tempo_assentamento:
+            self.assentou = True
+        if self.assentou or agora - self.fim_perfil >= self.timeout:
+            self.termino = agora
+            return True
+        return False
+
+    def resumo(self):
+        return {
+            "perfil": self.nome_perfil,
+            "alvo": self.alvo,
+            "duracao_perfil_s": round(self.perfil.duracao, 3),
+            "duracao_s": round(self.termino - self.inicio, 3) if self.termino is not None else None,
+            "assentou": self.assentou,
+            "excesso": round(self.excesso, 3),
+        }
+
+
+def executar_rampa(leitor, atual, alvo, nova_rampa=RampaMalhaFechada):
+    """
+    Rampa síncrona: envia os setpoints do perfil pela serial e volta
+    quando o VelReal assenta no alvo. nova_rampa(atual, alvo, inicio)
+    cria a RampaMalhaFechada (para outras configurações).
+    """
+    if atual == alvo:
+        return alvo
+
+    buffer = leitor.buffer
+    cursor = buffer.marca()
+    laco = leitor.metricas.laco("rampa")
+    rampa = nova_rampa(atual, alvo, leitor.relogio.agora())
+    while True:
+        laco.iteracao()
+        agora = leitor.relogio.agora()
+        sp = rampa.comando(agora)
+        if sp is not None:
+            leitor.ser.write(f"T{sp}\n".encode())
+            with leitor.metricas.tempo("console"):
+                sys.stdout.write(f"\rAplicando rampa [rad/s]: {sp} ")
+                sys.stdout.flush()
+        fim = buffer.marca()
+        rampa.atualizar(buffer.intervalo(cursor, fim))
+        cursor = fim
+        if rampa.concluida(agora):
+            break
+        time.sleep(rampa.periodo)
+
+    avisar(rampa)
+    return alvo
+
+
+def avisar(rampa):
+    if not rampa.assentou:
+        print(f"\n[aviso] VelReal não assentou em {rampa.alvo} ± {rampa.tolerancia} rad/s "
+              f"em {rampa.timeout:g}s após a rampa")
@@ -0,0 +1,142 @@
+"""
+Registro persistente das calibrações da célula de carga.
+
+Cada ajuste fica em calibracoes.json, com a chave = hash do conteúdo
+dos calibracao_samples_*.txt usados (e do braço, do modelo: grau,
+pesos, MUX, e do algoritmo: VERSAO_AJUSTE, K_IQR e bootstrap). Se nada
+disso mudou, o ajuste é reaproveitado sem reler nem refazer nada. Um ensaio encontra a sua calibração pela data:
+a mais recente feita até o momento do ensaio (com o mesmo PGA e MUX,
+quando informados).
+
+Entrada do registro:
+    chave, arquivos, coef (T[N.mm] = poly1d(coef)(ADC)), ic, desvio,
+    r2, grau, pesos, mux, braco_mm, pga, data (da calibração),
+    registrado; a e b (T = a*ADC + b) quando o grau é 1.
+    Entradas antigas têm só a e b.
+"""
+import hashlib
+import json
+import os
+import re
+import time
+
+from ajuste_calibracao import CONFIANCA, K_IQR, MUX_PADRAO, N_BOOTSTRAP, VERSAO_AJUSTE, ajustar_calibracao
+
+# === CONFIGURAÇÕES Registro ===
+REGISTRO = "calibracoes.json"
+FORMATO_DATA = "%Y-%m-%d %H:%M:%S"
+_DATA_NOME = re.compile(r"(\d{8})_(\d{6})")   # calibracao_samples_AAAAMMDD_HHMMSS / aquisicao_...
+
+# ============================================================
+# CHAVES E DATAS
+# ============================================================
+
+def chave_calibracao(arquivos, braco_mm, grau=1, pesos=None, mux=MUX_PADRAO, k_iqr=K_IQR,
+                     n_bootstrap=N_BOOTSTRAP, confianca=CONFIANCA):
+    """
+    sha256 do conteúdo dos arquivos (sem depender da ordem), do braço,
+    do modelo e do algoritmo. Ajustes registrados por uma versão
+    anterior do ajuste_calibracao.py não batem e são refeitos.
+    """
+    digests = []
+    for arquivo in arquivos:
+        h = hashlib.sha256()
+        with open(arquivo, "rb") as f:
+            for bloco in iter(lambda: f.read(1 << 20), b""):
+                h.update(bloco)
+        digests.append(h.hexdigest())
+    h = hashlib.sha256("".join(sorted(digests)).encode())
+    h.update(f"braco={braco_mm:g}".encode())
+    h.update(f"grau={grau};pesos={pesos};mux={mux}".encode())
+    h.update(f"ajuste={VERSAO_AJUSTE};k_iqr={k_iqr:g};bootstrap={n_bootstrap};confianca={confianca:g}".encode())
+    return h.hexdigest()
+
+
+def data_do_arquivo(arquivo):
+    """Data no nome (AAAAMMDD_HHMMSS) ou, sem ela, a de modificação."""
+    m = _DATA_NOME.search(os.path.basename(arquivo.rstrip("/\\")))
+    if m:
+        try:
+            return time.strftime(FORMATO_DATA, time.strptime("".join(m.groups()), "%Y%m%d%H%M%S"))
+        except ValueError:
+            pass
+    return time.strftime(FORMATO_DATA, time.localtime(os.path.getmtime(arquivo)))
+
+# ============================================================
+# REGISTRO
+# ============================================================
+
+class RegistroCalibracao:
+    def __init__(self, caminho=REGISTRO):
+        self.caminho = caminho
+        self.entradas = []
+        if os.path.exists(caminho):
+            with open(caminho, encoding="utf-8") as f:
+                self.entradas = json.load(f)
+
+    def salvar(self):
+        # temporário + troca, como o meta.json do gravador
+        tmp = self.caminho + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.entradas, f, indent=2, ensure_ascii=False)
+        os.replace(tmp, self.caminho)
+
+    def buscar(self, chave):
+        for entrada in self.entradas:
+            if entrada["chave"] == chave:
+                return entrada
+        return None
+
+    def registrar(self, entrada):
+        self.entradas = [e for e in self.entradas if e["chave"] != entrada["chave"]]
+        self.entradas.append(entrada)
+        self.entradas.sort(key=lambda e: e["data"])
+        self.salvar()
+
+    def por_data(self, data, pga=None, mux=None):
+        """Calibração mais recente feita até data (texto FORMATO_DATA)."""
+        candidatas = [e for e in self.entradas
+                      if e["data"] <= data and (pga is None or e.get("pga") in (None, pga))
+                      and (mux is None or e.get("mux", MUX_PADRAO) == mux)]
+        return max(candidatas, key=lambda e: e["data"]) if candidatas else None
+
+
+def obter_calibracao(arquivos, braco_mm, pga=None, registro=None, ajuste=ajustar_calibracao,
+                     grau=1, pesos=None, mux=MUX_PADRAO):
+    """
+    Ajuste dos arquivos, do registro se já existir. Retorna
+    (entrada, nova): nova=True quando o ajuste acabou de ser feito.
+    ajuste(arquivos, braco_mm, grau=, pesos=, mux=) -> dict do
+    ajuste_calibracao.ajustar_calibracao só roda nesse caso (o
+    plot_v1-0.py passa a versão que também desenha a curva).
+    """
+    registro = registro or RegistroCalibracao()
+    chave = chave_calibracao(arquivos, braco_mm, grau, pesos, mux)
+    entrada = registro.buscar(chave)
+    if entrada is not None:
+        return entrada, False
+
+    resultado = ajuste(arquivos, braco_mm, grau=grau, pesos=pesos, mux=mux)
+    entrada = {
+        "chave": chave,
+        "arquivos": [os.path.basename(arq) for arq in arquivos],
+        **{k: resultado[k] for k in ("coef", "ic", "desvio", "confianca", "r2", "grau", "pesos", "mux")},
+        "braco_mm": braco_mm,
+        "pga": pga,
+        "data": max(data_do_arquivo(arq) for arq in arquivos),
+        "registrado": time.strftime(FORMATO_DATA),
+    }
+    if grau == 1:
+        entrada["a"], entrada["b"] = resultado["coef"]
+    registro.registrar(entrada)
+    return entrada, True
+
+
+def coeficientes(entrada):
+    """Polinômio da entrada em N.mm por contagem (formato do np.poly1d)."""
+    return entrada["coef"] if "coef" in entrada else [entrada["a"], entrada["b"]]
+
+
+def coef_load_de(entrada):
+    """Polinômio da entrada em N.m por contagem (formato de coef_load do plot_v1-0.py)."""
+    return [c / 1000 for c in coeficientes(entrada)]
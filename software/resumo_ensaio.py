@@ -0,0 +1,100 @@
+"""
+Resumo do ensaio calculado durante a aquisição.
+
+Cada janela de patamar alimenta estatísticas acumuladas (Welford:
+média, variância, mínimo, máximo) por setpoint e canal, sem guardar
+as amostras. Ao fim de cada setpoint a calibração é aplicada à média
+de V1 e a linha de Cp x TSR aparece no console; ao fim do ensaio a
+tabela é gravada ao lado dos dados brutos, sem reler o arquivo.
+
+Mesmas contas de plot_v1-0.py (aplicar_calibracao, calcular_cp,
+calcular_tsr), feitas sobre as médias por patamar.
+"""
+import os
+
+import numpy as np
+
+from estatistica_online import Welford
+
+# campos das linhas do buffer depois do tempo de chegada
+CANAIS = ["VelSet", "VelReal", "Pos", "Ax", "Ay", "Az", "V1", "V2"]
+I_VELREAL = CANAIS.index("VelReal")
+I_V1 = CANAIS.index("V1")
+
+
+class ResumoPatamares:
+    """
+    Estatísticas por setpoint e a tabela Cp x TSR.
+
+    coef_load: polinômio V1 -> torque [N.m] (formato do np.poly1d, ex.:
+    registro_calibracao.coef_load_de) ou None, caso em que a tabela
+    sai sem torque/Cp.
+    """
+
+    def __init__(self, coef_load, rho, v_vento, d_rotor):
+        self.coef_load = coef_load
+        self.rho = rho
+        self.v_vento = v_vento
+        self.d_rotor = d_rotor
+        self.patamares = {}   # setpoint -> Welford dos CANAIS
+        self.linhas = []
+
+    def adicionar(self, sp, canais):
+        """canais: array (n x 8) com os CANAIS das amostras do patamar sp."""
+        if sp not in self.patamares:
+            self.patamares[sp] = Welford(len(CANAIS))
+        self.patamares[sp].atualizar(canais)
+
+    def fechar_patamar(self, sp):
+        """Calcula e mostra a linha do setpoint; retorna o dict da linha."""
+        w = self.patamares.get(sp)
+        if w is None or w.n == 0:
+            return None
+
+        omega = w.media[I_VELREAL]
+        linha = {
+            "Setpoint": sp,
+            "N": w.n,
+            "VelReal": omega,
+            "VelReal_desvio": w.desvio[I_VELREAL],
+            "V1": w.media[I_V1],
+            "V1_desvio": w.desvio[I_V1],
+            "V1_min": w.minimo[I_V1],
+            "V1_max": w.maximo[I_V1],
+            "TSR": omega * (self.d_rotor / 2) / self.v_vento,
+            "Torque": np.nan,
+            "Torque_desvio": np.nan,
+            "Cp": np.nan,
+        }
+        if self.coef_load is not None:
+            poly = np.poly1d(self.coef_load)
+            linha["Torque"] = poly(w.media[I_V1])
+            linha["Torque_desvio"] = abs(poly.deriv()(w.media[I_V1])) * w.desvio[I_V1]
+            area = np.pi * (self.d_rotor / 2) ** 2
+            linha["Cp"] = linha["Torque"] * omega / (0.5 * self.rho * area * self.v_vento ** 3)
+
+        linhas_sp = [k for k, l in enumerate(self.linhas) if l["Setpoint"] == sp]
+        if linhas_sp:
+            self.linhas[linhas_sp[0]] = linha   # setpoint repetido: atualiza
+        else:
+            self.linhas.append(linha)
+
+        if len(self.linhas) == 1:
+            print(f"\r{'SP':>8s} {'N':>7s} {'ω [rad/s]':>10s} {'T [N.m]':>10s} {'±σ':>9s} "
+                  f"{'TSR':>6s} {'Cp':>7s}")
+        print(f"\r{sp:8.2f} {w.n:7d} {omega:10.2f} {linha['Torque']:10.5f} "
+              f"{linha['Torque_desvio']:9.5f} {linha['TSR']:6.3f} {linha['Cp']:7.4f}")
+        return linha
+
+    def salvar(self, caminho_dados):
+        """Grava a tabela em <nome>_resumo.txt ao lado dos dados brutos."""
+        if not self.linhas:
+            return None
+        nome = os.path.splitext(caminho_dados.rstrip("/\\"))[0] + "_resumo.txt"
+        colunas = list(self.linhas[0])
+        with open(nome, "w") as f:
+            f.write("\t".join(colunas) + "\n")
+            for linha in self.linhas:
+                f.write("\t".join(str(linha[c]) for c in colunas) + "\n")
+        print(f" Resumo Cp x TSR salvo em {nome}")
+        return nome
@@ -0,0 +1,349 @@
+"""
+Dinamômetro virtual: imita o firmware V0_1 num pseudo-terminal (pty).
+
+Modo simulação: gera o fluxo VelSet/VelReal/Pos/Ax/Ay/Az/V1/V2 na taxa
+de amostragem e no baud escolhidos, responde aos comandos T, M, G, P,
+I, D, C (e F) como o Commander do SimpleFOC e segue o setpoint T com
+uma resposta de primeira ordem.
+
+Modo replay: reenvia um aquisicao_*.txt (ou .col) gravado, em tempo
+real ou N vezes mais rápido.
+
+Uso (Linux/macOS):
+    python simulador.py [--taxa 2000] [--baud 230400] [--protocolo ascii]
+    python simulador.py --replay aquisicao_20251119_173920.txt --velocidade 4
+
+O caminho da porta (ex: /dev/pts/5) é impresso na tela; use-o com
+    python calibracao_aquisicao_v0-1.py --porta /dev/pts/5
+"""
+import argparse
+import math
+import os
+import threading
+import time
+import tty
+
+import numpy as np
+
+from carregador import carregar_txt, ler_cabecalho
+from gravacao import COLUNAS, abrir_colunar, eh_colunar
+from leitura_serial import N_CAMPOS, codificar_frames, converter_bloco
+
+# === CONFIGURAÇÕES Simulador ===
+TAXA = 2000.0          # amostras/s pedidas (o baud pode limitar)
+BAUD = 230400
+TAU = 0.35             # s, constante de tempo da resposta de velocidade
+ATRASO_INICIAL = 2.0   # s até começar o fluxo (initFOC, ADXL, ADS)
+TICK = 0.002           # s entre rajadas de escrita
+COLUNAS_REPLAY = COLUNAS[1:2 + N_CAMPOS]   # TimeStamp, VelSet..V2 do arquivo gravado
+
+# Ganhos do ADS1256 indexados pelo comando G (mesma ordem do firmware)
+PGA_GANHOS = [1, 2, 4, 8, 16, 32, 64]
+
+BANNER = [
+    "MOT: Monitor enabled!",
+    "MOT: Init",
+    "MOT: Enable driver.",
+    "MOT: Align sensor.",
+    "MOT: sensor_direction==CW",
+    "MOT: PP check: OK!",
+    "MOT: Zero elec. angle: 2.41",
+    "MOT: No current sense.",
+    "MOT: Ready.",
+    "Freio iniciado",
+    "Data rate: 3200 Hz  /  g-Range: 2g",
+    "",
+    "PGA: 6",
+    "MUX: 1",
+    "DRATE: 176",
+]
+
+# ============================================================
+# PTY
+# ============================================================
+
+def abrir_pty():
+    """Cria o pty em modo raw. Retorna (fd_mestre, fd_escravo, caminho)."""
+    mestre, escravo = os.openpty()
+    tty.setraw(escravo)  # sem eco e sem tradução de \n
+    os.set_blocking(mestre, False)
+    return mestre, escravo, os.ttyname(escravo)
+
+# ============================================================
+# MODELO DO DINAMÔMETRO
+# ============================================================
+
+class ModeloDinamometro:
+    """Estado físico e de configuração imitando as variáveis do firmware."""
+
+    def __init__(self, tau=TAU, semente=None):
+        self.rng = np.random.default_rng(semente)
+        self.tau = tau
+        self.target = 0.0        # T
+        self.mode = 0.0          # M
+        self.pga = 6.0           # G (índice, PGA_64 no setup)
+        self.P, self.I, self.D = 0.4, 20.0, 0.0
+        self.Tf = 0.005          # F
+        self.voltage_limit = 4.5 # C
+
+        self.vel = 0.0
+        self.pos = 0.0
+        self.acc = np.zeros(3)
+        self.teste = 0.0         # última leitura do ADS
+
+    def comando(self, linha):
+        """Interpreta uma linha do Commander. Retorna o eco (ou None)."""
+        linha = linha.strip()
+        if not linha:
+            return None
+        letra, valor = linha[0], linha[1:].strip()
+        attrs = {"T": "target", "M": "mode", "G": "pga", "P": "P",
+                 "I": "I", "D": "D", "F": "Tf", "C": "voltage_limit"}
+        if letra not in attrs:
+            return "err"
+        if valor and valor not in ("?", "#"):
+            try:
+                v = float(valor)
+            except ValueError:
+                v = 0.0   # atof() devolve 0 para texto inválido
+            if letra == "G":
+                v = min(max(int(v), 0), len(PGA_GANHOS) - 1)
+            setattr(self, attrs[letra], v)
+        return f"{getattr(self, attrs[letra]):.2f}"
+
+    def gerar(self, n, dt):
+        """Avança n amostras espaçadas de dt. Retorna array (n x 8)."""
+        dados = np.empty((n, N_CAMPOS))
+        if n == 0:
+            return dados
+
+        # resposta de primeira ordem ao setpoint, exata por passo
+        alfa = 1 - math.exp(-dt / self.tau)
+        k = np.arange(1, n + 1)
+        vel = self.target + (self.vel - self.target) * (1 - alfa) ** k
+        pos = self.pos + np.cumsum(vel) * dt
+
+        ruido_vel = self.rng.normal(0, 0.3, n)
+        dados[:, 0] = self.target
+        dados[:, 1] = vel + ruido_vel
+        dados[:, 2] = pos
+
+        # acelerômetro só é lido no modo 2 (como no firmware); nos outros
+        # modos os valores ficam congelados na última leitura
+        if int(self.mode) == 2:
+            fase = pos[:, None] + np.array([0.0, math.pi / 2, 0.0])
+            acc = 0.02 * np.sin(fase) + self.rng.normal(0, 0.01, (n, 3))
+            acc[:, 2] += 1.0
+            self.acc = acc[-1]
+            dados[:, 3:6] = acc
+        else:
+            dados[:, 3:6] = self.acc
+
+        # ADS1256: torque ~ atrito + arrasto aerodinâmico, lido em contagens
+        ganho = PGA_GANHOS[int(self.pga)] / 64
+        modo = int(self.mode)
+        if modo in (0, 1):
+            torque = 2e-3 * vel + 4e-5 * vel ** 2 + 3e-4 * np.sin(3 * pos)  # N.m
+            contagens = 2.4e7 * torque if modo == 0 else 1.1e7 * torque
+            leitura = np.round(ganho * contagens + self.rng.normal(0, 150, n))
+            self.teste = leitura[-1]
+            dados[:, 6] = leitura
+        else:
+            dados[:, 6] = self.teste  # SELFCAL / acelerômetro: ADS parado
+
+        # tensão q estimada pelo controle
+        erro = self.target - vel
+        uq = 0.05 + 0.012 * vel + self.P * erro * 0.05
+        dados[:, 7] = np.clip(uq + self.rng.normal(0, 0.01, n), -self.voltage_limit, self.voltage_limit)
+
+        self.vel = vel[-1]
+        self.pos = pos[-1]
+        return dados
+
+# ============================================================
+# FORMATAÇÃO (como Serial.println(String(...)) do firmware)
+# ============================================================
+
+def formatar_ascii(dados):
+    linhas = [
+        f"{d[0]:.2f}\t{d[1]:.2f}\t{d[2]:.2f}\t{d[3]:.2f}\t{d[4]:.2f}\t{d[5]:.2f}\t{int(d[6])}\t{d[7]:.2f}\r\n"
+        for d in dados.tolist()
+    ]
+    return "".join(linhas).encode()
+
+# ============================================================
+# SIMULADOR
+# ============================================================
+
+class Simulador(threading.Thread):
+    """
+    Dispositivo virtual rodando numa thread. A porta a abrir do lado
+    do host fica em self.porta.
+
+    A taxa efetiva é limitada pelo baud (10 bits por byte), como no
+    firmware, em que Serial.println trava quando o buffer de TX enche.
+    Bytes que o host não lê a tempo (buffer do pty cheio) são perdidos
+    e contados em bytes_perdidos.
+    """
+
+    def __init__(self, taxa=TAXA, baud=BAUD, protocolo="ascii", atraso_inicial=ATRASO_INICIAL,
+                 replay=None, velocidade=1.0, tau=TAU, semente=None):
+        super().__init__(daemon=True)
+        self.taxa = taxa
+        self.baud = baud
+        self.protocolo = protocolo
+        self.atraso_inicial = atraso_inicial
+        self.velocidade = velocidade
+        self.modelo = ModeloDinamometro(tau, semente)
+        self.replay = None
+        if replay:
+            self.replay, self.taxa = carregar_replay(replay)
+
+        self.mestre, self.escravo, self.porta = abrir_pty()
+        self.amostras_enviadas = 0
+        self.bytes_enviados = 0
+        self.bytes_perdidos = 0
+        self.seq = 0
+        self._comandos = b""
+        self._parar = threading.Event()
+
+    # --- comandos ---------------------------------------------
+
+    def _ler_comandos(self):
+        try:
+            novos = os.read(self.mestre, 4096)
+        except (BlockingIOError, OSError):
+            return b""
+        self._comandos += novos
+        ecos = []
+        while b"\n" in self._comandos:
+            linha, self._comandos = self._comandos.split(b"\n", 1)
+            eco = self.modelo.comando(linha.decode("ascii", errors="ignore"))
+            if eco is not None:
+                ecos.append(eco)
+        return "".join(e + "\r\n" for e in ecos).encode()
+
+    # --- saída -------------------------------------------------
+
+    def _escrever(self, dados):
+        try:
+            n = os.write(self.mestre, dados)
+        except BlockingIOError:
+            n = 0
+        self.bytes_enviados += n
+        self.bytes_perdidos += len(dados) - n
+
+    def _codificar(self, dados):
+        if self.protocolo == "binario":
+            bloco = codificar_frames(dados, self.seq)
+            self.seq = (self.seq + len(dados)) & 0xFFFF
+            return bloco
+        return formatar_ascii(dados)
+
+    def _bytes_por_amostra(self):
+        if self.protocolo == "binario":
+            return 38
+        return 60  # típico do firmware em texto
+
+    def run(self):
+        if self.atraso_inicial > 0:
+            time.sleep(self.atraso_inicial / 2)
+        self._escrever("".join(l + "\r\n" for l in BANNER).encode())
+        if self.atraso_inicial > 0:
+            time.sleep(self.atraso_inicial / 2)
+
+        taxa_max = self.baud / 10 / self._bytes_por_amostra()
+        if self.replay is not None:
+            taxa = min(self.taxa * self.velocidade, taxa_max)
+        else:
+            taxa = min(self.taxa, taxa_max)
+        dt = 1 / taxa
+
+        t0 = time.perf_counter()
+        while not self._parar.is_set():
+            eco = self._ler_comandos()
+            if eco:
+                self._escrever(eco)
+
+            devidas = int((time.perf_counter() - t0) * taxa) - self.amostras_enviadas
+            if devidas > 0:
+                if self.replay is not None:
+                    i = self.amostras_enviadas % len(self.replay)
+                    dados = self.replay[i:i + devidas]
+                else:
+                    dados = self.modelo.gerar(devidas, dt)
+                self._escrever(self._codificar(dados))
+                self.amostras_enviadas += len(dados)
+
+            time.sleep(TICK)
+
+    def parar(self):
+        self._parar.set()
+        self.join(timeout=1.0)
+        os.close(self.mestre)
+        os.close(self.escravo)
+
+# ============================================================
+# REPLAY
+# ============================================================
+
+def carregar_replay(arquivo):
+    """
+    Lê TimeStamp e as 8 colunas do firmware (VelSet..V2) de um ensaio
+    gravado, pelo nome (o gravador acrescenta TempoChegada, Fase...).
+    Retorna (dados, taxa): a taxa média de amostragem vem da coluna
+    TimeStamp, para reenviar em tempo real.
+    """
+    if eh_colunar(arquivo):
+        colunas, _ = abrir_colunar(arquivo)
+        dados = np.column_stack([colunas[c] for c in COLUNAS_REPLAY])
+    elif set(COLUNAS_REPLAY) <= set(ler_cabecalho(arquivo)[1]):
+        dados = carregar_txt(arquivo, COLUNAS_REPLAY).to_numpy(dtype=np.float64)
+        dados = dados[~np.isnan(dados).any(axis=1)]   # linhas corrompidas viram NaN no carregador
+    else:
+        # txt antigo sem cabeçalho: Setpoint, TimeStamp, VelSet..V2 por posição
+        with open(arquivo, "rb") as f:
+            dados, _ = converter_bloco(f.read(), n_campos=N_CAMPOS + 2)
+        dados = dados[:, 1:]
+    if len(dados) == 0:
+        raise ValueError(f"Nenhuma amostra para o replay em {arquivo}")
+
+    tempo = dados[:, 0]
+    duracao = tempo[-1] - tempo[0]
+    taxa = (len(tempo) - 1) / duracao if duracao > 0 else TAXA
+    return dados[:, 1:], taxa
+
+# ============================================================
+# MAIN
+# ============================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Dinamômetro virtual (firmware V0_1) num pty.")
+    parser.add_argument("--taxa", type=float, default=TAXA, help="amostras/s")
+    parser.add_argument("--baud", type=int, default=BAUD)
+    parser.add_argument("--protocolo", choices=["ascii", "binario"], default="ascii")
+    parser.add_argument("--atraso-inicial", type=float, default=ATRASO_INICIAL, help="s até o fluxo começar")
+    parser.add_argument("--tau", type=float, default=TAU, help="constante de tempo da velocidade [s]")
+    parser.add_argument("--replay", help="aquisicao_*.txt ou .col para reenviar")
+    parser.add_argument("--velocidade", type=float, default=1.0, help="fator de velocidade do replay")
+    args = parser.parse_args()
+
+    sim = Simulador(args.taxa, args.baud, args.protocolo, args.atraso_inicial,
+                    args.replay, args.velocidade, args.tau)
+    sim.start()
+    print(f"Dinamômetro virtual em {sim.porta} @ {args.baud} (Ctrl-C para sair)")
+
+    try:
+        while sim.is_alive():
+            time.sleep(1.0)
+            print(f"\r{sim.amostras_enviadas} amostras | {sim.bytes_enviados} bytes | "
+                  f"{sim.bytes_perdidos} perdidos | T={sim.modelo.target:.2f} "
+                  f"vel={sim.modelo.vel:.2f} M={sim.modelo.mode:.0f}   ", end="")
+    except KeyboardInterrupt:
+        pass
+    sim.parar()
+    print()
+
+
+if __name__ == "__main__":
+    main()
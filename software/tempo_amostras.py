@@ -0,0 +1,132 @@
+import time
+
+import numpy as np
+
+# === CONFIGURAÇÕES Tempo ===
+LIMIAR_LACUNA_S = 0.005      # salto mínimo no piso de latência para marcar lacuna
+LIMIAR_LACUNA_PERIODOS = 3   # ... e pelo menos esse número de períodos
+TOLERANCIA_DERIVA = 0.01     # 1 % de diferença entre taxa estimada e de referência
+MIN_AMOSTRAS_ESTIMATIVA = 100
+ITERACOES = 3
+PASSO_BLOCOS = 20
+MIN_AMOSTRAS_TRECHO = 50
+
+# ============================================================
+# RELÓGIO MONOTÔNICO
+# ============================================================
+
+class RelogioMonotonico:
+    """
+    perf_counter_ns ancorado uma única vez no relógio de parede.
+    Os tempos saem em segundos "epoch", como o time.time() antigo,
+    mas nunca andam para trás nem saltam com ajustes do sistema.
+    """
+
+    def __init__(self, offset_ns=None):
+        # offset_ns de outro relógio: mesma base de tempo em outro processo
+        self.offset_ns = time.time_ns() - time.perf_counter_ns() if offset_ns is None else offset_ns
+
+    def agora(self):
+        return (time.perf_counter_ns() + self.offset_ns) / 1e9
+
+# ============================================================
+# RECONSTRUÇÃO DOS TEMPOS POR AMOSTRA
+# ============================================================
+
+def _piso_futuro(r):
+    """min(r[i:]) para cada i (piso de latência visto dali em diante)."""
+    return np.minimum.accumulate(r[::-1])[::-1]
+
+
+def _periodo_robusto(chegada):
+    """
+    Período estimado pela mediana das inclinações entre blocos
+    separados por PASSO_BLOCOS blocos. Lacunas afetam só poucas
+    dessas inclinações, então a mediana não se deixa levar por elas.
+    """
+    fins = np.flatnonzero(np.diff(chegada) > 0)  # última amostra de cada bloco
+    if len(fins) <= PASSO_BLOCOS:
+        return (chegada[-1] - chegada[0]) / (len(chegada) - 1)
+    da = chegada[fins[PASSO_BLOCOS:]] - chegada[fins[:-PASSO_BLOCOS]]
+    di = fins[PASSO_BLOCOS:] - fins[:-PASSO_BLOCOS]
+    return float(np.median(da / di))
+
+
+class ReconstrutorTempo:
+    """
+    Reconstrói um tempo por amostra a partir do tempo de chegada dos
+    blocos lidos da serial.
+
+    Todas as amostras de um bloco chegam com o mesmo tempo; elas foram
+    medidas antes, espaçadas pelo período do dispositivo. Numa janela,
+    o modelo é t_i = t0 + i*P + deslocamento das lacunas, com t_i <=
+    chegada_i. Uma lacuna (amostras perdidas) aparece como um salto
+    permanente no piso de latência (min dos resíduos daqui em diante).
+
+    taxa_nominal: amostras/s do dispositivo. Se None, a referência
+    para a deriva é a taxa estimada na primeira janela.
+    """
+
+    def __init__(self, taxa_nominal=None):
+        self.taxa_referencia = taxa_nominal
+
+    def reconstruir(self, chegada):
+        """
+        chegada: tempos de chegada (s) de uma janela, um por amostra.
+        Retorna (tempos, info), info com taxa estimada, deriva e lacunas.
+        """
+        chegada = np.asarray(chegada, dtype=np.float64)
+        n = len(chegada)
+        info = {"n_amostras": n, "taxa_estimada": None, "deriva": None, "deriva_alta": False,
+                "lacunas": 0, "amostras_faltando": 0}
+        if n < 2:
+            return chegada.copy(), info
+
+        i = np.arange(n)
+        if n < MIN_AMOSTRAS_ESTIMATIVA and not self.taxa_referencia:
+            return chegada.copy(), info
+        if n < MIN_AMOSTRAS_ESTIMATIVA:
+            periodo = 1 / self.taxa_referencia
+        else:
+            periodo = _periodo_robusto(chegada)
+        if periodo <= 0:
+            return chegada.copy(), info
+
+        # alterna entre achar lacunas e reestimar o período descontando-as
+        for _ in range(ITERACOES):
+            r = chegada - i * periodo
+            # lacuna: salto grande no piso de latência visto dali em diante
+            saltos = np.diff(_piso_futuro(r))
+            limiar = max(LIMIAR_LACUNA_S, LIMIAR_LACUNA_PERIODOS * periodo)
+            inicios = np.flatnonzero(saltos > limiar) + 1
+            # trechos curtos demais (perto de outra lacuna ou do fim da
+            # janela) têm piso de poucos blocos, que confunde latência com
+            # lacuna; são absorvidos pelo trecho anterior
+            curtos = np.diff(np.append(inicios, n)) < MIN_AMOSTRAS_TRECHO
+            inicios = inicios[~curtos]
+
+            # tamanho de cada lacuna: diferença entre os pisos dos trechos
+            # vizinhos (mínimo sobre muitos blocos, pouco sensível a jitter)
+            pisos = np.minimum.reduceat(r, np.concatenate(([0], inicios)))
+            deslocamento = np.repeat(pisos - pisos[0], np.diff(np.concatenate(([0], inicios, [n]))))
+            if n < MIN_AMOSTRAS_ESTIMATIVA:
+                break
+            periodo = np.polyfit(i, chegada - deslocamento, 1)[0]
+
+        taxa = 1 / periodo
+        if self.taxa_referencia is None:
+            self.taxa_referencia = taxa
+        deriva = (taxa - self.taxa_referencia) / self.taxa_referencia
+
+        # tempos: grade uniforme encostada por baixo nos tempos de chegada
+        base = i * periodo + deslocamento
+        tempos = base + np.min(chegada - base)
+
+        info.update({
+            "taxa_estimada": float(taxa),
+            "deriva": float(deriva),
+            "deriva_alta": bool(abs(deriva) > TOLERANCIA_DERIVA),
+            "lacunas": len(inicios),
+            "amostras_faltando": int(np.round(np.diff(pisos) / periodo).clip(min=0).sum()),
+        })
+        return tempos, info
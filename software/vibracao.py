@@ -0,0 +1,266 @@
+"""
+Espectros de vibração (Ax, Ay, Az do ADXL345) por setpoint.
+
+    - PSD de Welch no tempo (janela de Hann, 50% de sobreposição), por
+      patamar e por eixo, acumulada segmento a segmento: o ensaio é lido
+      em blocos e de cada setpoint só ficam a soma dos periodogramas e
+      menos de um segmento pendente, então a memória não cresce com a
+      duração do ensaio;
+    - order tracking: a vibração é reamostrada no ângulo do rotor (coluna
+      Pos, ângulo acumulado do eixo) com AMOSTRAS_POR_VOLTA pontos por
+      volta e passa pelo mesmo Welch, agora em ciclos por volta. Os
+      harmônicos 1P, 2P, NP caem sempre nas mesmas ordens, qualquer
+      que seja a velocidade;
+    - saídas: figura tipo Campbell (frequência x rotação e ordem x
+      rotação) e tabela da amplitude RMS de cada ordem por setpoint.
+
+Só entram as amostras de patamar (coluna Fase), quando ela existe.
+Atenção: o firmware só atualiza g (Ax, Ay, Az) no modo 2; com M0/M1
+as colunas repetem o último valor lido.
+"""
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from gravacao import FASE_PATAMAR
+
+# === CONFIGURAÇÕES Vibração ===
+NPERSEG = 1024             # amostras por segmento do Welch no tempo
+SOBREPOSICAO = 0.5
+AMOSTRAS_POR_VOLTA = 32    # reamostragem no ângulo (ordem máxima = metade)
+VOLTAS_POR_SEGMENTO = 16   # resolução em ordem = 1/VOLTAS_POR_SEGMENTO
+N_PAS = 3                  # pás do rotor ensaiado (ordem NP)
+ORDENS_TABELA = tuple(range(1, 2 * N_PAS + 1))
+LARGURA_ORDEM = 0.25       # ± ordens somadas na amplitude de cada ordem
+CANAIS_VIBRACAO = ("Ax", "Ay", "Az")
+TAMANHO_BLOCO = 1 << 20    # amostras lidas por vez
+
+# ============================================================
+# WELCH INCREMENTAL
+# ============================================================
+
+class WelchIncremental:
+    """
+    Soma dos periodogramas de segmentos de nperseg amostras (n x canais).
+    adicionar() pode ser chamado com pedaços de qualquer tamanho;
+    quebrar() descarta o resto pendente (trecho não contíguo a seguir).
+    """
+
+    def __init__(self, nperseg, n_canais, sobreposicao=SOBREPOSICAO):
+        self.nperseg = nperseg
+        self.passo = max(1, int(nperseg * (1 - sobreposicao)))
+        self.janela = np.hanning(nperseg)[:, None]
+        self.soma = np.zeros((nperseg // 2 + 1, n_canais))
+        self.n_segmentos = 0
+        self.pend = np.empty((0, n_canais))
+
+    def adicionar(self, x):
+        self.pend = np.concatenate((self.pend, np.asarray(x, dtype=np.float64)))
+        n_seg = (len(self.pend) - self.nperseg) // self.passo + 1
+        if n_seg <= 0:
+            return
+        usados = (n_seg - 1) * self.passo + self.nperseg
+        # (n_seg x canais x nperseg) -> (n_seg x nperseg x canais)
+        seg = sliding_window_view(self.pend[:usados], self.nperseg, axis=0)[::self.passo]
+        seg = seg.transpose(0, 2, 1)
+        seg = (seg - seg.mean(axis=1, keepdims=True)) * self.janela
+        self.soma += np.sum(np.abs(np.fft.rfft(seg, axis=1)) ** 2, axis=0)
+        self.n_segmentos += n_seg
+        self.pend = self.pend[n_seg * self.passo:]
+
+    def quebrar(self):
+        self.pend = self.pend[:0]
+
+    def resultado(self, fs):
+        """(frequências, PSD unilateral por canal) com fs amostras por unidade."""
+        freq = np.fft.rfftfreq(self.nperseg, 1 / fs)
+        if self.n_segmentos == 0:
+            return freq, np.full(self.soma.shape, np.nan)
+        psd = self.soma / (self.n_segmentos * fs * np.sum(self.janela ** 2))
+        psd[1:-1 if self.nperseg % 2 == 0 else None] *= 2
+        return freq, psd
+
+# ============================================================
+# UM SETPOINT
+# ============================================================
+
+class EspectroPatamar:
+    """Welch no tempo e no ângulo de um setpoint, alimentado por trechos."""
+
+    def __init__(self, n_canais=len(CANAIS_VIBRACAO), nperseg=NPERSEG,
+                 amostras_por_volta=AMOSTRAS_POR_VOLTA, voltas_por_segmento=VOLTAS_POR_SEGMENTO):
+        self.tempo = WelchIncremental(nperseg, n_canais)
+        self.angulo = WelchIncremental(amostras_por_volta * voltas_por_segmento, n_canais)
+        self.d_theta = 2 * np.pi / amostras_por_volta
+        self.amostras_por_volta = amostras_por_volta
+        self.duracao = 0.0    # s somados dos trechos (para fs e para a rotação média)
+        self.intervalos = 0   # amostras - 1 de cada trecho
+        self.voltas = 0.0
+        self.ultimo = None    # (t, theta, acc) da última amostra do trecho em andamento
+        self.proximo = None   # próximo ângulo da grade de reamostragem
+
+    def adicionar(self, t, pos, acc):
+        if len(t) == 0:
+            return
+        t = np.asarray(t, dtype=np.float64)
+        theta = np.abs(np.asarray(pos, dtype=np.float64))   # sentido de giro não importa
+        acc = np.asarray(acc, dtype=np.float64)
+        if self.ultimo is not None:
+            t0, th0, a0 = self.ultimo
+            t = np.concatenate(([t0], t))
+            theta = np.concatenate(([th0], theta))
+            acc = np.concatenate((a0[None], acc))
+        else:
+            self.proximo = theta[0]
+        theta = np.maximum.accumulate(theta)   # ruído do encoder não faz o ângulo voltar
+
+        self.tempo.adicionar(acc if self.ultimo is None else acc[1:])
+        self.duracao += t[-1] - t[0]
+        self.intervalos += len(t) - 1
+        self.voltas += (theta[-1] - theta[0]) / (2 * np.pi)
+
+        # vibração na grade de ângulo (d_theta) até a última amostra recebida
+        n_grade = int(np.floor((theta[-1] - self.proximo) / self.d_theta)) + 1
+        if n_grade > 0:
+            grade = self.proximo + self.d_theta * np.arange(n_grade)
+            self.angulo.adicionar(np.column_stack([np.interp(grade, theta, acc[:, k])
+                                                   for k in range(acc.shape[1])]))
+            self.proximo = grade[-1] + self.d_theta
+        self.ultimo = (t[-1], theta[-1], acc[-1])
+
+    def quebrar(self):
+        """Fim de um trecho contíguo (o mesmo setpoint pode voltar depois)."""
+        self.tempo.quebrar()
+        self.angulo.quebrar()
+        self.ultimo = None
+
+    def fs(self):
+        return self.intervalos / self.duracao if self.duracao > 0 else np.nan
+
+    def rotacao_hz(self):
+        return self.voltas / self.duracao if self.duracao > 0 else np.nan
+
+    def psd(self):
+        return self.tempo.resultado(self.fs())
+
+    def espectro_ordens(self):
+        """(ordens, PSD em g² por ordem) do sinal reamostrado no ângulo."""
+        return self.angulo.resultado(self.amostras_por_volta)
+
+    def amplitudes_ordens(self, ordens=ORDENS_TABELA, largura=LARGURA_ORDEM):
+        """RMS [g] de cada ordem por canal (PSD somada em ±largura)."""
+        ordem, psd = self.espectro_ordens()
+        d_ordem = ordem[1] - ordem[0]
+        return np.array([np.sqrt(np.sum(psd[np.abs(ordem - k) <= largura], axis=0) * d_ordem)
+                         for k in ordens])
+
+# ============================================================
+# ENSAIO INTEIRO, EM BLOCOS
+# ============================================================
+
+def analisar_vibracao(set_omega, tempo, pos, acc, fase=None, tamanho_bloco=TAMANHO_BLOCO):
+    """
+    Espectros por setpoint. Aceita colunas memory-mapped (abrir_colunar):
+    tudo é lido em blocos de tamanho_bloco. acc: (n x canais) ou lista
+    de colunas. Retorna {setpoint: EspectroPatamar}, em ordem de setpoint.
+    """
+    set_omega = np.asarray(set_omega)
+    colunas = [np.asarray(c) for c in acc] if isinstance(acc, (list, tuple)) else None
+    espectros = {}
+    atual = None   # chave do trecho que vem do bloco anterior
+    for i in range(0, len(set_omega), tamanho_bloco):
+        fim = min(i + tamanho_bloco, len(set_omega))
+        chave = np.asarray(set_omega[i:fim], dtype=np.float64).copy()
+        if fase is not None:
+            chave[np.asarray(fase[i:fim]) != FASE_PATAMAR] = np.nan
+        t = np.asarray(tempo[i:fim])
+        p = np.asarray(pos[i:fim])
+        a = np.column_stack([c[i:fim] for c in colunas]) if colunas is not None else np.asarray(acc[i:fim])
+
+        trocas = np.flatnonzero(~((chave[1:] == chave[:-1]) | (np.isnan(chave[1:]) & np.isnan(chave[:-1])))) + 1
+        inicios = np.concatenate(([0], trocas))
+        fins = np.concatenate((trocas, [len(chave)]))
+        for ini, f in zip(inicios, fins):
+            sp = chave[ini]
+            if atual is not None and not (sp == atual):
+                espectros[atual].quebrar()
+                atual = None
+            if np.isnan(sp):
+                continue
+            if sp not in espectros:
+                espectros[sp] = EspectroPatamar(a.shape[1])
+            espectros[sp].adicionar(t[ini:f], p[ini:f], a[ini:f])
+            atual = sp
+    if atual is not None:
+        espectros[atual].quebrar()
+    return dict(sorted(espectros.items()))
+
+
+def tabela_ordens(espectros, canais=CANAIS_VIBRACAO, ordens=ORDENS_TABELA):
+    """Uma linha por setpoint: rotação e RMS [g] de cada ordem em cada eixo."""
+    linhas = []
+    for sp, e in espectros.items():
+        linha = {"Setpoint": sp, "Rotacao[Hz]": e.rotacao_hz(), "Rotacao[rpm]": 60 * e.rotacao_hz(),
+                 "fs[Hz]": e.fs(), "Voltas": e.voltas}
+        amp = e.amplitudes_ordens(ordens)
+        for j, k in enumerate(ordens):
+            for c, canal in enumerate(canais):
+                linha[f"{canal}_{k}P[g]"] = amp[j, c]
+        linhas.append(linha)
+    return pd.DataFrame(linhas)
+
+# ============================================================
+# FIGURA
+# ============================================================
+
+def figura_campbell(espectros, canais=CANAIS_VIBRACAO, n_pas=N_PAS, titulo=None):
+    """
+    Linha de cima: PSD (frequência x rotação), com as retas 1P, NP e 2NP.
+    Linha de baixo: espectro de ordens x rotação (harmônicos horizontais).
+    """
+    import matplotlib.pyplot as plt   # só quem desenha precisa do matplotlib
+
+    validos = [e for e in espectros.values() if e.tempo.n_segmentos and e.angulo.n_segmentos]
+    fig, axs = plt.subplots(2, len(canais), figsize=(5 * len(canais), 8), squeeze=False)
+    if not validos:
+        fig.suptitle("Sem segmentos suficientes para os espectros")
+        return fig
+
+    rot = np.array([e.rotacao_hz() for e in validos])
+    ordem_rot = np.argsort(rot)
+    rot = rot[ordem_rot]
+    validos = [validos[i] for i in ordem_rot]
+
+    # fs muda pouco entre patamares: todos na grade de frequência do primeiro
+    freq = validos[0].psd()[0]
+    psd = np.stack([np.stack([np.interp(freq, *_colunas(e.psd(), c)) for e in validos], axis=1)
+                    for c in range(len(canais))])
+    ordem = validos[0].espectro_ordens()[0]
+    psd_ordem = np.stack([np.stack([e.espectro_ordens()[1][:, c] for e in validos], axis=1)
+                          for c in range(len(canais))])
+
+    for c, canal in enumerate(canais):
+        ax = axs[0, c]
+        ax.pcolormesh(rot, freq, 10 * np.log10(psd[c] + 1e-30), shading="nearest", cmap="viridis")
+        for k in sorted({1, n_pas, 2 * n_pas}):
+            ax.plot(rot, k * rot, "w--", lw=1)
+            ax.annotate(f"{k}P", (rot[-1], k * rot[-1]), color="w", fontsize=8)
+        ax.set_ylim(0, freq[-1])
+        ax.set_xlabel("Rotação (Hz)")
+        ax.set_ylabel("Frequência (Hz)")
+        ax.set_title(f"{canal}: PSD (dB g²/Hz)")
+
+        ax = axs[1, c]
+        ax.pcolormesh(rot, ordem, 10 * np.log10(psd_ordem[c] + 1e-30), shading="nearest", cmap="viridis")
+        ax.set_xlabel("Rotação (Hz)")
+        ax.set_ylabel("Ordem (ciclos por volta)")
+        ax.set_title(f"{canal}: ordens")
+    if titulo:
+        fig.suptitle(titulo)
+    fig.tight_layout()
+    return fig
+
+
+def _colunas(freq_psd, c):
+    freq, psd = freq_psd
+    return freq, psd[:, c]